@@ -105,6 +105,33 @@ def reverse_flux(reaction, ref_value, value):
         reaction.knock_out()
 
 
+def cofactor_swap_stoichiometry(reaction, swap_pairs):
+    """
+    The change in stoichiometry that swaps the cofactors of a reaction.
+
+    Parameters
+    ----------
+    reaction: cobra.Reaction
+        The reaction to swap.
+    swap_pairs: tuple
+        A tuple of (cofactors, equivalent_cofactors)
+
+    Returns
+    -------
+    dict
+        The coefficients to add to the stoichiometry of the reaction, by metabolite.
+    """
+    if all(reaction.metabolites.get(met, False) for met in swap_pairs[0]):
+        new_coefficients = {met: -reaction.metabolites[met] for met in swap_pairs[0]}
+        new_coefficients.update({new_met: reaction.metabolites[met] for met, new_met in zip(*swap_pairs)})
+    elif all(reaction.metabolites.get(met, False) for met in swap_pairs[1]):
+        new_coefficients = {met: -reaction.metabolites[met] for met in swap_pairs[1]}
+        new_coefficients.update({new_met: reaction.metabolites[met] for new_met, met in zip(*swap_pairs)})
+    else:
+        raise ValueError("%s: Invalid swap pairs %s (%s)" % (reaction.id, str(swap_pairs), reaction.reaction))
+    return new_coefficients
+
+
 def swap_cofactors(reaction, model, swap_pairs, inplace=True):
     """
     Swaps the cofactors of a reaction. For speed, it can be done inplace which just changes the coefficients.
@@ -127,14 +154,7 @@ def swap_cofactors(reaction, model, swap_pairs, inplace=True):
         Reaction
             A reaction with swapped cofactors (the same if inplace).
     """
-    if all(reaction.metabolites.get(met, False) for met in swap_pairs[0]):
-        new_coefficients = {met: -reaction.metabolites[met] for met in swap_pairs[0]}
-        new_coefficients.update({new_met: reaction.metabolites[met] for met, new_met in zip(*swap_pairs)})
-    elif all(reaction.metabolites.get(met, False) for met in swap_pairs[1]):
-        new_coefficients = {met: -reaction.metabolites[met] for met in swap_pairs[1]}
-        new_coefficients.update({new_met: reaction.metabolites[met] for new_met, met in zip(*swap_pairs)})
-    else:
-        raise ValueError("%s: Invalid swap pairs %s (%s)" % (reaction.id, str(swap_pairs), reaction.reaction))
+    new_coefficients = cofactor_swap_stoichiometry(reaction, swap_pairs)
 
     def _inplace(rxn, stoichiometry):
         rxn.add_metabolites(stoichiometry, combine=True)
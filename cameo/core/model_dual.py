@@ -11,93 +11,152 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import numpy
+from optlang.symbolics import Zero
+from scipy.sparse import coo_matrix
 from sympy import Add
 
 from cobra import Model
 
+from cameo.util import linear_terms
 
-def convert_to_dual(model):
-    dual_model = model.interface.Model()
-    maximization = model.objective.direction == "max"
 
-    if maximization:
-        sign = 1
-    else:
-        sign = -1
+def _dual_blocks(model):
+    """
+    The dual of a linear problem, read from the constraint matrix, bounds and objective of the primal.
+
+    Every primal constraint bound and variable bound gives a dual variable and every primal variable a dual constraint.
 
-    coefficients = {}
-    dual_objective = {}
+    Parameters
+    ----------
+    model : optlang.interface.Model
+        A linear problem with non-negative continuous variables.
+
+    Returns
+    -------
+    tuple
+        The names and lower bounds of the dual variables, their coefficients in the dual objective, a sparse (dual
+        variables x primal variables) matrix whose columns are the dual constraints, and the right hand sides of the
+        dual constraints (the primal objective coefficients).
+    """
+    sign = 1 if model.objective.direction == "max" else -1
+    variables = list(model.variables)
+    index = {variable.name: j for j, variable in enumerate(variables)}
+    names, lower_bounds, objective = [], [], []
+    rows, columns, values = [], [], []
+
+    def add_dual_variable(name, lb, objective_coefficient, coefficients, factor):
+        rows.extend([len(names)] * len(coefficients))
+        columns.extend(coefficients.keys())
+        values.extend(factor * coefficient for coefficient in coefficients.values())
+        names.append(name)
+        lower_bounds.append(lb)
+        objective.append(objective_coefficient)
 
     # Add dual variables from primal constraints:
     for constraint in model.constraints:
-        if constraint.expression == 0:
-            continue
         if not constraint.is_Linear:
             raise NotImplementedError("Non-linear problems are currently not supported: " + str(constraint))
         if constraint.lb is None and constraint.ub is None:
             continue
-        if constraint.lb == constraint.ub:
-            const_var = model.interface.Variable("dual_" + constraint.name + "_constraint", lb=-1000, ub=1000)
-            dual_model._add_variable(const_var)
-            if constraint.lb != 0:
-                dual_objective[const_var] = sign * constraint.lb
-            for variable, coef in constraint.expression.as_coefficients_dict().items():
-                coefficients.setdefault(variable.name, {})[const_var] = sign * coef
+        terms, constant = linear_terms(constraint.expression)
+        coefficients = {index[name]: coefficient for name, coefficient in terms.items() if coefficient != 0}
+        if not coefficients:
+            continue
+        lb = None if constraint.lb is None else constraint.lb - constant
+        ub = None if constraint.ub is None else constraint.ub - constant
+        if lb == ub:
+            add_dual_variable("dual_" + constraint.name + "_constraint", -1000, sign * lb, coefficients, sign)
         else:
-            if constraint.lb is not None:
-                lb_var = model.interface.Variable("dual_" + constraint.name + "_constraint_lb", lb=0, ub=1000)
-                dual_model._add_variable(lb_var)
-                if constraint.lb != 0:
-                    dual_objective[lb_var] = -sign * constraint.lb
-            if constraint.ub is not None:
-                ub_var = model.interface.Variable("dual_" + constraint.name + "_constraint_ub", lb=0, ub=1000)
-                dual_model._add_variable(ub_var)
-                if constraint.ub != 0:
-                    dual_objective[ub_var] = sign * constraint.ub
-
-            for variable, coef in constraint.expression.as_coefficients_dict().items():
-                if constraint.lb is not None:
-                    coefficients.setdefault(variable.name, {})[lb_var] = -sign * coef
-                if constraint.ub is not None:
-                    coefficients.setdefault(variable.name, {})[ub_var] = sign * coef
+            if lb is not None:
+                add_dual_variable("dual_" + constraint.name + "_constraint_lb", 0, -sign * lb, coefficients, -sign)
+            if ub is not None:
+                add_dual_variable("dual_" + constraint.name + "_constraint_ub", 0, sign * ub, coefficients, sign)
 
     # Add dual variables from primal bounds
-    for variable in model.variables:
+    for j, variable in enumerate(variables):
         if variable.type != "continuous":
             raise NotImplementedError("Integer variables are currently not supported: " + str(variable))
         if variable.lb is None or variable.lb < 0:
             raise ValueError("Problem is not in standard form (" + variable.name + " can be negative)")
         if variable.lb > 0:
-            bound_var = model.interface.Variable("dual_" + variable.name + "_lb", lb=0, ub=1000)
-            dual_model._add_variable(bound_var)
-            coefficients.setdefault(variable.name, {})[bound_var] = -sign * 1
-            dual_objective[bound_var] = -sign * variable.lb
+            add_dual_variable("dual_" + variable.name + "_lb", 0, -sign * variable.lb, {j: 1.}, -sign)
         if variable.ub is not None:
-            bound_var = model.interface.Variable("dual_" + variable.name + "_ub", lb=0, ub=1000)
-            dual_model._add_variable(bound_var)
-            coefficients.setdefault(variable.name, {})[bound_var] = sign * 1
-            if variable.ub != 0:
-                dual_objective[bound_var] = sign * variable.ub
-
-    # Add dual constraints from primal objective
-    primal_objective_dict = model.objective.expression.as_coefficients_dict()
-    for variable in model.variables:
-        expr = Add(*((coef * dual_var) for dual_var, coef in coefficients[variable.name].items()))
-        obj_coef = primal_objective_dict[variable]
-        if maximization:
-            const = model.interface.Constraint(expr, lb=obj_coef, name="dual_" + variable.name)
-        else:
-            const = model.interface.Constraint(expr, ub=obj_coef)
-        dual_model._add_constraint(const)
+            add_dual_variable("dual_" + variable.name + "_ub", 0, sign * variable.ub, {j: 1.}, sign)
+
+    matrix = coo_matrix((values, (rows, columns)), shape=(len(names), len(variables))).tocsc()
+    right_hand_sides = numpy.zeros(len(variables))
+    for name, coefficient in linear_terms(model.objective.expression)[0].items():
+        right_hand_sides[index[name]] = coefficient
+    return names, lower_bounds, numpy.array(objective, dtype=float), matrix, right_hand_sides
 
-    # Make dual objective
-    expr = Add(*((coef * dual_var) for dual_var, coef in dual_objective.items() if coef != 0))
+
+def add_dual_problem(model, target=None):
+    """
+    Add the dual variables and constraints of a linear problem to a solver model.
+
+    The dual is assembled from the constraint matrix of the primal and its blocks are added to `target` in bulk,
+    without building symbolic expressions. Dual variables are named after the primal constraints and bounds they
+    belong to ("dual_<constraint>_constraint[_lb|_ub]", "dual_<variable>_lb" and "dual_<variable>_ub") and dual
+    constraints after the primal variables ("dual_<variable>").
+
+    Parameters
+    ----------
+    model : optlang.interface.Model
+        The primal problem, with non-negative continuous variables.
+    target : optlang.interface.Model, optional
+        The model the dual is added to (defaults to the primal problem itself, giving a combined primal-dual problem).
+
+    Returns
+    -------
+    dict
+        The coefficients of the dual objective {dual variable: coefficient}. It must be minimized if the primal
+        objective is maximized and vice versa.
+    """
+    if target is None:
+        target = model
+    maximization = model.objective.direction == "max"
+    primal_variables = list(model.variables)
+    names, lower_bounds, objective, matrix, right_hand_sides = _dual_blocks(model)
+
+    interface = target.interface
+    dual_variables = [interface.Variable(name, lb=lb, ub=1000) for name, lb in zip(names, lower_bounds)]
+    target.add(dual_variables)
     if maximization:
-        objective = model.interface.Objective(expr, direction="min")
+        dual_constraints = [interface.Constraint(Zero, lb=rhs, name="dual_" + variable.name)
+                            for variable, rhs in zip(primal_variables, right_hand_sides)]
     else:
-        objective = model.interface.Objective(expr, direction="max")
-    dual_model.objective = objective
+        dual_constraints = [interface.Constraint(Zero, ub=rhs, name="dual_" + variable.name)
+                            for variable, rhs in zip(primal_variables, right_hand_sides)]
+    target.add(dual_constraints)
+    target.update()
+    for j, constraint in enumerate(dual_constraints):
+        column = slice(matrix.indptr[j], matrix.indptr[j + 1])
+        constraint.set_linear_coefficients(
+            {dual_variables[k]: coefficient for k, coefficient in zip(matrix.indices[column], matrix.data[column])})
+
+    return {dual_variables[k]: objective[k] for k in numpy.flatnonzero(objective)}
+
 
+def convert_to_dual(model):
+    """
+    The dual of a linear problem as a new solver model (see add_dual_problem).
+
+    Parameters
+    ----------
+    model : optlang.interface.Model
+        The primal problem, with non-negative continuous variables.
+
+    Returns
+    -------
+    optlang.interface.Model
+    """
+    dual_model = model.interface.Model()
+    dual_objective = add_dual_problem(model, dual_model)
+    direction = "min" if model.objective.direction == "max" else "max"
+    dual_model.objective = model.interface.Objective(Zero, direction=direction)
+    dual_model.update()
+    dual_model.objective.set_linear_coefficients(dual_objective)
     return dual_model
 
 
@@ -23,15 +23,19 @@ from itertools import product
 import numpy as np
 import optlang
 from optlang.interface import OPTIMAL
+from optlang.symbolics import Zero
 import pandas
 import sympy
-from cobra import Metabolite, Reaction, Model
+from cobra import Configuration
 from numpy.linalg import svd
 from scipy.sparse import dok_matrix, lil_matrix
 
 from cobra.exceptions import OptimizationError
 
-__all__ = ['find_dead_end_reactions', 'find_coupled_reactions', 'ShortestElementaryFluxModes']
+from cameo.util import linear_terms, partition
+
+__all__ = ['find_dead_end_reactions', 'find_coupled_reactions', 'ShortestElementaryFluxModes',
+           'MinimalCutSetsEnumerator']
 
 logger = logging.getLogger(__name__)
 
@@ -441,202 +445,318 @@ class ShortestElementaryFluxModes():
         return next(self._elementary_mode_generator)
 
 
-class MinimalCutSetsEnumerator(ShortestElementaryFluxModes):  # pragma: no cover # don't test until it works
-    def __init__(self, model, targets, constraints=None, exclude=None, c=1e-5):
-        if exclude is not None:
-            exclude_copy = []
-            for re in exclude:
-                if isinstance(re, str):
-                    exclude_copy.append(re)
-                else:
-                    exclude_copy.append(re.id)
-        else:
-            exclude_copy = ()
-        exclude = exclude_copy
+class MinimalCutSetsEnumerator(object):
+    """
+    Enumerate minimal cut sets (MCS) using the dual formulation of Ballerstein et al. [1] and von Kamp et al. [2].
+
+    The target space (the fluxes that should be made impossible) is described by linear constraints over the flux
+    variables of the model. A set of reactions C is a cut set if the target space becomes infeasible once all
+    reactions in C are knocked out. By Farkas' lemma this is the case if and only if a dual certificate exists
+    whose support (apart from the entries belonging to C) respects the reversibilities of the network. The
+    certificate is searched for with a MILP that minimizes the number of knockouts, and every found cut set is
+    excluded (together with all its supersets) by an integer cut before the next solve. Cut sets are therefore
+    enumerated in order of increasing cardinality and are guaranteed to be minimal.
+
+    Before building the MILP the network is compressed: reactions that cannot carry any steady-state flux are
+    removed and reactions with proportional fluxes (coupled reactions) are lumped into a single column. A
+    compressed cut set is expanded into all its combinations of knockable member reactions.
+
+    Bounds that equal the default bounds of the cobra configuration are treated as infinite. The dual variables
+    are bounded by `big_m`, which effectively limits the numerical range of the certificates that can be found.
+
+    Parameters
+    ----------
+    model : cobra.Model
+        A constraint-based model.
+    targets : optlang.interface.Constraint or list
+        Linear constraints over the flux variables of `model` that describe the target space.
+    constraints : list, optional
+        Desired constraints (optlang.interface.Constraint) that must remain feasible after knocking out a cut set.
+    exclude : list, optional
+        Reactions (or reaction ids) that are not allowed to be part of a cut set.
+    max_size : int, optional
+        The maximum cardinality of the enumerated cut sets.
+    compress : bool
+        Compress the network before building the dual problem (default: True).
+    big_m : float
+        Bound on the dual variables (default: 1000).
+
+    Examples
+    --------
+    >>> biomass = model.reactions.BIOMASS_Ecoli_core_w_GAM
+    >>> target = model.problem.Constraint(biomass.flux_expression, lb=0.1)
+    >>> for mcs in MinimalCutSetsEnumerator(model, target, max_size=3):
+    ...     print(mcs)
+
+    References
+    ----------
+    .. [1] Ballerstein, K., von Kamp, A., Klamt, S., & Haus, U.-U. (2012). Minimal cut sets in a metabolic network
+       are elementary modes in a dual network. Bioinformatics, 28(3), 381-387.
+    .. [2] von Kamp, A., & Klamt, S. (2014). Enumeration of smallest intervention strategies in genome-scale
+       metabolic networks. PLoS Computational Biology, 10(1), e1003378.
+    """
+
+    def __init__(self, model, targets, constraints=None, exclude=None, max_size=None, compress=True, big_m=1000.):
+        if exclude is None:
+            exclude = ()
+        self._exclude = frozenset(reaction if isinstance(reaction, str) else reaction.id for reaction in exclude)
+        self._max_size = max_size
+        self._big_m = big_m
 
         self._primal_model = model.copy()
         self._constraints = self._construct_constraints(constraints)
-        self._target_constraints = self._convert_target_to_constraints(targets)
-        self._dual_model = self._make_dual_model(model)
-        self._add_target_constraints(c)
+        targets = self._convert_target_to_constraints(targets)
+        self._target_model = model.copy()
+        for target in targets:
+            _copy_linear_constraint(target, self._target_model)
 
-        super(MinimalCutSetsEnumerator, self).__init__(
-            self._dual_model, copy=False, change_bounds=False, reactions=self._v_reactions, c=c)
+        self._compress_network(model, self._target_rows(targets), compress)
+        self._dual_problem = self._make_dual_problem(model.solver.interface)
+        self._generator = None
 
-        def iterator_wrapper(generator, func):
-            """Convert MCS's to primal and filter according to constraints"""
-            for mcs in generator:
-                allowed_mcs = func(mcs)
-                if allowed_mcs is not None:
-                    yield allowed_mcs
+    @property
+    def columns(self):
+        """The columns of the compressed network as dictionaries {reaction_id: coefficient}."""
+        return self._columns
 
-        self._elementary_mode_generator = iterator_wrapper(self._elementary_mode_generator, self._allowed_mcs)
+    def __iter__(self):
+        return self
 
-    def _allowed_mcs(self, dual_em):
-        mcs = self._convert_mcs_to_primal(dual_em)
+    def __next__(self):
+        if self._generator is None:
+            self._generator = self.enumerate()
+        return next(self._generator)
+
+    def enumerate(self, view=None):
+        """
+        Stream minimal cut sets.
+
+        Sequential enumeration yields the cut sets in order of increasing cardinality. When a view with more than
+        one worker is given, the search space is split into disjoint chunks (by the first knockable column of a cut
+        set) that are enumerated in parallel. Cut sets are then increasing in cardinality within every chunk only.
+
+        Parameters
+        ----------
+        view : SequentialView or MultiprocessingView, optional
+            A view used to distribute the enumeration.
+
+        Returns
+        -------
+        generator
+            Minimal cut sets as sets of reaction ids.
+        """
+        if view is None or len(view) == 1:
+            for compressed_mcs in _enumerate_compressed_cut_sets(self._dual_problem, self._knockable_columns):
+                for mcs in self._allowed_mcs(compressed_mcs):
+                    yield mcs
+        else:
+            positions = list(range(len(self._knockable_columns)))
+            chunks = [(chunk[0], chunk[-1] + 1) for chunk in partition(positions, 4 * len(view)) if len(chunk) > 0]
+            for chunk_result in view.imap(_MinimalCutSetsChunkEnumerator(self), chunks):
+                for compressed_mcs in chunk_result:
+                    for mcs in self._allowed_mcs(compressed_mcs):
+                        yield mcs
+
+    def _allowed_mcs(self, compressed_mcs):
+        """Expand a compressed cut set into primal cut sets and filter them according to the desired constraints."""
+        members = [self._knockable_members[column] for column in compressed_mcs]
         if len(self._constraints) > 0:
             with self._primal_model:
-                for reac_id in mcs:
-                    self._primal_model.reactions.get_by_id(reac_id).knock_out()
+                for reaction_ids in members:
+                    self._primal_model.reactions.get_by_id(reaction_ids[0]).knock_out()
                 self._primal_model.solver.optimize()
-                if self._primal_model.solver.status == OPTIMAL:
-                    return mcs
-                else:
-                    return None
-        else:
-            return mcs
-
-    def _convert_mcs_to_primal(self, dual_em):
-        primal_mcs = []
-        for reac in dual_em:
-            name = "_".join(reac.id.split("_")[1:])
-            if name in self._primal_model.reactions:
-                primal_mcs.append(name)
-            elif "_reverse_" in name and "_".join(name.split("_")[:-2]) in self._primal_model.reactions:
-                primal_mcs.append("_".join(name.split("_")[:-2]))
-            else:
-                raise RuntimeError("Primal reaction could not be found for " + reac.id)
-        return set(primal_mcs)
-
-    def _make_dual_model(self, model):
-        dual_model = Model(solver_interface=model.solver.interface)
-
-        # Add dual metabolites
-        dual_metabolite_names = []
-        irreversibles = []  # Metabolites for which a z-reaction must be added
-        self._dual_to_primal_mapping = {}
-        for re in model.reactions:
-            forward_id = re.id()
-            reverse_id = re.reverse_id()
-            if forward_id in self._split_vars or reverse_id in self._split_vars:
-                if re.upper_bound > 0 or forward_id in self._split_vars:
-                    dual_metabolite_names.append(forward_id)
-                    irreversibles.append(forward_id)
-                    self._dual_to_primal_mapping[forward_id] = re.id
-                if re.lower_bound < 0 or reverse_id in self._split_vars:
-                    dual_metabolite_names.append(reverse_id)
-                    irreversibles.append(reverse_id)
-                    self._dual_to_primal_mapping[reverse_id] = re.id
-            else:
-                dual_metabolite_names.append(re.id)
-                if re.lower_bound >= 0:
-                    irreversibles.append(re.id)
-                self._dual_to_primal_mapping[re.id] = re.id
-        dual_model.add_metabolites([Metabolite(name) for name in dual_metabolite_names])
-
-        # Add dual "u-reactions"
-        transposed_stoichiometry = {}
-        for reaction in model.reactions:
-            for met, coef in reaction.metabolites.items():
-                if reaction.reverse_id() in dual_metabolite_names:
-                    transposed_stoichiometry.setdefault(met, {})[
-                        dual_model.metabolites.get_by_id(reaction.reverse_id())] = -coef
-                if reaction.id() in dual_metabolite_names:
-                    transposed_stoichiometry.setdefault(met, {})[
-                        dual_model.metabolites.get_by_id(reaction.id())] = coef
-                # This should be the same as forward_var.name but in general it might not be
-                elif reaction.id in dual_metabolite_names:
-                    transposed_stoichiometry.setdefault(met, {})[
-                        dual_model.metabolites.get_by_id(reaction.id)] = coef
-
-        u_reactions = []
-        for met, stoichiometry in transposed_stoichiometry.items():
-            met_id = met.id
-            reac = Reaction("u_" + met_id)
-            reac.lower_bound = -reac.upper_bound  # Make reversible
-            reac.add_metabolites(stoichiometry)
-            u_reactions.append(reac)
-
-        dual_model.add_reactions(u_reactions)
-
-        # Add dual "v-reactions"
-        v_reactions = []
-        for dual_met in dual_model.metabolites:
-            reac = Reaction("v_" + dual_met.id)
-            reac.lower_bound = -reac.upper_bound  # Make reversible
-            reac.add_metabolites({dual_met: 1})
-            v_reactions.append(reac)
-        dual_model.add_reactions(v_reactions)
-        self._v_reactions = v_reactions
-
-        # Add dual "z-reactions"
-        z_reactions = []
-        for dual_met in dual_model.metabolites:
-            if dual_met.id in irreversibles:
-                reac = Reaction("z_" + dual_met.id)
-                reac.lower_bound = 0
-                reac.add_metabolites({dual_met: -1})
-                z_reactions.append(reac)
-        dual_model.add_reactions(z_reactions)
-
-        return dual_model
+                if self._primal_model.solver.status != OPTIMAL:
+                    return []
+        return [set(mcs) for mcs in product(*members)]
 
-    def _convert_target_to_constraints(self, targets):
-        """Make a list of constraints that describe the target polytope."""
+    def _is_cut_set(self, columns):
+        """Check if knocking out `columns` renders the target space infeasible."""
+        with self._target_model:
+            for column in columns:
+                self._target_model.reactions.get_by_id(self._knockable_members[column][0]).knock_out()
+            self._target_model.solver.optimize()
+            return self._target_model.solver.status != OPTIMAL
 
-        def _convert_string_to_target_constraints(target_string):
-            """Convert a string to constraints, e.g. a reaction name to constraints that target that reaction"""
-            if target_string in self._primal_model.reactions:
-                raise NotImplementedError  # TODO
-            else:
-                raise NotImplementedError
-            return NotImplemented  # return constraints
+    def _is_minimal_cut_set(self, columns):
+        return all(not self._is_cut_set([c for c in columns if c != column]) for column in columns)
 
+    def _convert_target_to_constraints(self, targets):
+        """Make a list of constraints that describe the target polytope."""
         if isinstance(targets, optlang.interface.Constraint):
             targets = [targets]
-        elif isinstance(targets, str):
-            targets = [targets]
-        if isinstance(targets[0], str):
-            new_targets = []
-            for target in targets:
-                new_targets.extend(_convert_string_to_target_constraints(target))
-            targets = new_targets
-
-        # Find the variables that are used to describe the target polytope (these have to be split).
-        split_vars = set()
+        targets = list(targets)
         for target in targets:
-            split_vars.update(set(var.name for var in target.variables))
-        self._split_vars = split_vars
-
-        return targets
-
-    def _add_target_constraints(self, c):
-        """Add the target constraints to the dual model"""
-        targets = self._target_constraints
-
-        w_reactions = []
-        for i, target in enumerate(targets):
-            assert isinstance(target, optlang.interface.Constraint)
+            if not isinstance(target, optlang.interface.Constraint):
+                raise ValueError("Targets must be given as optlang constraints, not %s." % type(target))
             if not target.is_Linear:
                 raise ValueError("Target constraints must be linear.")
-            if (target.lb is None and target.ub is None) or (target.lb is not None and target.ub is not None):
-                raise ValueError("Target constraints must be one-sided inequalities.")
-            coefficients_dict = target.expression.as_coefficients_dict()
-            w_reac = Reaction("w_" + str(i))
-            w_reac.lower_bound = c
+            if target.lb is None and target.ub is None:
+                raise ValueError("Target constraint %s is unbounded." % target.name)
+        return targets
+
+    def _target_rows(self, targets):
+        """Convert the target constraints into rows T r <= t over the reaction fluxes of the primal model."""
+        variables = {}
+        for reaction in self._primal_model.reactions:
+            variables[reaction.forward_variable.name] = (reaction.id, 1.)
+            variables[reaction.reverse_variable.name] = (reaction.id, -1.)
+        rows = []
+        reaction_index = {reaction.id: i for i, reaction in enumerate(self._primal_model.reactions)}
+        for target in targets:
+            row = np.zeros(len(reaction_index))
+            reverse_coefficients = {}
+            coefficients, constant = linear_terms(target.expression)
+            for name, coefficient in coefficients.items():
+                reaction_id, direction = variables[name]
+                if direction > 0:
+                    row[reaction_index[reaction_id]] += coefficient
+                else:
+                    reverse_coefficients[reaction_id] = coefficient
+            for reaction_id, coefficient in reverse_coefficients.items():
+                if abs(row[reaction_index[reaction_id]] + coefficient) > 1e-9:
+                    raise ValueError("Target constraint %s is not a function of the net flux of %s."
+                                     % (target.name, reaction_id))
             if target.ub is not None:
-                coefficients = {
-                    self._dual_model.metabolites.get_by_id(var.name): coef for var, coef in coefficients_dict.items()
-                    if var.name in self._dual_model.metabolites}
-            elif target.lb is not None:
-                coefficients = {
-                    self._dual_model.metabolites.get_by_id(var.name): -coef for var, coef in coefficients_dict.items()
-                    if var.name in self._dual_model.metabolites}
-            w_reac.add_metabolites(coefficients)
-            w_reactions.append(w_reac)
-        self._dual_model.add_reactions(w_reactions)
-
-        return None
+                rows.append((row, target.ub - constant))
+            if target.lb is not None:
+                rows.append((-row, constant - target.lb))
+        return rows
+
+    def _compress_network(self, model, target_rows, compress):
+        """Remove blocked reactions and lump coupled reactions into the columns of a compressed network."""
+        configuration = Configuration()
+        stoichiometry = create_stoichiometric_array(model)
+        reaction_index = {reaction.id: i for i, reaction in enumerate(model.reactions)}
+        if compress:
+            ns = nullspace(stoichiometry)
+            blocked = (np.abs(ns) <= 1e-10).all(1)
+            groups = find_coupled_reactions_nullspace(model, ns=ns)
+        else:
+            blocked = np.zeros(len(model.reactions), dtype=bool)
+            groups = []
+
+        candidate_columns = []
+        lumped = set()
+        for group in groups:
+            column = {}
+            for reaction, coefficient in group.items():
+                if reaction.id not in lumped:
+                    column[reaction.id] = 1. / coefficient
+            lumped.update(column)
+            candidate_columns.append(column)
+        for reaction, is_blocked in zip(model.reactions, blocked):
+            if not is_blocked and reaction.id not in lumped:
+                candidate_columns.append({reaction.id: 1.})
+
+        columns, lower_bounds, upper_bounds, knockable_members = [], [], [], []
+        for column in candidate_columns:
+            lb, ub = -np.inf, np.inf
+            for reaction_id, factor in column.items():
+                reaction = model.reactions.get_by_id(reaction_id)
+                lower = -np.inf if reaction.lower_bound <= configuration.lower_bound else reaction.lower_bound
+                upper = np.inf if reaction.upper_bound >= configuration.upper_bound else reaction.upper_bound
+                lower, upper = (lower / factor, upper / factor) if factor > 0 else (upper / factor, lower / factor)
+                lb, ub = max(lb, lower), min(ub, upper)
+            if lb > ub or (abs(lb) < 1e-9 and abs(ub) < 1e-9):
+                continue
+            if ub < 1e-9:
+                column = {reaction_id: -factor for reaction_id, factor in column.items()}
+                lb, ub = -ub, -lb
+            columns.append(column)
+            lower_bounds.append(lb)
+            upper_bounds.append(ub)
+            if lb > 1e-9:
+                knockable_members.append(())
+            else:
+                not_knockable = self._exclude.union(self._illegal_knockouts)
+                knockable_members.append(tuple(r_id for r_id in column if r_id not in not_knockable))
+
+        matrix = np.zeros((len(reaction_index), len(columns)))
+        for j, column in enumerate(columns):
+            for reaction_id, factor in column.items():
+                matrix[reaction_index[reaction_id], j] = factor
+        compressed_stoichiometry = stoichiometry.dot(matrix)
+        compressed_stoichiometry[np.abs(compressed_stoichiometry) <= 1e-10] = 0
+        compressed_stoichiometry = compressed_stoichiometry[(compressed_stoichiometry != 0).any(1)]
+
+        bound_rows = []
+        for j, (lb, ub) in enumerate(zip(lower_bounds, upper_bounds)):
+            if np.isfinite(ub):
+                row = np.zeros(len(columns))
+                row[j] = 1.
+                bound_rows.append((row, ub))
+            if np.isfinite(lb) and abs(lb) > 1e-9:
+                row = np.zeros(len(columns))
+                row[j] = -1.
+                bound_rows.append((row, -lb))
+        target_rows = [(row.dot(matrix), rhs) for row, rhs in target_rows]
+
+        self._columns = columns
+        self._stoichiometry = compressed_stoichiometry
+        self._irreversible = np.array(lower_bounds) >= -1e-9
+        self._inequalities = bound_rows + target_rows
+        self._knockable_members = knockable_members
+        self._knockable_columns = [j for j, members in enumerate(knockable_members) if len(members) > 0]
+
+    def _make_dual_problem(self, interface):
+        """Build the MILP whose solutions are the (compressed) cut sets."""
+        big_m = self._big_m
+        problem = interface.Model()
+        u = [interface.Variable('u_%d' % i, lb=-big_m, ub=big_m) for i in range(self._stoichiometry.shape[0])]
+        w = [interface.Variable('w_%d' % k, lb=0, ub=big_m) for k in range(len(self._inequalities))]
+        problem.add(u + w)
+
+        knockable = set(self._knockable_columns)
+        indicators = []
+        for j in range(len(self._columns)):
+            coefficients = {u[i]: self._stoichiometry[i, j] for i in np.flatnonzero(self._stoichiometry[:, j])}
+            coefficients.update({w[k]: row[j] for k, (row, _) in enumerate(self._inequalities) if row[j] != 0})
+            if j in knockable:
+                y = interface.Variable('y_%d' % j, type='binary')
+                v_pos = interface.Variable('vp_%d' % j, lb=0, ub=big_m)
+                problem.add([y, v_pos])
+                linking = [interface.Constraint(Zero, ub=0, name='link_pos_%d' % j)]
+                coefficients[v_pos] = 1.
+                if not self._irreversible[j]:
+                    v_neg = interface.Variable('vn_%d' % j, lb=0, ub=big_m)
+                    problem.add(v_neg)
+                    linking.append(interface.Constraint(Zero, ub=0, name='link_neg_%d' % j))
+                    coefficients[v_neg] = -1.
+                problem.add(linking)
+                problem.update()
+                linking[0].set_linear_coefficients({v_pos: 1., y: -big_m})
+                if len(linking) > 1:
+                    linking[1].set_linear_coefficients({v_neg: 1., y: -big_m})
+                indicators.append(y)
+            if self._irreversible[j]:
+                constraint = interface.Constraint(Zero, lb=0, name='column_%d' % j)
+            else:
+                constraint = interface.Constraint(Zero, lb=0, ub=0, name='column_%d' % j)
+            problem.add(constraint)
+            problem.update()
+            constraint.set_linear_coefficients(coefficients)
+
+        farkas = interface.Constraint(Zero, ub=-1, name='farkas')
+        problem.add(farkas)
+        problem.update()
+        farkas.set_linear_coefficients({w[k]: rhs for k, (_, rhs) in enumerate(self._inequalities) if rhs != 0})
+
+        if self._max_size is not None:
+            size = interface.Constraint(Zero, ub=self._max_size, name='max_size')
+            problem.add(size)
+            problem.update()
+            size.set_linear_coefficients({y: 1. for y in indicators})
+
+        problem.objective = interface.Objective(Zero, direction='min')
+        problem.objective.set_linear_coefficients({y: 1. for y in indicators})
+        return problem
 
     def _construct_constraints(self, constraints):
         if constraints is None:
             self._illegal_knockouts = set()
             return ()
         else:
-            cloned_constraints = [
-                self._primal_model.solver.interface.Constraint.clone(constraint, model=self._primal_model.solver)
-                for constraint in constraints]
-            self._primal_model.solver.add(cloned_constraints)
+            cloned_constraints = [_copy_linear_constraint(constraint, self._primal_model) for constraint in constraints]
             illegal_knockouts = []
             for reaction in self._primal_model.reactions:
                 # If single knockout causes the constrained model to become infeasible, then no superset
@@ -646,26 +766,67 @@ class MinimalCutSetsEnumerator(ShortestElementaryFluxModes):  # pragma: no cover
                     self._primal_model.solver.optimize()
                     if self._primal_model.solver.status != OPTIMAL:
                         illegal_knockouts.append(reaction.id)
-            self._illegal_knockouts = illegal_knockouts
+            self._illegal_knockouts = set(illegal_knockouts)
             return cloned_constraints
 
 
-if __name__ == '__main__':
-    from cameo import load_model
-
-    model = load_model("e_coli_core")
-    # model = load_model('../../tests/data/EcoliCore.xml')
-    model.reactions.ATPM.lower_bound, model.reactions.ATPM.upper_bound = 0, 1000.
-    model.reactions.BIOMASS_Ecoli_core_w_GAM.lower_bound = 1
-    model.solver = 'cplex'
-    shortest_emo = ShortestElementaryFluxModes(model)
-    # s.model.solver.configuration.verbosity = 3
-    count = 0
-    for emo in shortest_emo:
-        if count == 1000:
-            break
-        count += 1
-        print(str(count) + " " + 80 * "#")
-        print(len(emo))
-        for reaction in emo:
-            print(reaction, reaction.lower_bound, reaction.upper_bound)
+def _copy_linear_constraint(constraint, model):
+    """Add a copy of a linear constraint to the solver of `model` (variables are matched by name)."""
+    coefficients, constant = linear_terms(constraint.expression)
+    lb = None if constraint.lb is None else constraint.lb - constant
+    ub = None if constraint.ub is None else constraint.ub - constant
+    copied_constraint = model.solver.interface.Constraint(Zero, lb=lb, ub=ub)
+    model.solver.add(copied_constraint)
+    model.solver.update()
+    copied_constraint.set_linear_coefficients(
+        {model.solver.variables[name]: coefficient for name, coefficient in coefficients.items()})
+    return copied_constraint
+
+
+def _enumerate_compressed_cut_sets(problem, columns):
+    """Solve the dual problem repeatedly, excluding every found cut set (and its supersets) by an integer cut.
+
+    The integer cuts are removed from `problem` again once the generator is exhausted or closed.
+    """
+    indicators = [problem.variables['y_%d' % j] for j in columns]
+    integer_cuts = []
+    try:
+        while problem.optimize() == OPTIMAL:
+            cut_set = tuple(j for j, y in zip(columns, indicators) if y.primal > 0.5)
+            if len(cut_set) == 0:
+                break
+            integer_cut = problem.interface.Constraint(Zero, ub=len(cut_set) - 1)
+            problem.add(integer_cut)
+            problem.update()
+            integer_cut.set_linear_coefficients({problem.variables['y_%d' % j]: 1. for j in cut_set})
+            integer_cuts.append(integer_cut)
+            yield cut_set
+    finally:
+        problem.remove(integer_cuts)
+
+
+class _MinimalCutSetsChunkEnumerator(object):
+    """Enumerate the cut sets whose first knockable column lies within a chunk of columns."""
+
+    def __init__(self, enumerator):
+        self.enumerator = enumerator
+
+    def __call__(self, chunk):
+        start, stop = chunk
+        enumerator = self.enumerator
+        problem = enumerator._dual_problem
+        columns = enumerator._knockable_columns
+        in_chunk = problem.interface.Constraint(Zero, lb=1, name='chunk')
+        problem.add(in_chunk)
+        problem.update()
+        in_chunk.set_linear_coefficients({problem.variables['y_%d' % j]: 1. for j in columns[start:stop]})
+        for j in columns[:start]:
+            problem.variables['y_%d' % j].ub = 0
+        try:
+            # Subsets of a cut set found here might start after the chunk, hence minimality has to be verified.
+            return [cut_set for cut_set in _enumerate_compressed_cut_sets(problem, columns[start:])
+                    if enumerator._is_minimal_cut_set(cut_set)]
+        finally:
+            problem.remove(in_chunk)
+            for j in columns[:start]:
+                problem.variables['y_%d' % j].ub = 1
@@ -55,7 +55,7 @@ class MultiprocessingView(Singleton):
         return self.pool.apply(func, args=args, **kwargs)
 
     def apply_async(self, func, *args, **kwargs):
-        self.pool.apply_async(func, args=args, **kwargs)
+        return self.pool.apply_async(func, args=args, **kwargs)
 
     def imap(self, func, *args, **kwargs):
         return self.pool.imap(func, *args, **kwargs)
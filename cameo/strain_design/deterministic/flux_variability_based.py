@@ -19,6 +19,7 @@ import logging
 import os
 import re
 import warnings
+from collections import OrderedDict
 from functools import partial
 from uuid import uuid4
 
@@ -35,22 +36,24 @@ from IProgress import ProgressBar
 from pandas import DataFrame, pandas
 
 from cobra import Reaction, Metabolite
-from cobra.util import fix_objective_as_constraint
+from cobra.util import assert_optimal, fix_objective_as_constraint
+from optlang.interface import OPTIMAL, UNBOUNDED
+from optlang.symbolics import Zero
 
 from cameo import config
 
 from cameo.ui import notice
-from cameo.util import TimeMachine, in_ipnb, _BIOMASS_RE_, float_floor, float_ceil
+from cameo.util import TimeMachine, in_ipnb, _BIOMASS_RE_, float_floor, float_ceil, partition, ProblemCache
 from cameo.config import non_zero_flux_threshold, ndecimals
-from cameo.parallel import SequentialView
 
 from cameo.core.utils import get_reaction_for
+from cameo.parallel import SequentialView
 
 from cameo.visualization.escher_ext import NotebookBuilder
 from cameo.visualization.palette import mapper, Palette
 
 from cameo.flux_analysis.analysis import flux_variability_analysis, phenotypic_phase_plane
-from cameo.flux_analysis.simulation import pfba, fba
+from cameo.flux_analysis.simulation import pfba, fba, moma, lmoma, room
 
 from cameo.core.strain_design import StrainDesignMethod, StrainDesignMethodResult, StrainDesign
 from cameo.core.target import ReactionKnockoutTarget, ReactionModulationTarget, ReactionInversionTarget
@@ -97,7 +100,8 @@ class DifferentialFVA(StrainDesignMethod):
     objective : str or Reaction or Metabolite
         A reaction whose flux or a metabolite whose production should be maximized.
     variables : iterable, optional
-        A iterable of n reactions (or IDs) to be scanned (defaults to current objective in design_space_model).
+        A iterable of n reactions (or IDs) to be scanned (defaults to current objective in design_space_model). The
+        flux of the first one is reported as 'biomass' in the results, the others by their IDs.
     reference_model : cobra.Model, optional
         A model whose flux ranges represent the reference state and all calculated
         flux ranges will be compared to. Defaults to design_space_model constrained
@@ -173,15 +177,6 @@ class DifferentialFVA(StrainDesignMethod):
                     self.variables.append(variable.id)
                 else:
                     self.variables.append(variable)
-        if len(self.variables) > 1:
-            raise NotImplementedError(
-                "We also think that searching the production envelope over "
-                "more than one variable would be a neat feature. However, "
-                "at the moment there are some assumptions in the code that "
-                "prevent this and we don't have the resources to change it. "
-                "Pull request welcome ;-)"
-            )
-
         self.exclude = list()
         for elem in exclude:
             if isinstance(elem, Reaction):
@@ -241,8 +236,91 @@ class DifferentialFVA(StrainDesignMethod):
             else:
                 return -1 * overlap
 
-    def _init_search_grid(self, surface_only=False, improvements_only=True):
-        """Initialize the grid of points to be scanned within the production envelope."""
+    @staticmethod
+    def _interval_gaps(reference_intervals, intervals):
+        """The gaps (see _interval_gap) between the reference intervals and a (points x reactions x 2) array."""
+        overlap = numpy.minimum(reference_intervals[:, 1] - intervals[..., 0],
+                                intervals[..., 1] - reference_intervals[:, 0])
+        gaps = numpy.where(numpy.abs(reference_intervals[:, 1]) > numpy.abs(intervals[..., 1]), overlap, -overlap)
+        gaps[overlap >= 0] = 0.
+        return gaps
+
+    def _prune(self, reference_intervals, normalized_reference_intervals, view):
+        """Find the included reactions whose results at every grid point are known without scanning them.
+
+        The flux variability analysis of the design space model, with the variables and the objective constrained to
+        the box around all grid points, bounds the flux ranges at every point. A reaction does not need to be scanned
+        if its global range
+
+        * is a single flux, then its flux range is the same at every point, or
+        * lies within its reference interval (also when normalized, with the global range scaled by the extremes of
+          the normalizing flux) on the same side of zero as the reference interval. Then its gaps are zero and it is
+          neither knocked out, reversed, suddenly essential nor free at any point.
+
+        The variables, the objective and the normalizing reaction are always scanned.
+
+        Parameters
+        ----------
+        reference_intervals : numpy.ndarray
+            The reference intervals of the included reactions.
+        normalized_reference_intervals : numpy.ndarray
+            The normalized reference intervals of the included reactions (None if the ranges are not normalized).
+        view : SequentialView or MultiprocessingView or ipython.cluster.DirectView
+            A parallelization view.
+
+        Returns
+        -------
+        tuple
+            Boolean arrays over the included reactions, the reactions to scan and the pruned reactions with a single
+            flux, and the (reactions x 2) global ranges.
+        """
+        scanned = numpy.ones(len(self.included_reactions), dtype=bool)
+        if len(self.grid) == 0:
+            return scanned, ~scanned, None
+        with self.design_space_model as model:
+            for reaction_id, coordinates in self.grid.items():
+                model.reactions.get_by_id(reaction_id).bounds = (coordinates.min(), coordinates.max())
+            global_ranges = flux_variability_analysis(
+                model, reactions=self.included_reactions, view=view, remove_cycles=False
+            ).data_frame.loc[self.included_reactions, ['lower_bound', 'upper_bound']].values
+        global_ranges[numpy.abs(global_ranges) < non_zero_flux_threshold] = 0.
+        lower_bound, upper_bound = global_ranges[:, 0], global_ranges[:, 1]
+
+        fixed = lower_bound == upper_bound
+        within_reference = (lower_bound >= reference_intervals[:, 0]) & (upper_bound <= reference_intervals[:, 1])
+        one_sided = ((lower_bound > 0) & (reference_intervals[:, 0] >= 0)) | (
+            (upper_bound < 0) & (reference_intervals[:, 1] <= 0))
+
+        if self.normalize_ranges_by is not None:
+            # The normalizer of a point is the absolute lower bound of the normalizing flux (if not zero).
+            normalizer_range = global_ranges[self.included_reactions.index(self.normalize_ranges_by)]
+            max_normalizer = numpy.abs(normalizer_range).max()
+            if max_normalizer <= non_zero_flux_threshold:
+                within_reference[:] = False
+            else:
+                if normalizer_range[0] <= 0 <= normalizer_range[1]:
+                    min_normalizer = non_zero_flux_threshold
+                else:
+                    min_normalizer = max(numpy.abs(normalizer_range).min(), non_zero_flux_threshold)
+                lower_bound = numpy.where(lower_bound >= 0, lower_bound / max_normalizer, lower_bound / min_normalizer)
+                upper_bound = numpy.where(upper_bound >= 0, upper_bound / min_normalizer, upper_bound / max_normalizer)
+                within_reference &= (lower_bound >= normalized_reference_intervals[:, 0]) & (
+                    upper_bound <= normalized_reference_intervals[:, 1])
+
+        required = numpy.isin(self.included_reactions,
+                              list(self.variables) + [self.objective, self.normalize_ranges_by])
+        scanned = required | ~(fixed | (within_reference & one_sided))
+        logger.debug("Scanning %i of %i reactions" % (scanned.sum(), len(self.included_reactions)))
+        return scanned, fixed & ~scanned, global_ranges
+
+    def _init_search_grid(self, surface_only=False, improvements_only=True, sparse=False):
+        """Initialize the grid of points to be scanned within the production envelope.
+
+        The envelope is visited along the grid lines of the variables in boustrophedon order (and the production
+        levels of consecutive envelope points in alternating directions), so neighbouring points follow each other
+        and warm start each other's flux variability analysis. If `sparse`, only the envelope points on a sparse grid
+        of the variables are scanned (see _sparse_grid_mask).
+        """
         self.envelope = phenotypic_phase_plane(
             self.design_space_model, self.variables, objective=self.objective, points=self.points)
         intervals = self.envelope[['objective_lower_bound', 'objective_upper_bound']].copy()
@@ -256,28 +334,40 @@ class DifferentialFVA(StrainDesignMethod):
                 max_distance = distance
                 max_interval = (lb, ub)
         step_size = (max_interval[1] - max_interval[0]) / (self.points - 1)
+
+        # phenotypic_phase_plane lays out the points in the order of itertools.product
+        indices = numpy.array(numpy.unravel_index(numpy.arange(len(intervals)),
+                                                  (self.points,) * len(self.variables))).T
+        selected = _sparse_grid_mask(indices, self.points) if sparse else numpy.ones(len(indices), dtype=bool)
+        variables = self.envelope[self.variables].values
+        lower_bounds = self.envelope['objective_lower_bound'].values
+        upper_bounds = self.envelope['objective_upper_bound'].values
         grid = list()
+        scanned = 0
         minimal_reference_production = self.reference_flux_ranges['lower_bound'][self.objective]
-        for i, row in self.envelope.iterrows():
-            variables = row[self.variables]
-            lb = row.objective_lower_bound
+        for i in _boustrophedon_order(indices, self.points):
+            lb, ub = lower_bounds[i], upper_bounds[i]
+            if not selected[i] or numpy.isnan(ub):
+                continue
             if improvements_only:
                 lb = max(lb, minimal_reference_production) + step_size
-            ub = row.objective_upper_bound
+            coordinates = list()
             if not surface_only:
                 coordinate = lb
                 while coordinate < ub:
-                    grid.append(list(variables.values) + [coordinate])
+                    coordinates.append(coordinate)
                     coordinate += step_size
-            if improvements_only and ub <= minimal_reference_production:
-                continue
-            else:
-                grid.append(list(variables.values) + [ub])
+            if not (improvements_only and ub <= minimal_reference_production):
+                coordinates.append(ub)
+            if scanned % 2 == 1:
+                coordinates.reverse()
+            scanned += 1
+            grid.extend(list(variables[i]) + [coordinate] for coordinate in coordinates)
         columns = self.variables + [self.objective]
         self.grid = DataFrame(grid, columns=columns)
 
     def run(self, surface_only=True, improvements_only=True, progress=True,
-            view=None, fraction_of_optimum=1.0):
+            view=None, fraction_of_optimum=1.0, sparse=None, prune=False):
         """Run the differential flux variability analysis.
         Parameters
         ----------
@@ -294,6 +384,15 @@ class DifferentialFVA(StrainDesignMethod):
             A value between zero and one that determines the width of the
             flux ranges of the reference solution. The lower the value,
             the larger the ranges.
+        sparse : bool, optional
+            If only the points of a sparse grid over the variables should be scanned, which keeps the number of
+            points manageable for several variables (defaults to True if there is more than one variable).
+        prune : bool, optional
+            If reactions whose results are known from a flux variability analysis over the whole scanned region of
+            the envelope should be left out of the scan (see _prune). Their rows are still in the results: reactions
+            with a single flux get it as their range, the others get their reference interval as their range (the
+            range at a point only lies within it), zero gaps and no flags. Defaults to False because the bounds of
+            those rows are not the scanned ranges.
         Returns
         -------
         pandas.Panel
@@ -354,126 +453,115 @@ class DifferentialFVA(StrainDesignMethod):
             else:
                 view = view
 
-            self._init_search_grid(surface_only=surface_only, improvements_only=improvements_only)
+            if sparse is None:
+                sparse = len(self.variables) > 1
+            self._init_search_grid(surface_only=surface_only, improvements_only=improvements_only, sparse=sparse)
+
+            scanned = numpy.ones(len(self.included_reactions), dtype=bool)
+            if prune:
+                scanned, fixed, global_ranges = self._prune(
+                    reference_intervals,
+                    normalized_reference_intervals if self.normalize_ranges_by is not None else None, view)
+            scanned_reactions = [reaction_id for reaction_id, is_scanned in zip(self.included_reactions, scanned)
+                                 if is_scanned]
 
             func_obj = _DifferentialFvaEvaluator(
                 self.design_space_model,
                 self.variables,
                 self.objective,
-                self.included_reactions
+                scanned_reactions
             )
+            chunks = partition(self.grid.values, len(view))
             if progress:
-                progress = ProgressBar(len(self.grid))
-                results = list(progress(view.imap(func_obj, self.grid.iterrows())))
-            else:
-                results = list(view.map(func_obj, self.grid.iterrows()))
-
-        solutions = dict((tuple(point.iteritems()), fva_result) for (point, fva_result) in results)
-
-        for sol in solutions.values():
-            sol[sol.abs() < non_zero_flux_threshold] = 0.0
-            intervals = sol.loc[
-                self.included_reactions,
-                ['lower_bound', 'upper_bound']
-            ].values
-            gaps = [
-                self._interval_gap(interval1, interval2)
-                for interval1, interval2 in zip(reference_intervals, intervals)
-            ]
-            sol['gaps'] = gaps
-            if self.normalize_ranges_by is not None:
-                # See comment above regarding normalization.
-                normalizer = abs(sol.lower_bound[self.normalize_ranges_by])
-                if normalizer > non_zero_flux_threshold:
-                    normalized_intervals = sol.loc[
-                        self.included_reactions,
-                        ['lower_bound', 'upper_bound']
-                    ].values / normalizer
-
-                    sol['normalized_gaps'] = [
-                        self._interval_gap(interval1, interval2)
-                        for interval1, interval2 in zip(
-                            normalized_reference_intervals, normalized_intervals)]
-                else:
-                    sol['normalized_gaps'] = numpy.nan
+                progress = ProgressBar(len(chunks))
+                results = list(progress(view.imap(func_obj, chunks)))
             else:
-                sol['normalized_gaps'] = gaps
+                results = list(view.map(func_obj, chunks))
+
+        points = numpy.concatenate([chunk_points for chunk_points, _ in results])
+        scanned_ranges = numpy.concatenate([chunk_ranges for _, chunk_ranges in results])
+        # Sort the points by their coordinates and drop duplicates.
+        points, unique = numpy.unique(points, axis=0, return_index=True)
+        ranges = numpy.empty((len(points), len(self.included_reactions), 2))
+        ranges[:, scanned] = scanned_ranges[unique]
+        # The pruned reactions with a single flux have it at every point, the others lie within their reference
+        # interval (see _prune).
+        pruned = ~scanned
+        if pruned.any():
+            ranges[:, fixed] = global_ranges[fixed]
+            pruned &= ~fixed
+            ranges[:, pruned] = reference_intervals[pruned]
+
+        gaps = self._interval_gaps(reference_intervals, ranges)
+        if self.normalize_ranges_by is not None:
+            # See comment above regarding normalization.
+            normalizer = numpy.abs(ranges[:, self.included_reactions.index(self.normalize_ranges_by), 0])
+            normalizer = numpy.where(normalizer > non_zero_flux_threshold, normalizer, numpy.nan)
+            normalized_gaps = self._interval_gaps(normalized_reference_intervals,
+                                                  ranges / normalizer[:, numpy.newaxis, numpy.newaxis])
+        else:
+            normalized_gaps = gaps
 
+        lower_bound, upper_bound = ranges[..., 0], ranges[..., 1]
+        reference_lower_bound, reference_upper_bound = reference_intervals[:, 0], reference_intervals[:, 1]
         # Determine where the reference flux range overlaps with zero.
-        zero_overlap_mask = numpy.asarray([
-            self._interval_overlap(interval1, (0, 0)) > 0
-            for interval1 in reference_intervals
-        ], dtype=bool)
-        collection = list()
-        for key, df in solutions.items():
-            df['biomass'] = key[0][1]
-            df['production'] = key[1][1]
-
-            df['KO'] = False
-            df['flux_reversal'] = False
-            df['suddenly_essential'] = False
-            df['free_flux'] = False
-
-            df.loc[
-                (df.lower_bound == 0) & (
-                    df.upper_bound == 0) & (
-                        ~zero_overlap_mask
-                ),
-                'KO'
-            ] = True
-
-            df.loc[
-                ((self.reference_flux_ranges.upper_bound < 0) & (df.lower_bound > 0) | (
-                    (self.reference_flux_ranges.lower_bound > 0) & (df.upper_bound < 0))),
-                'flux_reversal'
-            ] = True
-
-            df.loc[
-                (zero_overlap_mask & (df.lower_bound > 0)) | (
-                    zero_overlap_mask & (df.upper_bound < 0)),
-                'suddenly_essential'
-            ] = True
-
-            is_reversible = numpy.asarray([
-                self.design_space_model.reactions.get_by_id(i).reversibility
-                for i in df.index], dtype=bool)
-            not_reversible = ~is_reversible
-
-            df.loc[
-                ((df.lower_bound == -1000) & (df.upper_bound == 1000) & is_reversible) | (
-                    (df.lower_bound == 0) & (df.upper_bound == 1000) & not_reversible) | (
-                        (df.lower_bound == -1000) & (df.upper_bound == 0) & not_reversible),
-                'free_flux'
-            ] = True
-
-            df['reaction'] = df.index
-            df['excluded'] = df['reaction'].isin(self.exclude)
-
-            collection.append(df)
-
-#        multi_index = [(key[0][1], key[1][1]) for key in solutions]
-#        solutions_multi_index = pandas.concat(list(solutions.values()),
-        # axis=0, keys=multi_index)#
-#        solutions_multi_index.index.set_names(['biomass', 'production',
-        # 'reaction'], inplace=True)
-        total = pandas.concat(collection, ignore_index=True, copy=False)
-        total.sort_values(['biomass', 'production', 'reaction'], inplace=True)
-        total.index = total['reaction']
-        return DifferentialFVAResult(total, self.envelope, self.reference_flux_ranges)
+        zero_overlap_mask = (reference_lower_bound < 0) & (reference_upper_bound > 0)
+        is_reversible = numpy.asarray([
+            self.design_space_model.reactions.get_by_id(i).reversibility
+            for i in self.included_reactions], dtype=bool)
+        not_reversible = ~is_reversible
+
+        knockout = (lower_bound == 0) & (upper_bound == 0) & ~zero_overlap_mask
+        flux_reversal = ((reference_upper_bound < 0) & (lower_bound > 0)) | (
+            (reference_lower_bound > 0) & (upper_bound < 0))
+        suddenly_essential = zero_overlap_mask & ((lower_bound > 0) | (upper_bound < 0))
+        free_flux = ((lower_bound == -1000) & (upper_bound == 1000) & is_reversible) | (
+            (lower_bound == 0) & (upper_bound == 1000) & not_reversible) | (
+                (lower_bound == -1000) & (upper_bound == 0) & not_reversible)
+        for values in (gaps, normalized_gaps, knockout, flux_reversal, suddenly_essential, free_flux):
+            values[:, pruned] = 0
+
+        n_points, n_reactions = len(points), len(self.included_reactions)
+        reactions = numpy.tile(numpy.asarray(self.included_reactions, dtype=object), n_points)
+        columns = OrderedDict([
+            ('lower_bound', lower_bound.ravel()),
+            ('upper_bound', upper_bound.ravel()),
+            ('gaps', gaps.ravel()),
+            ('normalized_gaps', normalized_gaps.ravel()),
+            ('biomass', numpy.repeat(points[:, 0], n_reactions)),
+            ('production', numpy.repeat(points[:, -1], n_reactions))
+        ])
+        for i, variable in enumerate(self.variables[1:], 1):
+            columns[variable] = numpy.repeat(points[:, i], n_reactions)
+        columns.update([
+            ('KO', knockout.ravel()),
+            ('flux_reversal', flux_reversal.ravel()),
+            ('suddenly_essential', suddenly_essential.ravel()),
+            ('free_flux', free_flux.ravel()),
+            ('reaction', reactions),
+            ('excluded', numpy.tile([reaction_id in self.exclude for reaction_id in self.included_reactions],
+                                    n_points))
+        ])
+        total = DataFrame(columns, index=pandas.Index(reactions, name='reaction'))
+        return DifferentialFVAResult(total, self.envelope, self.reference_flux_ranges, variables=self.variables[1:])
 
 
 class DifferentialFVAResult(StrainDesignMethodResult):
-    def __init__(self, solutions, phase_plane, reference_fva, **kwargs):
+    def __init__(self, solutions, phase_plane, reference_fva, variables=(), **kwargs):
         self.phase_plane = phase_plane
-        super(DifferentialFVAResult, self).__init__(self._generate_designs(solutions, reference_fva), **kwargs)
+        # The solutions of a grid point are identified by the first variable (biomass), the production and the
+        # flux of any further variables.
+        self.point_columns = ['biomass', 'production'] + list(variables)
+        super(DifferentialFVAResult, self).__init__(
+            self._generate_designs(solutions, reference_fva, self.point_columns), **kwargs)
         self.reference_fva = reference_fva
         self.solutions = solutions
         self.groups = self.solutions.groupby(
-            ['biomass', 'production'], as_index=False, sort=False
+            self.point_columns, as_index=False, sort=False
         )
 
     @classmethod
-    def _generate_designs(cls, solutions, reference_fva):
+    def _generate_designs(cls, solutions, reference_fva, point_columns=('biomass', 'production')):
         """
         Generates strain designs for Differential FVA.
         The conversion method has three scenarios:
@@ -502,13 +590,15 @@ class DifferentialFVAResult(StrainDesignMethodResult):
             The DifferentialFVA panel with all the solutions. Each DataFrame is a design.
         reference_fva: pandas.DataFrame
             The FVA limits for the reference strain.
+        point_columns: iterable
+            The columns that identify a grid point.
         Returns
         -------
         list
             A list of cameo.core.strain_design.StrainDesign for each DataFrame in solutions.
         """
         designs = []
-        for _, solution in solutions.groupby(['biomass', 'production'], as_index=False, sort=False):
+        for _, solution in solutions.groupby(list(point_columns), as_index=False, sort=False):
             targets = []
             relevant_targets = solution[
                 (solution['normalized_gaps'].abs() > non_zero_flux_threshold) & (
@@ -603,7 +693,8 @@ class DifferentialFVAResult(StrainDesignMethodResult):
 
     def nth_panel(self, index):
         """
-        Return the nth DataFrame defined by (biomass, production) pairs.
+        Return the nth DataFrame defined by (biomass, production) pairs (followed by the flux of any further
+        variables).
         When the solutions were still based on pandas.Panel this was simply
         self.solutions.iloc
         """
@@ -667,6 +758,8 @@ class DifferentialFVAResult(StrainDesignMethodResult):
             df = self.nth_panel(solution - 1)
             notice("biomass: {0:g}".format(df['biomass'].iat[0]))
             notice("production: {0:g}".format(df['production'].iat[0]))
+            for variable in self.point_columns[2:]:
+                notice("{0}: {1:g}".format(variable, df[variable].iat[0]))
             df = df.loc[abs(df['normalized_gaps']) >= non_zero_flux_threshold]
             df.sort_values('normalized_gaps', inplace=True)
             display(df)
@@ -816,31 +909,288 @@ class _MapView(object):
         display(self.builder)
 
 
+def _grid_levels(points):
+    """The level of each index of a grid with `points` points in the nested grids of 2 ** level + 1 points."""
+    levels = numpy.full(points, -1)
+    level = 0
+    while (levels < 0).any():
+        indices = numpy.round(numpy.linspace(0, points - 1, 2 ** level + 1)).astype(int)
+        levels[indices[levels[indices] < 0]] = level
+        level += 1
+    return levels
+
+
+def _sparse_grid_mask(indices, points):
+    """Selects the points of a sparse grid (with boundaries) from a full grid.
+
+    A point is kept if the sum of the levels of its indices (see _grid_levels) does not exceed the level of the
+    finest one-dimensional grid. Each grid line along one axis at the boundary of the others keeps all its points,
+    but the number of points only grows like points * log(points) ** (d - 1) instead of points ** d.
+
+    Parameters
+    ----------
+    indices : numpy.ndarray
+        A (points x d) array of grid indices.
+    points : int
+        The number of points of the grid along each axis.
+
+    Returns
+    -------
+    numpy.ndarray
+        A boolean mask of the selected points.
+    """
+    levels = _grid_levels(points)
+    return levels[indices].sum(axis=1) <= levels.max()
+
+
+def _boustrophedon_order(indices, points):
+    """The order in which to visit grid points so that consecutive points are neighbours along a grid line.
+
+    Each axis is traversed alternately forward and backward (a reflected Gray code), like a snake on a plane.
+    """
+    keys = numpy.array(indices)
+    for axis in range(1, keys.shape[1]):
+        reflected = indices[:, :axis].sum(axis=1) % 2 == 1
+        keys[reflected, axis] = points - 1 - keys[reflected, axis]
+    return numpy.lexsort(keys.T[::-1])
+
+
+def _fix_fluxes(reactions, fluxes):
+    """Fixes the fluxes of reactions through the bounds of their variables (undone by update_variable_bounds)."""
+    for reaction, flux in zip(reactions, fluxes):
+        if flux >= 0:
+            reaction.reverse_variable.set_bounds(0, 0)
+            reaction.forward_variable.set_bounds(flux, flux)
+        else:
+            reaction.forward_variable.set_bounds(0, 0)
+            reaction.reverse_variable.set_bounds(-flux, -flux)
+
+
+def _optimize_flux(model, direction):
+    status = model.solver.optimize()
+    if status == OPTIMAL:
+        return model.solver.objective.value
+    elif status == UNBOUNDED:
+        return -numpy.inf if direction == 'min' else numpy.inf
+    return numpy.nan
+
+
+def _scan_flux_ranges(model, reactions, n_points, set_point):
+    """Minimal and maximal fluxes of reactions at a series of neighbouring points.
+
+    The solver problem is kept for all points and `set_point` only changes what differs between them (typically a
+    few bounds). Each extreme of a reaction is computed for all points in a row (forward for the minima, backward for
+    the maxima), so every LP starts from the optimal basis of the same objective at a neighbouring point.
+
+    Parameters
+    ----------
+    model : cobra.Model
+    reactions : list
+        The reactions to minimize and maximize.
+    n_points : int
+        The number of points.
+    set_point : callable
+        Constrains the model to a point, given its index.
+
+    Returns
+    -------
+    numpy.ndarray
+        A (points x reactions x 2) array with the lower and upper bounds of the reactions at each point.
+    """
+    ranges = numpy.full((n_points, len(reactions), 2), numpy.nan)
+    if n_points == 0:
+        return ranges
+
+    configuration = model.solver.configuration
+    lp_method = getattr(configuration, 'lp_method', None)
+    with model:
+        model.objective = Zero
+        if lp_method is not None:
+            # consecutive problems only differ in their bounds, so the previous basis stays dual feasible
+            configuration.lp_method = 'dual'
+        current = None
+        try:
+            for j, reaction in enumerate(reactions):
+                model.solver.objective.set_linear_coefficients({reaction.forward_variable: 1.,
+                                                                reaction.reverse_variable: -1.})
+                for k, direction in enumerate(('min', 'max')):
+                    model.objective.direction = direction
+                    order = range(n_points) if direction == 'min' else reversed(range(n_points))
+                    for i in order:
+                        if i != current:
+                            set_point(i)
+                            current = i
+                        ranges[i, j, k] = _optimize_flux(model, direction)
+                model.solver.objective.set_linear_coefficients({reaction.forward_variable: 0.,
+                                                                reaction.reverse_variable: 0.})
+        finally:
+            if lp_method is not None:
+                configuration.lp_method = lp_method
+
+    # same conventions as flux_variability_analysis for infeasible problems and numerical artifacts
+    ranges = numpy.where(numpy.isnan(ranges), ranges[..., ::-1], ranges)
+    ranges[numpy.isnan(ranges)] = 0.
+    ranges[..., 0] = numpy.minimum(ranges[..., 0], ranges[..., 1])
+    return ranges
+
+
 class _DifferentialFvaEvaluator(object):
+    """
+    Flux variability analysis of the design space model at a chunk of grid points.
+
+    The solver problem is kept for the whole chunk and only the bounds of the scanned reactions change from one
+    point to the next (see _scan_flux_ranges).
+    """
+
     def __init__(self, model, variables, objective, included_reactions):
         self.model = model
         self.variables = variables
         self.objective = objective
         self.included_reactions = included_reactions
 
-    def __call__(self, point):
-        self._set_bounds(point[1])
-        fva_result = flux_variability_analysis(self.model, reactions=self.included_reactions,
-                                               remove_cycles=False, view=SequentialView()).data_frame
+    def __call__(self, points):
+        """
+        Parameters
+        ----------
+        points : iterable
+            The grid points, each with the flux of the variables followed by the flux of the objective.
+
+        Returns
+        -------
+        tuple
+            The (points x (variables + 1)) array of points and a (points x reactions x 2) array with the lower and
+            upper bounds of the included reactions at each point.
+        """
+        fixed_reactions = [self.model.reactions.get_by_id(reaction_id) for reaction_id in
+                           self.variables + [self.objective]]
+        reactions = [self.model.reactions.get_by_id(reaction_id) for reaction_id in self.included_reactions]
+        points = numpy.asarray(points, dtype=float).reshape(-1, len(fixed_reactions))
+
+        try:
+            ranges = _scan_flux_ranges(self.model, reactions, len(points),
+                                       lambda i: _fix_fluxes(fixed_reactions, points[i]))
+        finally:
+            for reaction in fixed_reactions:
+                reaction.update_variable_bounds()
+
+        ranges[numpy.abs(ranges) < non_zero_flux_threshold] = 0.
+        return points, ranges
+
 
-        fva_result['lower_bound'] = fva_result.lower_bound.apply(lambda v: 0 if abs(v) < non_zero_flux_threshold else v)
-        fva_result['upper_bound'] = fva_result.upper_bound.apply(lambda v: 0 if abs(v) < non_zero_flux_threshold else v)
+class _FseofEvaluator(object):
+    """
+    Fluxes of a model at a chunk of enforced target flux levels.
 
-        return point[1], fva_result
+    With FBA (the default simulation method), one solver problem is kept for the whole chunk: only the bounds of the
+    target change from one level to the next, so every LP starts from the optimal basis of the previous level. Other
+    simulation methods are called at every level, MOMA, lMOMA and ROOM with a problem cache shared by the chunk.
 
-    def _set_bounds(self, point):
-        for variable in self.variables:
-            reaction = self.model.reactions.get_by_id(variable)
-            bound = point[variable]
-            reaction.upper_bound = reaction.lower_bound = bound
-        target_reaction = self.model.reactions.get_by_id(self.objective)
-        target_bound = point[self.objective]
-        target_reaction.bounds = (target_bound, target_bound)
+    In variability mode (FVSEOF), the primary objective is constrained to a fraction of its optimum at each level and
+    the flux ranges of all reactions are scanned (see _scan_flux_ranges).
+    """
+
+    def __init__(self, model, target, reactions, objective, simulation_method, simulation_kwargs, variability=False,
+                 fraction_of_optimum=1.):
+        self.model = model
+        self.target = target
+        self.reactions = reactions
+        self.objective = self._portable_objective(objective)
+        self.simulation_method = simulation_method
+        self.simulation_kwargs = {key: value for key, value in simulation_kwargs.items() if key != 'objective'}
+        self.variability = variability
+        self.fraction_of_optimum = fraction_of_optimum
+
+    def __call__(self, levels):
+        """
+        Parameters
+        ----------
+        levels : iterable
+            The fluxes enforced on the target.
+
+        Returns
+        -------
+        numpy.ndarray
+            A (levels x reactions) array of fluxes, or a (levels x reactions x 2) array of flux ranges in variability
+            mode.
+        """
+        levels = list(levels)
+        target = self.model.reactions.get_by_id(self.target)
+        with self.model:
+            self._set_objective()
+            try:
+                if self.variability:
+                    return self._flux_ranges(target, levels)
+                elif self.simulation_method is fba:
+                    return self._optimize(target, levels)[1]
+                else:
+                    return self._simulate(target, levels)
+            finally:
+                target.update_variable_bounds()
+
+    @staticmethod
+    def _portable_objective(objective):
+        # optlang objectives cannot be sent to other processes, linear ones are rebuilt from their coefficients
+        if isinstance(objective, Reaction):
+            return objective.id
+        elif objective is None or isinstance(objective, str) or not objective.is_Linear:
+            return objective
+        coefficients = objective.expression.as_coefficients_dict()
+        return objective.direction, {term.name: float(coefficient) for term, coefficient in coefficients.items()
+                                     if term.is_Symbol}
+
+    def _set_objective(self):
+        if isinstance(self.objective, tuple):
+            direction, coefficients = self.objective
+            self.model.objective = self.model.problem.Objective(Zero, direction=direction)
+            self.model.solver.objective.set_linear_coefficients(
+                {self.model.variables[name]: coefficient for name, coefficient in coefficients.items()})
+        elif self.objective is not None:
+            self.model.objective = self.objective
+
+    def _optimize(self, target, levels):
+        variables = [(reaction.forward_variable.name, reaction.reverse_variable.name) for reaction in
+                     (self.model.reactions.get_by_id(reaction_id) for reaction_id in self.reactions)]
+        optima = numpy.zeros(len(levels))
+        fluxes = numpy.zeros((len(levels), len(variables)))
+        for i, level in enumerate(levels):
+            _fix_fluxes([target], [level])
+            self.model.solver.optimize()
+            assert_optimal(self.model)
+            optima[i] = self.model.solver.objective.value
+            primal_values = self.model.solver.primal_values
+            fluxes[i] = [primal_values[forward] - primal_values[reverse] for forward, reverse in variables]
+        return optima, fluxes
+
+    def _simulate(self, target, levels):
+        simulation_kwargs = dict(self.simulation_kwargs)
+        cache = None
+        if self.simulation_method in (moma, lmoma, room) and simulation_kwargs.get('cache') is None:
+            cache = simulation_kwargs['cache'] = ProblemCache(self.model)
+        fluxes = numpy.zeros((len(levels), len(self.reactions)))
+        try:
+            for i, level in enumerate(levels):
+                _fix_fluxes([target], [level])
+                solution = self.simulation_method(self.model, **simulation_kwargs)
+                fluxes[i] = solution.fluxes[self.reactions].values
+        finally:
+            if cache is not None:
+                cache.reset()
+        return fluxes
+
+    def _flux_ranges(self, target, levels):
+        optima = self._optimize(target, levels)[0]
+        bounds = self.fraction_of_optimum * optima
+        constraint = self.model.problem.Constraint(self.model.solver.objective.expression,
+                                                   name='fseof_primary_objective_%s' % uuid4().hex)
+        self.model.add_cons_vars(constraint)
+        bound = 'lb' if self.model.objective.direction == 'max' else 'ub'
+        reactions = [self.model.reactions.get_by_id(reaction_id) for reaction_id in self.reactions]
+
+        def set_level(i):
+            _fix_fluxes([target], [levels[i]])
+            setattr(constraint, bound, bounds[i])
+
+        return _scan_flux_ranges(self.model, reactions, len(levels), set_level)
 
 
 class FSEOF(StrainDesignMethod):
@@ -881,7 +1231,7 @@ class FSEOF(StrainDesignMethod):
             raise TypeError("Primary objective must be an Objective, Reaction or a string")
 
     def run(self, target=None, max_enforced_flux=0.9, number_of_results=10, exclude=(), simulation_method=fba,
-            simulation_kwargs=None):
+            simulation_kwargs=None, view=None, variability=False, fraction_of_optimum=1.):
         """
         Performs a Flux Scanning based on Enforced Objective Flux (FSEOF) analysis.
         Parameters
@@ -894,6 +1244,18 @@ class FSEOF(StrainDesignMethod):
         number_of_results : int, optional
             The number of enforced flux levels (defaults to 10).
         exclude : Iterable of reactions or reaction ids that will not be included in the output.
+        simulation_method : callable, optional
+            The simulation method used at each level (defaults to fba). Ignored in variability mode.
+        simulation_kwargs : dict, optional
+            Keyword arguments passed to the simulation method.
+        view : SequentialView or MultiprocessingView or ipython.cluster.DirectView, optional
+            A parallelization view; the levels are split into one chunk of neighbouring levels per worker (defaults to
+            SequentialView).
+        variability : bool, optional
+            Scan the flux ranges of all reactions instead of a single flux distribution (flux variability scanning based
+            on enforced objective flux, FVSEOF [2]). Reactions are classified by the midpoints of their ranges.
+        fraction_of_optimum : float, optional
+            The fraction of the optimal primary objective that is enforced when scanning flux ranges (defaults to 1).
         Returns
         -------
         FseofResult
@@ -902,9 +1264,14 @@ class FSEOF(StrainDesignMethod):
         ----------
         .. [1] H. S. Choi, S. Y. Lee, T. Y. Kim, and H. M. Woo, 'In silico identification of gene amplification targets
         for improvement of lycopene production.,' Appl Environ Microbiol, vol. 76, no. 10, pp. 3097–3105, May 2010.
+        .. [2] J. M. Park, H. M. Park, W. J. Kim, H. U. Kim, T. Y. Kim, and S. Y. Lee, 'Flux variability scanning based
+        on enforced objective flux for identifying gene amplification targets.,' BMC Syst Biol, vol. 6, p. 106, Aug.
+        2012.
         """
         model = self.model
         target = get_reaction_for(model, target)
+        if view is None:
+            view = SequentialView()
 
         simulation_kwargs = simulation_kwargs if simulation_kwargs is not None else {}
         simulation_kwargs['objective'] = self.primary_objective
@@ -945,31 +1312,40 @@ class FSEOF(StrainDesignMethod):
             levels = [initial_flux + (i + 1) * (max_flux - initial_flux) / number_of_results for i in
                       range(number_of_results)]
 
-            # FSEOF results
-            results = {reaction.id: [] for reaction in model.reactions}
+            # FSEOF results (levels x reactions)
+            reaction_ids = [reaction.id for reaction in model.reactions]
+            evaluator = _FseofEvaluator(model, target.id, reaction_ids, self.primary_objective, simulation_method,
+                                        simulation_kwargs, variability=variability,
+                                        fraction_of_optimum=fraction_of_optimum)
+            fluxes = numpy.round(numpy.concatenate(view.map(evaluator, partition(levels, len(view)))), ndecimals)
 
-            for level in levels:
-                target.bounds = (level, level)
-                solution = simulation_method(model, **simulation_kwargs)
-                for reaction_id, flux in solution.fluxes.items():
-                    results[reaction_id].append(round(flux, ndecimals))
+        flux_ranges = None
+        if variability:
+            flux_ranges = fluxes
+            fluxes = numpy.round(flux_ranges.mean(axis=2), ndecimals)
 
         # Test each reaction
-        fseof_reactions = []
-        for reaction_id, fluxes in results.items():
-            if reaction_id not in exclude_ids \
-                    and max(abs(max(fluxes)), abs(min(fluxes))) > abs(reference[reaction_id]) \
-                    and min(fluxes) * max(fluxes) >= 0:
-                fseof_reactions.append(model.reactions.get_by_id(reaction_id))
-
-        results = {rea.id: results[rea.id] for rea in fseof_reactions}
+        reference_fluxes = numpy.array([reference[reaction_id] for reaction_id in reaction_ids])
+        highest, lowest = fluxes.max(axis=0), fluxes.min(axis=0)
+        selected = ~numpy.isin(reaction_ids, exclude_ids) \
+            & (numpy.maximum(numpy.abs(highest), numpy.abs(lowest)) > numpy.abs(reference_fluxes)) \
+            & (lowest * highest >= 0)
+        selected = numpy.flatnonzero(selected)
+
+        fseof_reactions = [model.reactions[j] for j in selected]
+        results = {reaction_ids[j]: fluxes[:, j].tolist() for j in selected}
+        if variability:
+            flux_ranges = {reaction_ids[j]: flux_ranges[:, j] for j in selected}
         run_args = dict(max_enforced_flux=max_enforced_flux,
                         number_of_results=number_of_results,
                         solution_method=simulation_method,
                         simulation_kwargs=simulation_kwargs,
-                        exclude=exclude)
+                        exclude=exclude,
+                        variability=variability,
+                        fraction_of_optimum=fraction_of_optimum)
 
-        return FSEOFResult(fseof_reactions, target, model, self.primary_objective, levels, results, run_args, reference)
+        return FSEOFResult(fseof_reactions, target, model, self.primary_objective, levels, results, run_args, reference,
+                           flux_ranges=flux_ranges)
 
 
 class FSEOFResult(StrainDesignMethodResult):
@@ -983,6 +1359,9 @@ class FSEOFResult(StrainDesignMethodResult):
         A list of the fluxes that the enforced reaction was constrained to.
     data_frame: DataFrame
         A pandas DataFrame containing the fluxes for every reaction for each enforced flux.
+    flux_ranges: dict
+        The (levels x 2) arrays with the minimal and maximal flux of every reaction for each enforced flux (only for
+        FVSEOF, None otherwise).
     run_args: dict
         The arguments that the analysis was run with. To repeat do 'FSEOF.run(**FSEOFResult.run_args)'.
     """
@@ -999,7 +1378,7 @@ class FSEOFResult(StrainDesignMethodResult):
             plotter.display(plot)
 
     def __init__(self, reactions, target, model, primary_objective, enforced_levels, reaction_results,
-                 run_args, reference, *args, **kwargs):
+                 run_args, reference, flux_ranges=None, *args, **kwargs):
 
         super(FSEOFResult, self).__init__(self._generate_designs(reference, enforced_levels, reaction_results), *args,
                                           **kwargs)
@@ -1010,18 +1389,19 @@ class FSEOFResult(StrainDesignMethodResult):
         self._run_args = run_args
         self._enforced_levels = enforced_levels
         self._reaction_results = reaction_results
+        self._flux_ranges = flux_ranges
         self._reference_fluxes = {r: reference.fluxes[r.id] for r in reactions}
 
     @staticmethod
     def _generate_designs(reference, enforced_levels, reaction_results):
         for i, level in enumerate(enforced_levels):
             targets = []
-            for reaction, value in reaction_results.items():
-                if abs(reference[reaction.id]) > 0:
+            for reaction_id, value in reaction_results.items():
+                if abs(reference[reaction_id]) > 0:
                     if value[i] == 0:
-                        targets.append(ReactionKnockoutTarget(reaction.id))
-                    elif value[i] > reference[reaction.id]:
-                        targets.append(ReactionModulationTarget(reaction.id, value[i], reference[reaction.id]))
+                        targets.append(ReactionKnockoutTarget(reaction_id))
+                    elif value[i] > reference[reaction_id]:
+                        targets.append(ReactionModulationTarget(reaction_id, value[i], reference[reaction_id]))
 
             yield StrainDesign(targets)
 
@@ -1052,6 +1432,10 @@ class FSEOFResult(StrainDesignMethodResult):
     def enforced_levels(self):
         return self._enforced_levels
 
+    @property
+    def flux_ranges(self):
+        return self._flux_ranges
+
     def _repr_html_(self):
         template = """
 <strong>Model:</strong> %(model)s</br>
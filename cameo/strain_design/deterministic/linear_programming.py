@@ -17,8 +17,13 @@ This module contains algorithms based on linear programming techniques, includin
 
 from __future__ import print_function
 
+import gzip
+import json
 import logging
+import pickle
 import warnings
+from functools import partial
+from uuid import uuid4
 
 import numpy
 from IProgress.progressbar import ProgressBar
@@ -27,23 +32,26 @@ from pandas import DataFrame
 from sympy import Add
 
 import cobra
-from cobra.util import fix_objective_as_constraint
+from cobra.util import fix_objective_as_constraint, get_context
 from cobra.exceptions import OptimizationError
 from cobra.flux_analysis import find_essential_reactions
+from cobra.io import model_from_dict, model_to_dict
 
 import optlang
 from optlang.duality import convert_linear_problem_to_dual
+from optlang.symbolics import Zero
 
 import cameo
 from cameo import config
 from cameo import ui
-from cameo.core.model_dual import convert_to_dual
+from cameo.core.model_dual import add_dual_problem
 from cameo.core.strain_design import StrainDesignMethodResult, StrainDesignMethod, StrainDesign
 from cameo.core.target import ReactionKnockoutTarget
 from cameo.core.utils import get_reaction_for
 from cameo.flux_analysis.analysis import phenotypic_phase_plane, flux_variability_analysis
 from cameo.flux_analysis.simulation import fba
 from cameo.flux_analysis.structural import find_coupled_reactions_nullspace
+from cameo.parallel import SequentialView
 from cameo.util import reduce_reaction_set, decompose_reaction_groups
 
 logger = logging.getLogger(__name__)
@@ -87,7 +95,15 @@ class OptKnock(StrainDesignMethod):
     >>> model.solver = "gurobi" # Using gurobi or cplex is recommended
     >>> optknock = OptKnock(model)
     >>> result = optknock.run(k=2, target="EX_ac_e", max_results=3)
+
+    The problem is built once and can be run for many targets, saved and loaded again (also in other processes).
+
+    >>> optknock.save("e_coli_core.optknock")
+    >>> optknock = OptKnock.load("e_coli_core.optknock")
+    >>> results = optknock.screen(["EX_ac_e", "EX_succ_e"], biomass="Biomass_Ecoli_core_w_GAM", max_knockouts=2)
     """
+    # the version of the file format written by save
+    _format_version = 1
 
     def __init__(self, model, exclude_reactions=None, remove_blocked=True, fraction_of_optimum=0.1,
                  exclude_non_gene_reactions=True, use_nullspace_simplification=True, *args, **kwargs):
@@ -95,32 +111,8 @@ class OptKnock(StrainDesignMethod):
         self._model = model.copy()
         self._original_model = model
 
-        if "gurobi" in config.solvers:
-            logger.info("Changing solver to Gurobi and tweaking some parameters.")
-            if "gurobi_interface" not in model.solver.interface.__name__:
-                model.solver = "gurobi"
-            # The tolerances are set to the minimum value. This gives maximum precision.
-            problem = model.solver.problem
-            problem.params.NodeMethod = 1  # primal simplex node relaxation
-            problem.params.FeasibilityTol = 1e-9
-            problem.params.OptimalityTol = 1e-3
-            problem.params.IntFeasTol = 1e-9
-            problem.params.MIPgapAbs = 1e-9
-            problem.params.MIPgap = 1e-9
-        elif "cplex" in config.solvers:
-            logger.debug("Changing solver to cplex and tweaking some parameters.")
-            if "cplex_interface" not in self._model.solver.interface.__name__:
-                self._model.solver = "cplex"
-            problem = self._model.solver.problem
-            problem.parameters.mip.strategy.startalgorithm.set(1)
-            problem.parameters.simplex.tolerances.feasibility.set(1e-8)
-            problem.parameters.simplex.tolerances.optimality.set(1e-8)
-            problem.parameters.mip.tolerances.integrality.set(1e-8)
-            problem.parameters.mip.tolerances.absmipgap.set(1e-8)
-            problem.parameters.mip.tolerances.mipgap.set(1e-8)
-        else:
-            warnings.warn("You are trying to run OptKnock with %s. This might not end well." %
-                          self._model.solver.interface.__name__.split(".")[-1])
+        self._select_solver()
+        self._tune_solver()
 
         if fraction_of_optimum is not None:
             fix_objective_as_constraint(self._model, fraction=fraction_of_optimum)
@@ -143,6 +135,146 @@ class OptKnock(StrainDesignMethod):
 
         self._build_problem(exclude_reactions, use_nullspace_simplification)
 
+    def __getstate__(self):
+        # variables and constraints only survive pickling as part of the solver problem, so they are kept by name
+        state = self.__dict__.copy()
+        state['_y_vars'] = {y.name: reaction for y, reaction in self._y_vars.items()}
+        state['_number_of_knockouts_constraint'] = self._number_of_knockouts_constraint.name
+        state['_dual_objective'] = {variable.name: coefficient for variable, coefficient in
+                                    self._dual_objective.items()}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # the MIP parameters are not pickled with the solver problem
+        self._tune_solver()
+        # the objective of an unpickled problem can refer to equally named variables of another problem (for example
+        # in a forked process), so it is rebuilt from the coefficients in the solver
+        self._set_linear_objective(*self._get_linear_objective())
+        variables = self._model.solver.variables
+        self._y_vars = {variables[name]: reaction for name, reaction in state['_y_vars'].items()}
+        self._number_of_knockouts_constraint = self._model.solver.constraints[state['_number_of_knockouts_constraint']]
+        self._dual_objective = {variables[name]: coefficient for name, coefficient in state['_dual_objective'].items()}
+
+    def _get_linear_objective(self):
+        solver = self._model.solver
+        coefficients = solver.objective.get_linear_coefficients(solver.variables)
+        return {v: c for v, c in coefficients.items() if c != 0}, solver.objective.direction
+
+    def _set_linear_objective(self, coefficients, direction):
+        """Set the solver objective from coefficients instead of a (cached) symbolic expression."""
+        solver = self._model.solver
+        solver.objective = solver.interface.Objective(Zero, direction=direction)
+        solver.update()
+        solver.objective.set_linear_coefficients(coefficients)
+
+    def _select_solver(self):
+        if "gurobi" in config.solvers:
+            logger.info("Changing solver to Gurobi and tweaking some parameters.")
+            if "gurobi_interface" not in self._model.solver.interface.__name__:
+                self._model.solver = "gurobi"
+        elif "cplex" in config.solvers:
+            logger.debug("Changing solver to cplex and tweaking some parameters.")
+            if "cplex_interface" not in self._model.solver.interface.__name__:
+                self._model.solver = "cplex"
+        else:
+            warnings.warn("You are trying to run OptKnock with %s. This might not end well." %
+                          self._model.solver.interface.__name__.split(".")[-1])
+
+    def _tune_solver(self):
+        """Set the parameters of Gurobi and CPLEX for the bilevel MILP."""
+        interface = self._model.solver.interface.__name__
+        problem = self._model.solver.problem
+        if "gurobi_interface" in interface:
+            # The tolerances are set to the minimum value. This gives maximum precision.
+            problem.params.NodeMethod = 1  # primal simplex node relaxation
+            problem.params.FeasibilityTol = 1e-9
+            problem.params.OptimalityTol = 1e-3
+            problem.params.IntFeasTol = 1e-9
+            problem.params.MIPgapAbs = 1e-9
+            problem.params.MIPgap = 1e-9
+        elif "cplex_interface" in interface:
+            problem.parameters.mip.strategy.startalgorithm.set(1)
+            problem.parameters.simplex.tolerances.feasibility.set(1e-8)
+            problem.parameters.simplex.tolerances.optimality.set(1e-8)
+            problem.parameters.mip.tolerances.integrality.set(1e-8)
+            problem.parameters.mip.tolerances.absmipgap.set(1e-8)
+            problem.parameters.mip.tolerances.mipgap.set(1e-8)
+
+    def save(self, path):
+        """
+        Write the built problem to a file.
+
+        The file is a gzip compressed JSON document with the model, the bilevel MILP (see optlang's Model.to_json)
+        and the names of the knockout variables and constraints. It can be loaded with OptKnock.load, also with
+        other versions of cameo, cobrapy or optlang and with another solver, to run the problem for other targets
+        without building it again.
+
+        Parameters
+        ----------
+        path : str
+            The file to write.
+        """
+        state = {
+            'format_version': self._format_version,
+            'model': model_to_dict(self._model),
+            'original_model': model_to_dict(self._original_model),
+            'problem': self._model.solver.to_json(),
+            'y_vars': {y.name: reaction.id for y, reaction in self._y_vars.items()},
+            'number_of_knockouts_constraint': self._number_of_knockouts_constraint.name,
+            'dual_objective': {variable.name: coefficient for variable, coefficient in self._dual_objective.items()},
+            'essential_reactions': sorted(reaction.id for reaction in self.essential_reactions),
+            'exclude_reactions': sorted(reaction.id for reaction in self.exclude_reactions),
+            'reaction_groups': None if self.reaction_groups is None else [
+                {reaction.id: coefficient for reaction, coefficient in group.items()}
+                for group in self.reaction_groups]
+        }
+        with gzip.open(path, 'wt') as problem_file:
+            json.dump(state, problem_file)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a problem written by OptKnock.save.
+
+        Parameters
+        ----------
+        path : str
+            The file to read.
+
+        Returns
+        -------
+        OptKnock
+        """
+        with gzip.open(path, 'rt') as problem_file:
+            try:
+                state = json.load(problem_file)
+            except ValueError:
+                raise TypeError("%s does not contain an OptKnock problem" % path)
+        if not isinstance(state, dict) or state.get('format_version') != cls._format_version:
+            raise TypeError("%s does not contain an OptKnock problem" % path)
+
+        optknock = cls.__new__(cls)
+        optknock._original_model = model_from_dict(state['original_model'])
+        optknock._model = model = model_from_dict(state['model'])
+        optknock._select_solver()
+        model._solver = model.solver.interface.Model.from_json(state['problem'])
+        optknock._tune_solver()
+
+        reactions = model.reactions
+        variables = model.solver.variables
+        optknock._y_vars = {variables[name]: reactions.get_by_id(reaction_id)
+                            for name, reaction_id in state['y_vars'].items()}
+        optknock._number_of_knockouts_constraint = model.solver.constraints[state['number_of_knockouts_constraint']]
+        optknock._dual_objective = {variables[name]: coefficient
+                                    for name, coefficient in state['dual_objective'].items()}
+        optknock.essential_reactions = set(reactions.get_by_any(state['essential_reactions']))
+        optknock.exclude_reactions = set(reactions.get_by_any(state['exclude_reactions']))
+        optknock.reaction_groups = None if state['reaction_groups'] is None else [
+            {reactions.get_by_id(reaction_id): coefficient for reaction_id, coefficient in group.items()}
+            for group in state['reaction_groups']]
+        return optknock
+
     def _remove_blocked_reactions(self):
         fva_res = flux_variability_analysis(self._model, fraction_of_optimum=0)
         blocked = [
@@ -177,9 +309,6 @@ class OptKnock(StrainDesignMethod):
 
         self._make_dual()
 
-        self._combine_primal_and_dual()
-        logger.debug("Primal and dual successfully combined")
-
         y_vars = {}
         constrained_dual_vars = set()
         for reaction in reactions:
@@ -190,17 +319,13 @@ class OptKnock(StrainDesignMethod):
         self._y_vars = y_vars
 
         primal_objective = self._model.solver.objective
-        dual_objective = self._model.solver.interface.Objective.clone(
-            self._dual_problem.objective, model=self._model.solver)
+        coefficients = {v: -c for v, c in self._dual_objective.items() if v not in constrained_dual_vars}
+        coefficients.update(primal_objective.get_linear_coefficients(primal_objective.variables))
 
-        reduced_expression = Add(*((c * v) for v, c in dual_objective.expression.as_coefficients_dict().items()
-                                   if v not in constrained_dual_vars))
-        dual_objective = self._model.solver.interface.Objective(reduced_expression, direction=dual_objective.direction)
-
-        optimality_constraint = self._model.solver.interface.Constraint(
-            primal_objective.expression - dual_objective.expression,
-            lb=0, ub=0, name="inner_optimality")
+        optimality_constraint = self._model.solver.interface.Constraint(Zero, lb=0, ub=0, name="inner_optimality")
         self._model.solver.add(optimality_constraint)
+        self._model.solver.update()
+        optimality_constraint.set_linear_coefficients(coefficients)
         logger.debug("Inner optimality constrained")
 
         logger.debug("Adding constraint for number of knockouts")
@@ -211,20 +336,9 @@ class OptKnock(StrainDesignMethod):
         self._number_of_knockouts_constraint = knockout_number_constraint
 
     def _make_dual(self):
-        dual_problem = convert_to_dual(self._model.solver)
-        self._dual_problem = dual_problem
-        logger.debug("Dual problem successfully created")
-
-    def _combine_primal_and_dual(self):
-        primal_problem = self._model.solver
-        dual_problem = self._dual_problem
-
-        for var in dual_problem.variables:
-            var = primal_problem.interface.Variable.clone(var)
-            primal_problem.add(var)
-        for const in dual_problem.constraints:
-            const = primal_problem.interface.Constraint.clone(const, model=primal_problem)
-            primal_problem.add(const)
+        # the dual is added to the primal problem directly, primal and dual share one solver problem
+        self._dual_objective = add_dual_problem(self._model.solver)
+        logger.debug("Primal and dual successfully combined")
 
     def _add_knockout_constraints(self, reaction):
         interface = self._model.solver.interface
@@ -277,7 +391,9 @@ class OptKnock(StrainDesignMethod):
         biomass_list = []
         loader_id = ui.loading()
         with self._model:
-            self._model.objective = target.id
+            objective = self._get_linear_objective()
+            self._set_linear_objective({target.forward_variable: 1, target.reverse_variable: -1}, objective[1])
+            get_context(self._model)(partial(self._set_linear_objective, *objective))
             self._number_of_knockouts_constraint.lb = self._number_of_knockouts_constraint.ub - max_knockouts
             count = 0
             while count < max_results:
@@ -306,13 +422,13 @@ class OptKnock(StrainDesignMethod):
 
                 # Add an integer cut
                 y_vars_to_cut = [y for y in self._y_vars if round(y.primal, 3) == 0]
-                integer_cut = self._model.solver.interface.Constraint(Add(*y_vars_to_cut),
-                                                                      lb=1,
-                                                                      name="integer_cut_" + str(count))
+                integer_cut = self._model.solver.interface.Constraint(Zero, lb=1, name="integer_cut_" + str(count))
 
                 if len(knockouts) < max_knockouts:
                     self._number_of_knockouts_constraint.lb = self._number_of_knockouts_constraint.ub - len(knockouts)
                 self._model.add_cons_vars(integer_cut)
+                self._model.solver.update()
+                integer_cut.set_linear_coefficients({y: 1 for y in y_vars_to_cut})
                 count += 1
 
             ui.stop_loader(loader_id)
@@ -320,6 +436,65 @@ class OptKnock(StrainDesignMethod):
             return OptKnockResult(self._original_model, knockout_list, fluxes_list,
                                   production_list, biomass_list, target.id, biomass)
 
+    def screen(self, targets, biomass, view=None, **kwargs):
+        """
+        Run OptKnock for several targets on the same problem.
+
+        The problem is sent once to every worker of the view (unless it is sequential), where it is run for each of its
+        targets.
+
+        Parameters
+        ----------
+        targets : iterable of str, Metabolite or Reaction
+            The design targets.
+        biomass : str, Metabolite or Reaction
+            The biomass definition in the model.
+        view : SequentialView or MultiprocessingView or ipython.cluster.DirectView, optional
+            A parallelization view (defaults to config.default_view).
+        kwargs : keyword arguments
+            Passed to OptKnock.run.
+
+        Returns
+        -------
+        dict
+            The OptKnockResult of every target, by target reaction id.
+        """
+        if view is None:
+            view = config.default_view
+        target_ids = [get_reaction_for(self._model, target, add=False).id for target in targets]
+        biomass_id = get_reaction_for(self._model, biomass, add=False).id
+        if isinstance(view, SequentialView):
+            results = [self.run(biomass=biomass_id, target=target_id, **kwargs) for target_id in target_ids]
+        else:
+            results = view.map(_OptKnockWorker(self, biomass_id, kwargs), target_ids)
+            for result in results:
+                result._model = self._original_model
+        return dict(zip(target_ids, results))
+
+
+class _OptKnockWorker(object):
+    """
+    Runs a pickled OptKnock problem for a target.
+
+    The problem is unpickled only once in each worker process. The original model is not sent back with the results.
+    """
+    _problems = {}
+
+    def __init__(self, optknock, biomass, run_kwargs):
+        self.key = uuid4().hex
+        self.payload = pickle.dumps(optknock, protocol=pickle.HIGHEST_PROTOCOL)
+        self.biomass = biomass
+        self.run_kwargs = run_kwargs
+
+    def __call__(self, target):
+        optknock = self._problems.get(self.key)
+        if optknock is None:
+            self._problems.clear()
+            optknock = self._problems[self.key] = pickle.loads(self.payload)
+        result = optknock.run(biomass=self.biomass, target=target, **self.run_kwargs)
+        result._model = None
+        return result
+
 
 class RobustKnock(StrainDesignMethod):
     pass
@@ -343,7 +518,7 @@ class OptKnockResult(StrainDesignMethodResult):
     def _generate_designs(knockouts):
         designs = []
         for knockout_design in knockouts:
-            designs.append(StrainDesign([ReactionKnockoutTarget(ko for ko in knockout_design)]))
+            designs.append(StrainDesign([ReactionKnockoutTarget(ko) for ko in knockout_design]))
 
         return designs
 
@@ -14,47 +14,137 @@
 from __future__ import absolute_import, print_function
 
 import time
-from bisect import insort
+from bisect import bisect_left, bisect_right
+from itertools import count
 
+import numpy as np
 from inspyred.ec import Individual as OriginalIndividual
+from inspyred.ec.emo import Pareto
 
 from cameo.config import ndecimals
+from cameo.strain_design.heuristic.evolutionary.pareto import crowding_distance, dominance_matrix, fitness_matrix
 
-__all__ = ['BestSolutionArchive', 'ProductionStrainArchive']
+__all__ = ['BestSolutionArchive', 'ProductionStrainArchive', 'ParetoArchive']
 
 
 class BestSolutionArchive(object):
+    """
+    Archive of the best solutions found during an optimization.
+
+    The archive is a list sorted from best to worst fitness. A solution is not added if a smaller solution (a strict
+    subset) with the same fitness is already archived and it replaces all larger solutions with the same fitness.
+
+    Besides the sorted list the archive keeps a hash index of the solutions with the same fitness and, for each
+    fitness, an element index used to look up subsets and supersets. Adding a solution does not scan the archive.
+    The index is keyed by the fitness, or by the tuple of its values for multiple objectives (a Pareto or a list).
+    """
+
     def __init__(self):
         self.__name__ = self.__class__.__name__
         self.worst_fitness = None
         self.archive = []
+        self._reset_index()
+
+    def _reset_index(self):
+        self._sort_keys = []
+        self._solutions = {}
+        self._elements = {}
+        self._counter = count()
+
+    @staticmethod
+    def _fitness_key(fitness):
+        """The fitness in a hashable form."""
+        if isinstance(fitness, (Pareto, list, tuple, np.ndarray)):
+            return tuple(fitness)
+        return fitness
+
+    @staticmethod
+    def _sort_key(fitness, maximize):
+        """A total order of the fitness, best first (lexicographic for multiple objectives)."""
+        if isinstance(fitness, (Pareto, list, tuple, np.ndarray)):
+            return tuple(-value if maximize else value for value in fitness)
+        return -fitness if maximize else fitness
+
+    def _set_archive(self, archive):
+        if archive is not self.archive:
+            self.archive = []
+            self._reset_index()
+            for individual in archive:
+                self._insert(individual, frozenset(individual.candidate))
+            if len(self.archive) > 0:
+                self.worst_fitness = self.archive[-1].fitness
 
     def __call__(self, random, population, archive, args):
-        self.archive = archive
+        self._set_archive(archive)
         maximize = args.get("maximize", True)
         max_archive_size = args.get('max_archive_size', 100)
         [self.add(i.candidate, i.fitness, i.birthdate, maximize, max_archive_size) for i in population]
         return self.archive
 
+    def _insert(self, individual, key):
+        fitness = self._fitness_key(individual.fitness)
+        sort_key = (self._sort_key(fitness, individual.maximize), len(key), next(self._counter))
+        position = bisect_right(self._sort_keys, sort_key)
+        self._sort_keys.insert(position, sort_key)
+        self.archive.insert(position, individual)
+        self._solutions.setdefault(fitness, {})[key] = sort_key
+        elements = self._elements.setdefault(fitness, {})
+        for element in key:
+            elements.setdefault(element, set()).add(key)
+
+    def _remove(self, fitness, key):
+        sort_key = self._solutions[fitness].pop(key)
+        position = bisect_left(self._sort_keys, sort_key)
+        del self._sort_keys[position]
+        del self.archive[position]
+        elements = self._elements[fitness]
+        for element in key:
+            elements[element].discard(key)
+            if len(elements[element]) == 0:
+                del elements[element]
+        if len(self._solutions[fitness]) == 0:
+            del self._solutions[fitness]
+            del self._elements[fitness]
+
+    def _has_subset(self, fitness, key):
+        """True if a strict subset of `key` with the same fitness is archived."""
+        solutions = self._solutions[fitness]
+        if frozenset() in solutions and len(key) > 0:
+            return True
+        hits = {}
+        elements = self._elements[fitness]
+        for element in key:
+            for other in elements.get(element, ()):
+                hits[other] = hits.get(other, 0) + 1
+        return any(n == len(other) and len(other) < len(key) for other, n in hits.items())
+
+    def _supersets(self, fitness, key):
+        """The strict supersets of `key` with the same fitness."""
+        if len(key) == 0:
+            return [other for other in self._solutions[fitness] if len(other) > 0]
+        elements = self._elements[fitness]
+        postings = sorted((elements.get(element, set()) for element in key), key=len)
+        supersets = set(postings[0]).intersection(*postings[1:])
+        supersets.discard(key)
+        return list(supersets)
+
     def add(self, candidate, fitness, birthdate, maximize, max_archive_size):
         if self.worst_fitness is None:
             self.worst_fitness = fitness
         if (maximize and fitness >= self.worst_fitness) or (not maximize and fitness <= self.worst_fitness):
-
             candidate = Individual(candidate, fitness, maximize, birthdate)
-            add = True
-            for c in self.archive:
-                if c == candidate:
-                    add = False
-                elif c.improves(candidate) and candidate.fitness == c.fitness:
-                    add = False
-                elif candidate.improves(c) and candidate.fitness == c.fitness:
-                    self.archive.remove(c)
-            if add:
-                insort(self.archive, candidate)
+            key = frozenset(candidate.candidate)
+            fitness = self._fitness_key(fitness)
+            if fitness in self._solutions:
+                if key in self._solutions[fitness] or self._has_subset(fitness, key):
+                    return
+                for superset in self._supersets(fitness, key):
+                    self._remove(fitness, superset)
+            self._insert(candidate, key)
 
             while self.length() > max_archive_size:
-                self.archive.pop()
+                worst = self.archive[-1]
+                self._remove(self._fitness_key(worst.fitness), frozenset(worst.candidate))
 
             self.worst_fitness = self.archive[len(self.archive) - 1].fitness
 
@@ -74,17 +164,52 @@ class BestSolutionArchive(object):
     def reset(self):
         self.worst_fitness = None
         self.archive = []
+        self._reset_index()
 
 
 class ProductionStrainArchive(BestSolutionArchive):
     def __call__(self, random, population, archive, args):
-        self.archive = archive
+        self._set_archive(archive)
         max_archive_size = args.get('max_archive_size', 100)
         [self.add(i.candidate, i.fitness, i.birthdate, True, max_archive_size) for i in population
          if round(i.fitness, ndecimals) > 0]
         return self.archive
 
 
+class ParetoArchive(object):
+    """
+    Archive of the non-dominated solutions found during a multi-objective optimization.
+
+    Every generation the population is merged with the archive and the dominated solutions are dropped, using a
+    vectorised dominance matrix. If the front is larger than `max_archive_size` (100 by default) the most crowded
+    solutions are removed one at a time.
+    """
+
+    def __init__(self):
+        self.__name__ = self.__class__.__name__
+
+    def __call__(self, random, population, archive, args):
+        max_archive_size = args.get('max_archive_size', 100)
+        seen = set()
+        candidates = []
+        for individual in list(archive) + list(population):
+            key = frozenset(individual.candidate)
+            if key not in seen:
+                seen.add(key)
+                candidates.append(individual)
+        if len(candidates) == 0:
+            return []
+
+        fitness = fitness_matrix(candidates)
+        front = np.flatnonzero(~dominance_matrix(fitness).any(axis=0))
+        while len(front) > max_archive_size:
+            front = np.delete(front, np.argmin(crowding_distance(fitness[front])))
+
+        return [individual if isinstance(individual, Individual) else
+                Individual(individual.candidate, individual.fitness, individual.maximize, individual.birthdate)
+                for individual in (candidates[i] for i in front)]
+
+
 class Individual(OriginalIndividual):
     def __init__(self, candidate, fitness, maximize=True, birthdate=time.time()):
         super(Individual, self).__init__(set(candidate), maximize)
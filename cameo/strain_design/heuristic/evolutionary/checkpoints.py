@@ -0,0 +1,209 @@
+# Copyright 2016 Novo Nordisk Foundation Center for Biosustainability, DTU.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Checkpoints of running heuristic optimizations.
+
+A checkpoint holds everything needed to continue an evolutionary computation exactly where it stopped: the
+population with its fitness, the archive, the generation and evaluation counters, the state of the random number
+generator and the memoised fitness values of the evaluator.
+"""
+
+from __future__ import absolute_import, print_function
+
+import gzip
+import logging
+import os
+import pickle
+import tempfile
+import time
+
+__all__ = ['save_checkpoint', 'load_checkpoint', 'CheckpointObserver']
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_VERSION = 1
+
+
+def save_checkpoint(state, path):
+    """
+    Writes a checkpoint atomically.
+
+    The state is written to a temporary file in the same directory, which then replaces `path`. An interrupted write
+    never leaves a truncated checkpoint behind.
+
+    Parameters
+    ----------
+    state : dict
+        The state of the optimization.
+    path : str
+        The checkpoint file.
+    """
+    path = os.path.abspath(path)
+    fd, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.' + os.path.basename(path),
+                                          suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as checkpoint_file:
+            with gzip.GzipFile(fileobj=checkpoint_file, mode='wb', compresslevel=6) as compressed:
+                pickle.dump(dict(state, version=CHECKPOINT_VERSION), compressed, protocol=pickle.HIGHEST_PROTOCOL)
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+
+
+def load_checkpoint(path):
+    """
+    Reads a checkpoint written by `save_checkpoint`.
+
+    Parameters
+    ----------
+    path : str
+        The checkpoint file.
+
+    Returns
+    -------
+    dict
+        The state of the optimization.
+    """
+    with gzip.open(path, 'rb') as compressed:
+        state = pickle.load(compressed)
+    if state.get('version') != CHECKPOINT_VERSION:
+        raise ValueError("%s is not a checkpoint of version %i" % (path, CHECKPOINT_VERSION))
+    return state
+
+
+def island_path(path, island):
+    """The checkpoint file of one island of a multiprocess optimization."""
+    return "%s.%i" % (path, island)
+
+
+class CheckpointObserver(object):
+    """
+    Observer that periodically writes a checkpoint of the evolutionary computation.
+
+    A checkpoint is written at the end of a generation if `interval` seconds have passed since the last one, and
+    once more when the optimization ends.
+
+    Attributes
+    ----------
+    path : str
+        The checkpoint file.
+    interval : float
+        The minimum number of seconds between two checkpoints.
+    fitness_cache : callable
+        Returns the memoised fitness values to store (optional).
+    seed : int
+        The seed of the run, stored for reference.
+    """
+    __name__ = "Checkpoint Observer"
+
+    def __init__(self, path, interval=60, fitness_cache=None, seed=None):
+        self.path = path
+        self.interval = interval
+        self.fitness_cache = fitness_cache
+        self.seed = seed
+        self._ec = None
+        self._last_checkpoint = None
+
+    def __call__(self, population, num_generations, num_evaluations, args):
+        self._ec = args['_ec']
+        now = time.time()
+        if self._last_checkpoint is None:
+            self._last_checkpoint = now
+        elif now - self._last_checkpoint >= self.interval:
+            self.write()
+            self._last_checkpoint = time.time()
+
+    def state(self):
+        ec = self._ec
+        start_time = ec._kwargs.get('start_time')
+        return {
+            'population': [(individual.candidate, individual.fitness) for individual in ec.population],
+            'archive': list(ec.archive),
+            'num_generations': ec.num_generations,
+            'num_evaluations': ec.num_evaluations,
+            'random_state': ec._random.__getstate__(),
+            'elapsed_time': None if start_time is None else time.time() - start_time,
+            'fitness_cache': None if self.fitness_cache is None else self.fitness_cache(),
+            'seed': self.seed
+        }
+
+    def write(self):
+        t = time.time()
+        save_checkpoint(self.state(), self.path)
+        logger.debug("Checkpoint written to %s in %.2f s" % (self.path, time.time() - t))
+
+    def reset(self):
+        self._ec = None
+        self._last_checkpoint = None
+
+    def end(self):
+        if self._ec is not None:
+            self.write()
+        self._ec = None
+
+
+class ResumedEvaluator(object):
+    """
+    Wraps an evaluator and returns the fitness stored in a checkpoint for the first population.
+
+    The fitness of any candidates added to the first population beyond the checkpointed ones is computed.
+    """
+
+    def __init__(self, evaluator, fitness):
+        self.evaluator = evaluator
+        self.fitness = list(fitness)
+        self.__name__ = "Resumed %s" % getattr(evaluator, '__name__', evaluator.__class__.__name__)
+
+    def __getattr__(self, item):
+        return getattr(self.evaluator, item)
+
+    def __call__(self, candidates, args):
+        if self.fitness is None:
+            return self.evaluator(candidates=candidates, args=args)
+        stored, self.fitness = self.fitness, None
+        if len(candidates) > len(stored):
+            stored += self.evaluator(candidates=candidates[len(stored):], args=args)
+        return stored
+
+
+class ResumeObserver(object):
+    """
+    Restores the counters, the archive and the random state of a checkpoint once the first population is built.
+
+    It must be the first observer, so that the evolution continues from the checkpointed state.
+    """
+    __name__ = "Resume Observer"
+
+    def __init__(self, state):
+        self.state = state
+
+    def __call__(self, population, num_generations, num_evaluations, args):
+        if self.state is None:
+            return
+        ec = args['_ec']
+        ec.archive = list(self.state['archive'])
+        ec.num_generations = self.state['num_generations']
+        ec.num_evaluations = self.state['num_evaluations']
+        ec._random.__setstate__(self.state['random_state'])
+        self.state = None
+
+    def reset(self):
+        pass
+
+    def end(self):
+        pass
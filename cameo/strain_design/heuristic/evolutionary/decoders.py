@@ -14,9 +14,121 @@
 
 from __future__ import absolute_import
 
+from ast import And, BoolOp, Expression, Name, Or
+
+import numpy as np
+from cobra.core.gene import parse_gpr
+
 from cameo.util import decompose_reaction_groups
 
-__all__ = ['ReactionSetDecoder', 'GeneSetDecoder']
+__all__ = ['ReactionSetDecoder', 'GeneSetDecoder', 'CompiledGeneReactionRules']
+
+
+def _compile_gpr(expression, bits):
+    """
+    Compile a GPR AST into a boolean program over the knockout bits of `bits`.
+
+    The program is either None (the reaction is functional whatever is knocked out), an integer (the bit of a
+    single gene) or a tuple ('and' | 'or', programs).
+    """
+    if isinstance(expression, Expression):
+        return _compile_gpr(expression.body, bits)
+    elif isinstance(expression, Name):
+        return bits.get(expression.id)
+    elif isinstance(expression, BoolOp):
+        programs = [_compile_gpr(value, bits) for value in expression.values]
+        if isinstance(expression.op, Or):
+            if any(program is None for program in programs):
+                return None
+            operator = 'or'
+        elif isinstance(expression.op, And):
+            programs = [program for program in programs if program is not None]
+            if len(programs) == 0:
+                return None
+            operator = 'and'
+        else:
+            raise TypeError("unsupported operation " + expression.op.__class__.__name__)
+        return programs[0] if len(programs) == 1 else (operator, tuple(programs))
+    elif expression is None:
+        return None
+    else:
+        raise TypeError("unsupported operation " + repr(expression))
+
+
+def _run_gpr_program(program, knockouts):
+    """Evaluate a compiled GPR for a (individuals x genes) knockout matrix; True where the reaction is lost."""
+    if isinstance(program, tuple):
+        operator, programs = program
+        # a reaction is lost if any complex subunit (and) or all isozymes (or) are lost
+        combine = np.logical_or if operator == 'and' else np.logical_and
+        result = _run_gpr_program(programs[0], knockouts)
+        for other in programs[1:]:
+            result = combine(result, _run_gpr_program(other, knockouts))
+        return result
+    return knockouts[:, program]
+
+
+class CompiledGeneReactionRules(object):
+    """
+    Gene-reaction rules compiled into boolean programs over a fixed list of genes.
+
+    Every gene gets a bit position and every rule that contains at least one of the genes is compiled once.
+    Knockout sets are evaluated for a whole population at once on a boolean (individuals x genes) matrix.
+
+    Parameters
+    ----------
+    model : cobra.Model
+        A constraint-based model.
+    genes : list
+        Gene ids; the position in the list is the bit of the gene.
+
+    Examples
+    --------
+    >>> rules = CompiledGeneReactionRules(model, ['b0351', 'b1241'])
+    >>> rules([[0, 1]])
+    [('ACALD',)]
+    """
+
+    def __init__(self, model, genes):
+        self.genes = list(genes)
+        bits = {gene_id: i for i, gene_id in enumerate(self.genes)}
+        reactions = set()
+        for gene_id in self.genes:
+            reactions.update(model.genes.get_by_id(gene_id).reactions)
+        self.reactions = []
+        self._programs = []
+        for reaction in sorted(reactions, key=lambda r: r.id):
+            program = _compile_gpr(parse_gpr(reaction.gene_reaction_rule)[0], bits)
+            if program is not None:
+                self.reactions.append(reaction.id)
+                self._programs.append(program)
+
+    def knockout_matrix(self, population):
+        """A boolean (individuals x reactions) matrix that is True where a reaction is knocked out."""
+        knockouts = np.zeros((len(population), len(self.genes)), dtype=bool)
+        for i, individual in enumerate(population):
+            knockouts[i, list(individual)] = True
+        lost = np.zeros((len(population), len(self.reactions)), dtype=bool)
+        for j, program in enumerate(self._programs):
+            lost[:, j] = _run_gpr_program(program, knockouts)
+        return lost
+
+    def __call__(self, population):
+        """
+        Parameters
+        ----------
+        population : list
+            Knockout sets given as lists of gene positions.
+
+        Returns
+        -------
+        list
+            The ids of the knocked out reactions for every knockout set.
+        """
+        if len(population) == 0:
+            return []
+        lost = self.knockout_matrix(population)
+        return [tuple(self.reactions[j] for j in np.flatnonzero(row)) for row in lost]
 
 
 class SetDecoder(object):
@@ -32,6 +144,10 @@ class SetDecoder(object):
     def __call__(self, individual, flat=False, decompose=False):
         return [[self.representation[index] for index in individual]]
 
+    def knocked_out_reactions(self, population):
+        """The ids of the reactions knocked out by every individual in `population`."""
+        return [tuple(self.representation[index] for index in individual) for individual in population]
+
 
 class ReactionSetDecoder(SetDecoder):
     """
@@ -99,6 +215,22 @@ class GeneSetDecoder(SetDecoder):
     def __init__(self, representation, model, groups=None, *args, **kwargs):
         super(GeneSetDecoder, self).__init__(representation, model, *args, **kwargs)
         self.groups = groups
+        self._rules = None
+
+    @property
+    def rules(self):
+        """The gene-reaction rules of the model compiled for the genes in the representation."""
+        if self._rules is None:
+            self._rules = CompiledGeneReactionRules(self.model, self.representation)
+        return self._rules
+
+    def knocked_out_reactions(self, population):
+        """
+        The ids of the reactions knocked out by every individual in `population`.
+
+        Gene sets with the same effect on the reactions are mapped to the same (sorted) reaction knockout set.
+        """
+        return self.rules(population)
 
     def __call__(self, individual, flat=False, decompose=False):
         """
@@ -12,17 +12,21 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import logging
+import time
+from collections import Counter, OrderedDict
 
+import numpy as np
 from cobra.exceptions import OptimizationError
+from optlang.interface import INFEASIBLE
 
-from cameo.core.manipulation import swap_cofactors
+from cameo.core.manipulation import cofactor_swap_stoichiometry
 from cameo.strain_design.heuristic.evolutionary.decoders import SetDecoder
 from cameo.strain_design.heuristic.evolutionary.objective_functions import ObjectiveFunction
 from cameo.util import ProblemCache, memoize
 
 logger = logging.getLogger(__name__)
 
-__all__ = ['KnockoutEvaluator', 'SwapEvaluator']
+__all__ = ['KnockoutEvaluator', 'SwapEvaluator', 'LethalSetIndex']
 
 
 class Evaluator(object):
@@ -56,6 +60,10 @@ class TargetEvaluator(Evaluator):
         The method use to simulate the knockouts
     simulation_kwargs : dict
         The extra parameters used by the simulation method
+    statistics : collections.Counter
+        Counts the evaluated 'candidates', the 'evaluations' that were not memoised, the 'simulations', the
+        'simulation_time' spent in the simulation method and the 'infeasible' evaluations (see
+        observers.TelemetryObserver)
 
     See Also
     --------
@@ -81,20 +89,276 @@ class TargetEvaluator(Evaluator):
         self.simulation_method = simulation_method
         self.simulation_kwargs = simulation_kwargs
         self.cache = ProblemCache(model)
+        self.statistics = Counter()
+
+    # the method whose results are memoised
+    _memoized = 'evaluate_individual'
 
     def __call__(self, population):
+        self.statistics['candidates'] += len(population)
         return [self.evaluate_individual(tuple(i)) for i in population]
 
+    def evaluate_with_statistics(self, population):
+        """
+        Evaluates a population and returns the fitness and the increase of `statistics`.
+
+        Used to collect the statistics of evaluations that run in other processes.
+        """
+        before = Counter(self.statistics)
+        fitness = self(population)
+        statistics = Counter(self.statistics)
+        statistics.subtract(before)
+        return fitness, statistics
+
     def reset(self):
         self.cache.reset()
+        self.statistics.clear()
+
+    def _run_simulation(self, reactions):
+        """Simulates the model with the simulation method, keeping track of the time spent in it."""
+        start = time.perf_counter()
+        try:
+            return self.simulation_method(self.model,
+                                          cache=self.cache,
+                                          volatile=False,
+                                          raw=True,
+                                          reactions=reactions,
+                                          **self.simulation_kwargs)
+        except OptimizationError:
+            self.statistics['infeasible'] += 1
+            raise
+        finally:
+            self.statistics['simulations'] += 1
+            self.statistics['simulation_time'] += time.perf_counter() - start
+
+    def memo_keys(self, population):
+        """The arguments of the memoised method (without the evaluator) for each individual of a population."""
+        return [(tuple(individual),) for individual in population]
+
+    def cached_fitness(self, population=None):
+        """
+        The memoised fitness values of this evaluator.
+
+        Parameters
+        ----------
+        population : list, optional
+            Only look up the fitness of these individuals (see memo_keys) instead of collecting all of them.
+
+        Returns
+        -------
+        dict
+            The fitness keyed by the arguments of the memoised method (without the evaluator).
+        """
+        memo = getattr(self, self._memoized).memo
+        if population is not None:
+            return {key: memo[(self,) + key] for key in self.memo_keys(population) if (self,) + key in memo}
+        return {args[1:]: fitness for args, fitness in list(memo.items()) if args[0] is self}
+
+    def load_cached_fitness(self, cached_fitness):
+        """
+        Adds fitness values returned by `cached_fitness` (e.g. of another process) to the memoised values.
+
+        Parameters
+        ----------
+        cached_fitness : dict
+            The fitness keyed by the arguments of the memoised method (without the evaluator).
+        """
+        memo = getattr(self, self._memoized).memo
+        memo.update(((self,) + args, fitness) for args, fitness in cached_fitness.items())
+
+
+def locality_order(knockouts):
+    """
+    Order knockout sets such that consecutive sets share as many knockouts as possible.
+
+    Greedy nearest-neighbour path through the Hamming distances of the sets, starting with the smallest set (the one
+    closest to the wild type).
+
+    Parameters
+    ----------
+    knockouts : list
+        A list of sets.
+
+    Returns
+    -------
+    list
+        The indices of `knockouts` in evaluation order.
+    """
+    if len(knockouts) <= 2:
+        return list(range(len(knockouts)))
+    elements = {element: j for j, element in enumerate(set().union(*knockouts))}
+    matrix = np.zeros((len(knockouts), len(elements)))
+    for i, knockout_set in enumerate(knockouts):
+        matrix[i, [elements[element] for element in knockout_set]] = 1
+    sizes = matrix.sum(axis=1)
+    # |a ^ b| = |a| + |b| - 2 |a & b|
+    distances = sizes[:, None] + sizes[None, :] - 2 * matrix.dot(matrix.T)
+    current = int(np.argmin(sizes))
+    order = [current]
+    distances[:, current] = np.inf
+    for _ in range(len(knockouts) - 1):
+        current = int(np.argmin(distances[current]))
+        order.append(current)
+        distances[:, current] = np.inf
+    return order
+
+
+class LethalSetIndex(object):
+    """
+    Index of minimal lethal knockout sets.
+
+    Knockouts only remove flux space, so every superset of a lethal (infeasible) knockout set is lethal as well.
+    The sets are stored as integer bitsets and only the inclusion-minimal ones are kept.
+
+    Examples
+    --------
+    >>> index = LethalSetIndex()
+    >>> index.add({'PGK', 'ENO'})
+    >>> index.is_lethal({'PGK', 'ENO', 'PFL'})
+    True
+    """
+
+    def __init__(self):
+        self._bits = {}
+        self._lethal_sets = []
+
+    def __len__(self):
+        return len(self._lethal_sets)
+
+    def _bitset(self, knockouts, extend=False):
+        bitset = 0
+        for element in knockouts:
+            bit = self._bits.get(element)
+            if bit is None:
+                if not extend:
+                    continue
+                bit = self._bits[element] = len(self._bits)
+            bitset |= 1 << bit
+        return bitset
+
+    def is_lethal(self, knockouts):
+        """True if `knockouts` contains a known lethal set."""
+        bitset = self._bitset(knockouts)
+        return any(lethal_set & bitset == lethal_set for lethal_set in self._lethal_sets)
+
+    def add(self, knockouts):
+        """Add a lethal knockout set (stored supersets of it are discarded)."""
+        bitset = self._bitset(knockouts, extend=True)
+        if any(lethal_set & bitset == lethal_set for lethal_set in self._lethal_sets):
+            return
+        self._lethal_sets = [lethal_set for lethal_set in self._lethal_sets if lethal_set & bitset != bitset]
+        self._lethal_sets.append(bitset)
+
+    def clear(self):
+        self._bits.clear()
+        self._lethal_sets = []
 
 
 class KnockoutEvaluator(TargetEvaluator):
     """
     Knockout evaluator for genes or reactions.
+
+    The evaluator keeps a pool of recently computed flux distributions indexed by their sets of knocked out
+    reactions. Knockouts only remove flux space, so if a pooled solution was computed for a subset of the knockouts
+    of a candidate and none of the remaining knocked out reactions carry flux in it, that solution is still optimal
+    and the simulation can be skipped. For the same reason, candidates that contain a knockout set which was found
+    to be infeasible before get the worst fitness without simulation. Candidates are reduced to the set of reactions
+    they knock out, so gene knockout sets with the same effect share their simulation and, unless the objective
+    function uses the targets (see ObjectiveFunction.uses_targets), their memoised fitness.
+
+    A population is evaluated in the order given by `locality_order` and only the knockouts that differ between
+    consecutive candidates are applied or reverted, which keeps the solver close to its last (warm) state.
+
+    Attributes
+    ----------
+    solution_pool_size : int
+        The number of flux distributions to keep (0 disables the reuse of solutions).
+    lethal_sets : LethalSetIndex
+        The minimal infeasible knockout sets found so far.
+    skipped_simulations : int
+        The number of simulations that were skipped because a pooled solution could be reused or the candidate
+        contains a lethal knockout set.
     """
+    _memoized = '_evaluate'
+
+    def __init__(self, model, decoder, objective_function, simulation_method, simulation_kwargs,
+                 solution_pool_size=64):
+        super(KnockoutEvaluator, self).__init__(model, decoder, objective_function, simulation_method,
+                                                simulation_kwargs)
+        self.solution_pool_size = solution_pool_size
+        self._solution_pool = OrderedDict()
+        self._monitored_reactions = None
+        self._applied_knockouts = None
+        self._original_bounds = {}
+        self.lethal_sets = LethalSetIndex()
+
+    def memo_keys(self, population):
+        population = [tuple(individual) for individual in population]
+        knockouts = self.decoder.knocked_out_reactions(population)
+        if self.objective_function.uses_targets:
+            targets = [frozenset(self.decoder(individual)[0]) for individual in population]
+        else:
+            targets = [None] * len(population)
+        return [(frozenset(reactions), individual_targets) for reactions, individual_targets in zip(knockouts, targets)]
+
+    @property
+    def skipped_simulations(self):
+        return self.statistics['skipped_simulations']
+
+    @property
+    def _reuse_solutions(self):
+        # with a relaxed optimum (pFBA) a solution of a larger flux space is not necessarily optimal anymore
+        return self.solution_pool_size > 0 and self.simulation_kwargs.get('fraction_of_optimum', 1) == 1
+
+    def _simulation_reactions(self):
+        """The reactions required by the objective function plus every reaction that can be knocked out."""
+        if self._monitored_reactions is None:
+            reactions = set(self.objective_function.reactions)
+            # knockouts are monotone, so knocking out everything yields every reaction that can be knocked out
+            reactions.update(self.decoder.knocked_out_reactions([range(len(self.decoder.representation))])[0])
+            self._monitored_reactions = list(reactions)
+        return self._monitored_reactions
+
+    def _pooled_solution(self, knockouts):
+        if knockouts in self._solution_pool:
+            self._solution_pool.move_to_end(knockouts)
+            return self._solution_pool[knockouts]
+        for reference, solution in self._solution_pool.items():
+            if reference <= knockouts and all(abs(solution.fluxes[r]) < 1e-10 for r in knockouts - reference):
+                self._solution_pool.move_to_end(reference)
+                return solution
+        return None
+
+    def _add_to_pool(self, knockouts, solution):
+        self._solution_pool[knockouts] = solution
+        while len(self._solution_pool) > self.solution_pool_size:
+            self._solution_pool.popitem(last=False)
+
+    def _simulate(self, knockouts):
+        if not self._reuse_solutions:
+            return self._run_simulation(self.objective_function.reactions)
+        solution = self._pooled_solution(knockouts)
+        if solution is not None:
+            self.statistics['skipped_simulations'] += 1
+            return solution
+        solution = self._run_simulation(self._simulation_reactions())
+        self._add_to_pool(knockouts, solution)
+        return solution
+
+    def __call__(self, population):
+        self.statistics['candidates'] += len(population)
+        keys = self.memo_keys(population)
+        fitness = [None] * len(population)
+        with self.model:
+            self._applied_knockouts = frozenset()
+            self._original_bounds = {}
+            try:
+                for i in locality_order([knockouts for knockouts, _ in keys]):
+                    fitness[i] = self._evaluate(*keys[i])
+            finally:
+                self._applied_knockouts = None
+        return fitness
 
-    @memoize
     def evaluate_individual(self, individual):
         """
         Evaluates a single individual.
@@ -111,50 +375,106 @@ class KnockoutEvaluator(TargetEvaluator):
         fitness
             A single real value or a Pareto, depending on the number of objectives.
         """
-        targets = self.decoder(individual)[0]
-        with self.model:
-            for target in targets:
-                target.knock_out()
-            try:
-                solution = self.simulation_method(self.model,
-                                                  cache=self.cache,
-                                                  volatile=False,
-                                                  raw=True,
-                                                  reactions=self.objective_function.reactions,
-                                                  **self.simulation_kwargs)
-                fitness = self.objective_function(self.model, solution, targets)
-            except OptimizationError as e:
-                logger.debug(e)
-                fitness = self.objective_function.worst_fitness()
-            return fitness
+        return self([individual])[0]
+
+    def _apply_knockouts(self, knockouts):
+        """Move the model from the currently applied knockouts to `knockouts` by changing only the difference."""
+        for reaction_id in self._applied_knockouts - knockouts:
+            self.model.reactions.get_by_id(reaction_id).bounds = self._original_bounds.pop(reaction_id)
+        for reaction_id in knockouts - self._applied_knockouts:
+            reaction = self.model.reactions.get_by_id(reaction_id)
+            self._original_bounds[reaction_id] = reaction.bounds
+            reaction.knock_out()
+        self._applied_knockouts = knockouts
+
+    @memoize
+    def _evaluate(self, knockouts, targets):
+        self.statistics['evaluations'] += 1
+        if self.lethal_sets.is_lethal(knockouts):
+            self.statistics['skipped_simulations'] += 1
+            self.statistics['infeasible'] += 1
+            return self.objective_function.worst_fitness()
+        self._apply_knockouts(knockouts)
+        try:
+            solution = self._simulate(knockouts)
+        except OptimizationError as e:
+            logger.debug(e)
+            # other failures (e.g. numerical problems or time limits) do not prove that the knockouts are lethal
+            if self.model.solver.status == INFEASIBLE:
+                self.lethal_sets.add(knockouts)
+            return self.objective_function.worst_fitness()
+        try:
+            fitness = self.objective_function(self.model, solution, knockouts if targets is None else targets)
+        except OptimizationError as e:
+            logger.debug(e)
+            fitness = self.objective_function.worst_fitness()
+        return fitness
+
+    def reset(self):
+        super(KnockoutEvaluator, self).reset()
+        self._solution_pool.clear()
+        self.lethal_sets.clear()
 
 
 class SwapEvaluator(TargetEvaluator):
-    """ Evaluate reaction swaps where we knock one reaction in favor of another """
+    """
+    Evaluate reaction swaps where we knock one reaction in favor of another.
+
+    The change in stoichiometry of each swappable reaction is computed once. Swapping the cofactors of a candidate
+    only rewrites the coefficients of its variables in the mass balance constraints of the solver (one update per
+    constraint), without going through the cobra reactions and metabolites, and the coefficients are restored
+    after the simulation.
+    """
 
     def __init__(self, swap_pair=None, *args, **kwargs):
         super(SwapEvaluator, self).__init__(*args, **kwargs)
         self.swap_pair = swap_pair
+        self._swapped_coefficients = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # the coefficients refer to solver objects, they are computed again after unpickling
+        state['_swapped_coefficients'] = {}
+        return state
+
+    def _coefficients(self, reaction):
+        """The swapped and the original coefficients of `reaction` by mass balance constraint."""
+        coefficients = self._swapped_coefficients.get(reaction.id)
+        if coefficients is None:
+            forward_variable, reverse_variable = reaction.forward_variable, reaction.reverse_variable
+            coefficients = []
+            for metabolite, delta in cofactor_swap_stoichiometry(reaction, self.swap_pair).items():
+                original = reaction.metabolites.get(metabolite, 0)
+                swapped = original + delta
+                coefficients.append((self.model.constraints[metabolite.id],
+                                     {forward_variable: swapped, reverse_variable: -swapped},
+                                     {forward_variable: original, reverse_variable: -original}))
+            self._swapped_coefficients[reaction.id] = coefficients
+        return coefficients
+
+    def _set_coefficients(self, swap_reactions, swapped):
+        updates = OrderedDict()
+        for reaction in swap_reactions:
+            for constraint, swapped_coefficients, original_coefficients in self._coefficients(reaction):
+                updates.setdefault(constraint, {}).update(swapped_coefficients if swapped else original_coefficients)
+        for constraint, coefficients in updates.items():
+            constraint.set_linear_coefficients(coefficients)
 
     @memoize
     def evaluate_individual(self, individual):
+        self.statistics['evaluations'] += 1
         swap_reactions = self.decoder(individual)[0]
-        with self.model:
-            for reaction in swap_reactions:
-                swap_cofactors(reaction, self.model, self.swap_pair, inplace=True)
-            try:
-                solution = self.simulation_method(self.model,
-                                                  cache=self.cache,
-                                                  volatile=False,
-                                                  raw=True,
-                                                  reactions=self.objective_function.reactions,
-                                                  **self.simulation_kwargs)
-                fitness = self.objective_function(self.model, solution, swap_reactions)
-            except OptimizationError as e:
-                logger.debug(e)
-                fitness = self.objective_function.worst_fitness()
-
-            return fitness
+        self._set_coefficients(swap_reactions, swapped=True)
+        try:
+            solution = self._run_simulation(self.objective_function.reactions)
+            fitness = self.objective_function(self.model, solution, swap_reactions)
+        except OptimizationError as e:
+            logger.debug(e)
+            fitness = self.objective_function.worst_fitness()
+        finally:
+            self._set_coefficients(swap_reactions, swapped=False)
+
+        return fitness
 
 
 class KnockinKnockoutEvaluator(KnockoutEvaluator):
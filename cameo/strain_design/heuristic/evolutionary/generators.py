@@ -18,7 +18,49 @@ from collections import OrderedDict
 
 from cameo.strain_design.heuristic.evolutionary.genomes import MultipleChromosomeGenome
 
-__all__ = ['set_generator']
+__all__ = ['set_generator', 'floyd_set_generator']
+
+
+def floyd_sample(random, n, k, exclude=()):
+    """
+    Samples k distinct indices from range(n) using Floyd's algorithm.
+
+    Only O(k) random numbers are drawn and no list of size n is built. Excluded indices are skipped by mapping
+    the sampled positions onto the indices that are not excluded.
+
+    Parameters
+    ----------
+    random : Random
+    n : int
+        The number of available indices.
+    k : int
+        The number of indices to sample.
+    exclude : iterable
+        Indices that cannot be sampled.
+
+    Returns
+    -------
+    list
+        k distinct indices (unordered).
+    """
+    excluded = sorted(set(exclude))
+    available = n - len(excluded)
+    if not 0 <= k <= available:
+        raise ValueError("Cannot sample %i out of %i available indices" % (k, available))
+    sample = set()
+    for j in range(available - k, available):
+        # random() works the same for random.Random and cameo.util.RandomGenerator (randint bounds differ)
+        t = int(random.random() * (j + 1))
+        sample.add(j if t in sample else t)
+
+    indices = []
+    for index in sample:
+        for excluded_index in excluded:
+            if excluded_index > index:
+                break
+            index += 1
+        indices.append(index)
+    return indices
 
 
 def set_generator(random, args):
@@ -55,6 +97,37 @@ def set_generator(random, args):
     return sorted(candidate)
 
 
+def floyd_set_generator(random, args):
+    """
+    Generates a list containing non-repeated elements of a discrete representation.
+
+    Same as set_generator, but the candidate is sampled with Floyd's algorithm in O(max_size) instead of building the
+    list of all indices in the representation.
+
+    Parameters
+    ----------
+
+    random : Random
+    args : dict
+        representation: set containing the possible values
+        max_candidate_size: int, default: 9
+        variable_candidate_size: bool, default: True
+
+    Returns
+    -------
+    list
+        A sorted list containing a sample of the indices.
+    """
+    representation = args.get('representation')
+    max_size = args.get('max_size', 9)
+    variable_size = args.get('variable_size', True)
+    if variable_size and max_size > 1:
+        size = random.randint(1, max_size)
+    else:
+        size = max_size
+    return sorted(floyd_sample(random, len(representation), size))
+
+
 def multiple_chromosome_set_generator(random, args):
     """
     Generates a candidate in with a genome containing multiple chromosomes.
@@ -0,0 +1,340 @@
+# Copyright 2016 Novo Nordisk Foundation Center for Biosustainability, DTU.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Queues used to migrate individuals between islands.
+
+A backend creates the channels of a migrator. All channels behave like bounded queues (`put_nowait` raises Full,
+`get(block=False)` raises Empty) and can be pickled, so they can be sent to the island processes.
+
+- RedisBackend: lists on a Redis server (see cameo.parallel.RedisQueue), islands can run on several machines.
+- ManagerBackend: queues served by a multiprocessing.Manager process.
+- SharedMemoryBackend: ring buffers in shared memory (Python >= 3.8), without any server process.
+- SpoolBackend: a directory per channel, one file per migrant (works on a shared file system as well).
+"""
+
+from __future__ import absolute_import, print_function
+
+import logging
+import multiprocessing
+import os
+import pickle
+import shutil
+import struct
+import tempfile
+import time
+from multiprocessing.queues import Full, Empty
+from uuid import uuid4
+
+try:
+    from cameo.parallel import RedisQueue
+except ImportError:
+    RedisQueue = None
+
+try:
+    from multiprocessing.shared_memory import SharedMemory
+except ImportError:
+    SharedMemory = None
+
+__all__ = ['SharedMemoryQueue', 'SpoolQueue', 'RedisBackend', 'ManagerBackend', 'SharedMemoryBackend',
+           'SpoolBackend', 'make_backend']
+
+logger = logging.getLogger(__name__)
+
+
+class SharedMemoryQueue(object):
+    """
+    Single-producer single-consumer ring buffer in shared memory.
+
+    The buffer has `maxsize` slots of `slot_size` bytes, each holding one pickled item. The number of items read and
+    written are kept in a header and only updated by the consumer and the producer respectively, so no lock is
+    required as long as only one process puts and only one process gets items.
+
+    Parameters
+    ----------
+    maxsize : int
+        The number of slots.
+    slot_size : int
+        The maximum size of a pickled item in bytes.
+    name : str
+        Attach to an existing buffer instead of creating one.
+    """
+    _header = struct.Struct('QQ')
+    _length = struct.Struct('I')
+
+    def __init__(self, maxsize=1, slot_size=16384, name=None):
+        if SharedMemory is None:
+            raise RuntimeError("Shared memory requires Python 3.8 or later")
+        self._maxsize = max(maxsize, 1)
+        self._slot_size = slot_size
+        if name is None:
+            size = self._header.size + self._maxsize * (self._length.size + slot_size)
+            self._memory = SharedMemory(create=True, size=size)
+            self._header.pack_into(self._memory.buf, 0, 0, 0)
+        else:
+            self._memory = SharedMemory(name=name)
+
+    @property
+    def name(self):
+        return self._memory.name
+
+    def __getstate__(self):
+        return {'maxsize': self._maxsize, 'slot_size': self._slot_size, 'name': self.name}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def __len__(self):
+        read, written = self._header.unpack_from(self._memory.buf, 0)
+        return written - read
+
+    def _offset(self, index):
+        return self._header.size + (index % self._maxsize) * (self._length.size + self._slot_size)
+
+    def put_nowait(self, item):
+        read, written = self._header.unpack_from(self._memory.buf, 0)
+        if written - read >= self._maxsize:
+            raise Full
+        data = pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self._slot_size:
+            raise ValueError("Item of %i bytes does not fit in a slot of %i bytes" % (len(data), self._slot_size))
+        offset = self._offset(written)
+        self._length.pack_into(self._memory.buf, offset, len(data))
+        start = offset + self._length.size
+        self._memory.buf[start:start + len(data)] = data
+        struct.pack_into('Q', self._memory.buf, 8, written + 1)
+
+    put = put_nowait
+
+    def get(self, block=False):
+        read, written = self._header.unpack_from(self._memory.buf, 0)
+        if written == read:
+            raise Empty
+        offset = self._offset(read)
+        length, = self._length.unpack_from(self._memory.buf, offset)
+        start = offset + self._length.size
+        item = pickle.loads(bytes(self._memory.buf[start:start + length]))
+        struct.pack_into('Q', self._memory.buf, 0, read + 1)
+        return item
+
+    def close(self):
+        self._memory.close()
+
+    def unlink(self):
+        self._memory.close()
+        self._memory.unlink()
+
+
+class SpoolQueue(object):
+    """
+    Queue stored as files in a directory.
+
+    Every item is written to its own file, which is renamed into place, and claimed by renaming it before it is read,
+    so any number of processes can put and get items.
+
+    Parameters
+    ----------
+    directory : str
+        The spool directory (created if it does not exist).
+    maxsize : int
+        The maximum number of items in the queue (0 for no limit).
+    """
+
+    def __init__(self, directory, maxsize=0):
+        self.directory = directory
+        self._maxsize = maxsize
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _items(self):
+        return sorted(name for name in os.listdir(self.directory) if not name.startswith('.'))
+
+    def __len__(self):
+        return len(self._items())
+
+    def put_nowait(self, item):
+        if 0 < self._maxsize <= len(self):
+            raise Full
+        fd, temporary_path = tempfile.mkstemp(dir=self.directory, prefix='.')
+        with os.fdopen(fd, 'wb') as item_file:
+            pickle.dump(item, item_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, os.path.join(self.directory, '%017.6f-%s' % (time.time(), uuid4().hex)))
+
+    put = put_nowait
+
+    def get(self, block=False):
+        for name in self._items():
+            claimed_path = os.path.join(self.directory, '.%s.%s' % (name, uuid4().hex))
+            try:
+                os.rename(os.path.join(self.directory, name), claimed_path)
+            except OSError:
+                # taken by another process
+                continue
+            try:
+                with open(claimed_path, 'rb') as item_file:
+                    return pickle.load(item_file)
+            finally:
+                os.remove(claimed_path)
+        raise Empty
+
+
+class RedisBackend(object):
+    """
+    Channels on a Redis server.
+
+    Parameters
+    ----------
+    connection_kwargs : keyword arguments
+        see parallel.RedisQueue
+    """
+
+    def __init__(self, **connection_kwargs):
+        if RedisQueue is None:
+            raise RuntimeError("Redis is not available")
+        self.connection_kwargs = connection_kwargs
+
+    @classmethod
+    def is_available(cls, **connection_kwargs):
+        """True if redis is installed and a server answers with the given connection arguments."""
+        if RedisQueue is None:
+            return False
+        try:
+            return RedisQueue(uuid4(), **connection_kwargs)._db.ping()
+        except Exception as e:
+            logger.debug("Redis is not available: %s" % e)
+            return False
+
+    def channel(self, maxsize):
+        return RedisQueue(uuid4(), maxsize=maxsize, **self.connection_kwargs)
+
+    def close(self):
+        pass
+
+
+class ManagerBackend(object):
+    """Channels served by a multiprocessing.Manager, started with the first channel."""
+
+    def __init__(self):
+        self._manager = None
+
+    def __getstate__(self):
+        # the manager stays with the process that started it
+        return {'_manager': None}
+
+    def channel(self, maxsize):
+        if self._manager is None:
+            self._manager = multiprocessing.Manager()
+        return self._manager.Queue(maxsize)
+
+    def close(self):
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+
+
+class SharedMemoryBackend(object):
+    """
+    Channels in shared memory (see SharedMemoryQueue).
+
+    Each channel must have a single producer and a single consumer, which is the case for the channels of a
+    migrator bound to its islands.
+
+    Parameters
+    ----------
+    slot_size : int
+        The maximum size of a pickled migrant in bytes.
+    """
+
+    def __init__(self, slot_size=16384):
+        if SharedMemory is None:
+            raise RuntimeError("Shared memory requires Python 3.8 or later")
+        self.slot_size = slot_size
+        self._channels = []
+
+    def __getstate__(self):
+        return {'slot_size': self.slot_size, '_channels': []}
+
+    def channel(self, maxsize):
+        channel = SharedMemoryQueue(maxsize, slot_size=self.slot_size)
+        self._channels.append(channel)
+        return channel
+
+    def close(self):
+        for channel in self._channels:
+            channel.unlink()
+        self._channels = []
+
+
+class SpoolBackend(object):
+    """
+    Channels in a spool directory (see SpoolQueue).
+
+    Parameters
+    ----------
+    directory : str
+        The spool directory. If None, a temporary directory is created and removed when the backend is closed.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self._temporary = directory is None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_temporary'] = False
+        return state
+
+    def channel(self, maxsize):
+        if self.directory is None:
+            self.directory = tempfile.mkdtemp(prefix='cameo-migration-')
+        return SpoolQueue(os.path.join(self.directory, uuid4().hex), maxsize=maxsize)
+
+    def close(self):
+        if self._temporary and self.directory is not None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.directory = None
+
+
+BACKENDS = {
+    'redis': RedisBackend,
+    'manager': ManagerBackend,
+    'shared_memory': SharedMemoryBackend,
+    'spool': SpoolBackend
+}
+
+
+def make_backend(backend=None, **connection_kwargs):
+    """
+    Returns a channel backend.
+
+    Parameters
+    ----------
+    backend : str or backend
+        One of 'redis', 'manager', 'shared_memory' or 'spool', or a backend instance. If None, Redis is used if
+        a server is available and otherwise a multiprocessing.Manager.
+    connection_kwargs : keyword arguments
+        Passed to the RedisBackend.
+    """
+    if backend is None:
+        backend = 'redis' if RedisBackend.is_available(**connection_kwargs) else 'manager'
+        logger.debug("Using the %s migration backend" % backend)
+    if not isinstance(backend, str):
+        return backend
+    try:
+        backend_class = BACKENDS[backend]
+    except KeyError:
+        raise ValueError("Unknown migration backend %s (use one of %s)" % (backend, ", ".join(sorted(BACKENDS))))
+    if backend_class is RedisBackend:
+        return backend_class(**connection_kwargs)
+    return backend_class()
@@ -14,34 +14,60 @@
 
 from __future__ import absolute_import, print_function
 
-try:
-    from cameo.parallel import RedisQueue
-except ImportError:
-    RedisQueue = None
-from uuid import uuid4
+import copy
 from multiprocessing.queues import Full, Empty
 
 import logging
 
-__all__ = ['MultiprocessingMigrator']
+from cameo.strain_design.heuristic.evolutionary.multiprocess.channels import make_backend
+
+__all__ = ['MultiprocessingMigrator', 'ring_topology', 'star_topology', 'fully_connected_topology']
 
 
 logger = logging.getLogger(__name__)
 
 
+def ring_topology(number_of_islands):
+    """Every island sends migrants to the next one."""
+    if number_of_islands < 2:
+        return []
+    return [(i, (i + 1) % number_of_islands) for i in range(number_of_islands)]
+
+
+def star_topology(number_of_islands):
+    """The first island exchanges migrants with every other island."""
+    return [edge for i in range(1, number_of_islands) for edge in ((0, i), (i, 0))]
+
+
+def fully_connected_topology(number_of_islands):
+    """Every island exchanges migrants with every other island."""
+    return [(i, j) for i in range(number_of_islands) for j in range(number_of_islands) if i != j]
+
+
+TOPOLOGIES = {
+    'ring': ring_topology,
+    'star': star_topology,
+    'fully_connected': fully_connected_topology
+}
+
+
 class MultiprocessingMigrator(object):
-    """Migrate among processes on multiple machines. This is possible by
-    having a Queue implemented on redis.
+    """Migrate among processes on one or multiple machines.
 
     This callable class allows individuals to migrate from one process
-    to another. It maintains a queue of migrants whose maximum length
-    can be fixed via the ``max_migrants`` parameter in the constructor.
-    If the number of migrants in the queue reaches this value, new migrants
-    are not added until earlier ones are consumed. The unreliability of a
-    multiprocessing environment makes it difficult to provide guarantees.
-    However, migrants are theoretically added and consumed at the same rate,
-    so this value should determine the "freshness" of individuals, where
-    smaller queue sizes provide more recency.
+    to another. Migrants travel through bounded queues (channels) whose
+    maximum length can be fixed via the ``max_migrants`` parameter in the
+    constructor. If a channel is full, new migrants are not added until
+    earlier ones are consumed. The unreliability of a multiprocessing
+    environment makes it difficult to provide guarantees. However, migrants
+    are theoretically added and consumed at the same rate, so this value
+    should determine the "freshness" of individuals, where smaller queue
+    sizes provide more recency.
+
+    Before the islands are started, ``connect`` creates one channel for each
+    connection of the topology and each island gets a copy of the migrator
+    bound to it (see ``for_island``). A migrator that is not bound to an
+    island uses a single channel shared by all populations (``migrants``).
 
     An optional keyword argument in ``args`` requires the migrant to be
     evaluated by the current evolutionary computation before being inserted
@@ -49,9 +75,9 @@ class MultiprocessingMigrator(object):
     use different evaluation functions and you need to be able to compare
     "apples with apples," so to speak.
 
-    The migration takes the current individual *I* out of the queue, if
-    one exists. It then randomly chooses an individual *E* from the population
-    to insert into the queue. Finally, if *I* exists, it replaces *E* in the
+    The migration takes the current individual *I* out of an incoming channel,
+    if one exists. It then randomly chooses an individual *E* from the population
+    to insert into an outgoing channel. Finally, if *I* exists, it replaces *E* in the
     population (re-evaluating fitness if necessary). Otherwise, *E* remains in
     the population and also exists in the queue as a migrant.
 
@@ -63,23 +89,114 @@ class MultiprocessingMigrator(object):
     Parameters
     ----------
     max_migrants: int
-        Number of migrants in the queue at the same time.
+        Number of migrants in a channel at the same time.
+    backend: str or backend
+        'redis', 'manager', 'shared_memory', 'spool' or a backend instance (see multiprocess.channels). By default
+        Redis is used if a server is available, otherwise queues of a multiprocessing.Manager.
+    topology: str or callable
+        'ring', 'star', 'fully_connected' (default) or a function returning the (source, target) connections for a
+        number of islands.
+    migration_interval: int
+        Migrate every `migration_interval` generations (default 1).
     connection_kwargs: keyword arguments:
         see parallel.RedisQueue
 
     """
 
-    def __init__(self, max_migrants=1, **connection_kwargs):
+    def __init__(self, max_migrants=1, backend=None, topology='fully_connected', migration_interval=1,
+                 **connection_kwargs):
         self.max_migrants = max_migrants
-        self.migrants = RedisQueue(uuid4(), **connection_kwargs)
+        self.backend = make_backend(backend, **connection_kwargs)
+        if not callable(topology):
+            try:
+                topology = TOPOLOGIES[topology]
+            except KeyError:
+                raise ValueError("Unknown topology %s (use one of %s)" % (topology, ", ".join(sorted(TOPOLOGIES))))
+        self.topology = topology
+        self.migration_interval = migration_interval
+        self.island = None
+        self._channels = None
+        self._migrants = None
+        self._calls = 0
         self.__name__ = self.__class__.__name__
 
+    @property
+    def migrants(self):
+        """The channel shared by all populations when the migrator is not bound to an island."""
+        if self._migrants is None:
+            self._migrants = self.backend.channel(self.max_migrants)
+        return self._migrants
+
+    def connect(self, number_of_islands):
+        """
+        Creates the channels between the islands.
+
+        Parameters
+        ----------
+        number_of_islands: int
+            The number of islands.
+        """
+        self._channels = [(source, target, self.backend.channel(self.max_migrants))
+                          for source, target in self.topology(number_of_islands)]
+
+    def for_island(self, island):
+        """
+        A copy of this migrator that exchanges migrants between `island` and its neighbours.
+
+        Parameters
+        ----------
+        island: int
+            The index of the island.
+        """
+        if self._channels is None:
+            raise RuntimeError("The migrator must be connected before it can be bound to an island")
+        migrator = copy.copy(self)
+        migrator.island = island
+        return migrator
+
+    def close(self):
+        """Releases the channels."""
+        self._channels = None
+        self._migrants = None
+        self.backend.close()
+
+    def _incoming(self):
+        if self.island is None:
+            return [self.migrants]
+        return [channel for _, target, channel in self._channels if target == self.island]
+
+    def _outgoing(self):
+        if self.island is None:
+            return [self.migrants]
+        return [channel for source, _, channel in self._channels if source == self.island]
+
+    def _receive(self, random):
+        incoming = self._incoming()
+        if len(incoming) > 1:
+            random.shuffle(incoming)
+        for channel in incoming:
+            try:
+                return channel.get(block=False)
+            except Empty:
+                continue
+        raise Empty
+
+    def _send(self, random, migrant):
+        outgoing = self._outgoing()
+        if len(outgoing) == 0:
+            return
+        channel = outgoing[0] if len(outgoing) == 1 else random.choice(outgoing)
+        channel.put_nowait(migrant)
+
     def __call__(self, random, population, args):
+        self._calls += 1
+        if self._calls % self.migration_interval != 0:
+            return population
         evaluate_migrant = args.setdefault('evaluate_migrant', False)
         migrant_index = random.randint(0, len(population) - 1)
         old_migrant = population[migrant_index]
         try:
-            migrant = self.migrants.get(block=False)
+            migrant = self._receive(random)
             logger.debug("Robinson Crusoe arrives on an island")
             if evaluate_migrant:
                 fit = args["_ec"].evaluator([migrant.candidate], args)
@@ -90,7 +207,7 @@ class MultiprocessingMigrator(object):
             logger.debug("Empty queue")
         try:
             logger.debug("Robinson Crusoe leaves an island")
-            self.migrants.put_nowait(old_migrant)
+            self._send(random, old_migrant)
         except Full:
             logger.debug("Full queue")
         return population
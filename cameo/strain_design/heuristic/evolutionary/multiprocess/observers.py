@@ -14,29 +14,32 @@
 
 from __future__ import absolute_import, print_function
 
-from threading import Thread
+import time
+from threading import Event, Thread
 
 from multiprocessing.queues import Empty
 
-from uuid import uuid4
-
+import numpy
 from blessings import Terminal
 
-try:
-    from cameo.parallel import RedisQueue
-except ImportError:
-    RedisQueue = None
 from IProgress.progressbar import ProgressBar
 from IProgress.widgets import Percentage, Bar
 
-__all__ = ['CliMultiprocessProgressObserver', 'IPythonNotebookMultiprocessProgressObserver']
+from cameo.strain_design.heuristic.evolutionary.multiprocess.channels import SharedMemory, make_backend
+from cameo.strain_design.heuristic.evolutionary.observers import (TELEMETRY_COUNTERS, TelemetryWriter,
+                                                                  telemetry_record, telemetry_sample)
+
+__all__ = ['CliMultiprocessProgressObserver', 'IPythonNotebookMultiprocessProgressObserver',
+           'MultiprocessTelemetryObserver']
 
 
 class AbstractParallelObserver(object):
     def __init__(self, number_of_islands=None, *args, **kwargs):
         assert isinstance(number_of_islands, int)
         super(AbstractParallelObserver, self).__init__()
-        self.queue = RedisQueue(name=str(uuid4()), namespace=self.__name__)
+        # messages go through Redis if a server is available, otherwise through a multiprocessing.Manager queue
+        self._backend = make_backend()
+        self.queue = self._backend.channel(0)
         self.clients = {}
         self.run = True
         self.t = None
@@ -77,6 +80,10 @@ class AbstractParallelObserver(object):
         Stops the observer. The observer will not report anything else from the optimization.
         """
         self.run = False
+        if self.t is not None:
+            self.t.join()
+            self.t = None
+        self._backend.close()
 
 
 class AbstractParallelObserverClient(object):
@@ -92,6 +99,9 @@ class AbstractParallelObserverClient(object):
     def reset(self):
         pass
 
+    def end(self):
+        pass
+
 
 class CliMultiprocessProgressObserver(AbstractParallelObserver):
     """
@@ -212,3 +222,114 @@ class IPythonNotebookMultiprocessProgressObserverClient(AbstractParallelObserver
 
     def reset(self):
         pass
+
+
+class MultiprocessTelemetryObserver(object):
+    """
+    Telemetry for multiprocess Heuristic Optimization (see observers.TelemetryObserver).
+
+    The client of each island stores the latest counters of the island in its row of an array in shared memory, so
+    observing a generation does not send any message. Every `interval` seconds the rows are sampled and one record
+    per island is added to `records` and written to `path` (optional).
+
+    Attributes
+    ----------
+    path : str
+        A JSON lines or CSV file (see observers.TelemetryWriter).
+    interval : float
+        The number of seconds between two samples.
+    records : list
+        The records so far.
+    """
+
+    __name__ = "Multiprocess Telemetry Observer"
+
+    def __init__(self, number_of_islands=None, path=None, interval=5., format=None):
+        assert isinstance(number_of_islands, int)
+        if SharedMemory is None:
+            raise RuntimeError("Shared memory requires Python 3.8 or later")
+        self.path = path
+        self.interval = interval
+        self.records = []
+        self._writer = None if path is None else TelemetryWriter(path, format)
+        shape = (number_of_islands, len(TELEMETRY_COUNTERS))
+        self._memory = SharedMemory(create=True, size=int(numpy.prod(shape)) * 8)
+        self._counters = numpy.ndarray(shape, dtype=float, buffer=self._memory.buf)
+        self._counters[:] = 0
+        self._previous = None
+        self._stop = Event()
+        self.t = None
+        self.clients = {i: MultiprocessTelemetryObserverClient(index=i, name=self._memory.name, shape=shape)
+                        for i in range(number_of_islands)}
+
+    def _listen(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        samples = self._counters.copy()
+        records = []
+        for island, sample in enumerate(samples):
+            # the time is 0 until the island observed its first generation
+            if sample[0] == 0:
+                continue
+            previous = None if self._previous is None or self._previous[island][0] == 0 else self._previous[island]
+            records.append(telemetry_record(sample, previous, island=island))
+        self._previous = samples
+        self.records += records
+        if self._writer is not None and len(records) > 0:
+            self._writer.write(records)
+
+    def start(self):
+        self._stop.clear()
+        self.t = Thread(target=self._listen)
+        self.t.start()
+
+    def finish(self):
+        self._stop.set()
+        if self.t is not None:
+            self.t.join()
+            self.t = None
+        self.sample()
+        if self._writer is not None:
+            self._writer.close()
+        self._counters = None
+        self._memory.close()
+        self._memory.unlink()
+
+
+class MultiprocessTelemetryObserverClient(object):
+    __name__ = "Multiprocess Telemetry Observer"
+
+    def __init__(self, index=None, name=None, shape=None):
+        assert isinstance(index, int)
+        self.index = index
+        self.name = name
+        self.shape = shape
+        self._memory = None
+        self._counters = None
+        self._start_time = None
+
+    def __getstate__(self):
+        return {'index': self.index, 'name': self.name, 'shape': self.shape}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def __call__(self, population, num_generations, num_evaluations, args):
+        if self._counters is None:
+            self._memory = SharedMemory(name=self.name)
+            self._counters = numpy.ndarray(self.shape, dtype=float, buffer=self._memory.buf)
+        if self._start_time is None:
+            self._start_time = time.time()
+        self._counters[self.index] = telemetry_sample(args['_ec'], self._start_time)
+
+    def reset(self):
+        # called when the island starts
+        self._start_time = time.time()
+
+    def end(self):
+        if self._memory is not None:
+            self._counters = None
+            self._memory.close()
+            self._memory = None
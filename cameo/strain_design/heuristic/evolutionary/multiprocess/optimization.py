@@ -24,10 +24,12 @@ from cameo import util
 from cameo.flux_analysis.simulation import pfba
 from cobra.flux_analysis import find_essential_genes, find_essential_reactions
 from cameo.strain_design.heuristic.evolutionary import ReactionKnockoutOptimization, GeneKnockoutOptimization
+from cameo.strain_design.heuristic.evolutionary import checkpoints
 from cameo.strain_design.heuristic.evolutionary.multiprocess.migrators import MultiprocessingMigrator
 from cameo.strain_design.heuristic.evolutionary.multiprocess.observers import \
     IPythonNotebookMultiprocessProgressObserver, \
-    CliMultiprocessProgressObserver
+    CliMultiprocessProgressObserver, \
+    MultiprocessTelemetryObserver
 from cameo.strain_design.heuristic.evolutionary.multiprocess.plotters import \
     IPythonNotebookBokehMultiprocessPlotObserver
 from cameo.strain_design.heuristic.evolutionary.optimization import TargetOptimizationResult, HeuristicOptimization
@@ -46,10 +48,10 @@ class MultiprocessRunner(object):
         The class to be used when building the island process
     init_kwargs: dict
         The island_class constructor arguments.
-    migrator: Queue (supporting multiprocess)
-        The queue used to migrate individuals between islands
+    migrator: MultiprocessingMigrator
+        The (connected) migrator used to migrate individuals between islands
     run_kwargs: dict
-        The arguments necessary to run the island
+        The arguments necessary to run the island (checkpoint files get the island index as suffix)
     """
 
     def __init__(self, island_class, init_kwargs, migrator, run_kwargs):
@@ -58,11 +60,17 @@ class MultiprocessRunner(object):
         self.migrator = migrator
         self.run_kwargs = run_kwargs
 
-    def __call__(self, clients):
+    def __call__(self, island_clients):
+        index, clients = island_clients
         island = self.island_class(**self.init_kwargs)
-        island.migrator = self.migrator
+        island.migrator = self.migrator.for_island(index)
         island.observers = clients
-        return island.run(**self.run_kwargs)
+        run_kwargs = dict(self.run_kwargs)
+        # every island has its own checkpoint
+        for key in ('checkpoint', 'resume_from'):
+            if run_kwargs.get(key) is not None:
+                run_kwargs[key] = checkpoints.island_path(run_kwargs[key], index)
+        return island.run(**run_kwargs)
 
 
 class MultiprocessHeuristicOptimization(HeuristicOptimization):
@@ -81,19 +89,24 @@ class MultiprocessHeuristicOptimization(HeuristicOptimization):
     max_migrants: int
         The number of individuals travelling between islands (different processes) at the same time (default: 1).
     migrator: MultiprocessingMigrator
-        If None, it will try to initialize on localhost.
+        If None, it will use Redis on localhost if a server is available, otherwise local queues.
+    topology: str or callable
+        How the islands are connected if no migrator is given: 'ring', 'star' or 'fully_connected' (default).
+    migration_interval: int
+        The number of generations between migrations if no migrator is given (default: 1).
 
     """
     _island_class = None
 
     def __init__(self, model=None, objective_function=None, heuristic_method=inspyred.ec.GA, max_migrants=1,
-                 migrator=None, *args, **kwargs):
+                 migrator=None, topology='fully_connected', migration_interval=1, *args, **kwargs):
         super(MultiprocessHeuristicOptimization, self).__init__(*args, **kwargs)
         self.model = model
         self.objective_function = objective_function
         self.heuristic_method = heuristic_method
         if migrator is None:
-            migrator = MultiprocessingMigrator(max_migrants)
+            migrator = MultiprocessingMigrator(max_migrants, topology=topology,
+                                               migration_interval=migration_interval)
         self.migrator = migrator
         self.observers = []
 
@@ -101,7 +114,8 @@ class MultiprocessHeuristicOptimization(HeuristicOptimization):
         return {
             'model': self.model,
             'objective_function': self.objective_function,
-            'heuristic_method': self.heuristic_method
+            # the islands create their own instance of the heuristic method
+            'heuristic_method': type(self.heuristic_method)
         }
 
     def run(self, view=config.default_view, number_of_islands=None, **run_kwargs):
@@ -109,12 +123,15 @@ class MultiprocessHeuristicOptimization(HeuristicOptimization):
             number_of_islands = len(view)
         run_kwargs['view'] = parallel.SequentialView()
         runner = MultiprocessRunner(self._island_class, self._init_kwargs(), self.migrator, run_kwargs)
-        clients = [[o.clients[i] for o in self.observers] for i in range(number_of_islands)]
+        clients = [(i, [o.clients[i] for o in self.observers]) for i in range(number_of_islands)]
+        self.migrator.connect(number_of_islands)
         try:
             results = view.map(runner, clients)
         except KeyboardInterrupt as e:
             view.shutdown()
             raise e
+        finally:
+            self.migrator.close()
         return results
 
 
@@ -166,17 +183,44 @@ class MultiprocessKnockoutOptimization(MultiprocessHeuristicOptimization):
 
         return observers
 
-    def run(self, view=config.default_view, number_of_islands=None, **kwargs):
+    def run(self, view=config.default_view, number_of_islands=None, telemetry=None, telemetry_interval=5, **kwargs):
+        """
+        Runs the islands.
+
+        Parameters
+        ----------
+        view : cameo.parallel.SequentialView, cameo.parallel.MultiprocessingView
+            The view the islands run on.
+        number_of_islands : int
+            The number of islands (default: the size of the view).
+        telemetry : str
+            A JSON lines or CSV file to write telemetry records of the islands to (see
+            MultiprocessTelemetryObserver).
+        telemetry_interval : float
+            The number of seconds between two telemetry samples.
+        kwargs : dict
+            Passed to the run method of the islands.
+
+        Returns
+        -------
+        TargetOptimizationResult
+            The merged results of the islands.
+        """
         if number_of_islands is None:
             number_of_islands = len(view)
         self.observers = self._set_observers(number_of_islands)
+        if telemetry is not None:
+            self.observers.append(MultiprocessTelemetryObserver(number_of_islands=number_of_islands, path=telemetry,
+                                                                interval=telemetry_interval))
         for observer in self.observers:
             observer.start()
 
-        results = MultiprocessHeuristicOptimization.run(self, view=view, number_of_islands=number_of_islands, **kwargs)
-
-        for observer in self.observers:
-            observer.finish()
+        try:
+            results = MultiprocessHeuristicOptimization.run(self, view=view, number_of_islands=number_of_islands,
+                                                            **kwargs)
+        finally:
+            for observer in self.observers:
+                observer.finish()
 
         return reduce(TargetOptimizationResult.__iadd__, results)
 
@@ -15,13 +15,19 @@
 
 from __future__ import absolute_import, print_function
 
+import weakref
+
 import numpy as np
 from inspyred.ec.emo import Pareto
+from optlang.interface import OPTIMAL, UNBOUNDED
+from optlang.symbolics import Zero
 
-from cameo import config, flux_variability_analysis
+from cameo import config
 from cobra import Reaction
+from cobra.exceptions import OptimizationError
+from cobra.util import get_context
 
-__all__ = ['biomass_product_coupled_yield', 'product_yield', 'number_of_knockouts']
+__all__ = ['biomass_product_coupled_yield', 'product_yield', 'number_of_knockouts', 'CompiledObjectiveFunction']
 
 
 class ObjectiveFunction(object):
@@ -35,11 +41,29 @@ class ObjectiveFunction(object):
     -------
     __call__(model, solution, decoded_representation)
         Calculates the fitness of the solution
+    compile(model)
+        Binds the objective function to a model to calculate the fitness of many solutions at once
+
+    Attributes
+    ----------
+    uses_targets : bool
+        False if the fitness only depends on the solution and not on the decoded representation (the targets).
 
     """
+    uses_targets = True
 
     def __init__(self, *args, **kwargs):
         super(ObjectiveFunction, self).__init__(*args, **kwargs)
+        self._compiled = weakref.WeakKeyDictionary()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_compiled', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._compiled = weakref.WeakKeyDictionary()
 
     def __call__(self, model, solution, decoded_representation):
         raise NotImplementedError
@@ -76,6 +100,144 @@ class ObjectiveFunction(object):
     def __len__(self):
         return 1
 
+    def compile(self, model):
+        """
+        Binds the objective function to a model.
+
+        Parameters
+        ----------
+        model: cobra.Model
+            The model the fluxes come from.
+
+        Returns
+        -------
+        CompiledObjectiveFunction
+            Evaluates the fitness of many flux vectors at once.
+        """
+        raise NotImplementedError("%s cannot be compiled" % self.name)
+
+
+class CompiledObjectiveFunction(object):
+    """
+    An objective function bound to a model that evaluates a batch of solutions at once.
+
+    Reactions are resolved and carbon weights computed when compiling, so calling it only runs vectorised
+    expressions over a flux matrix with one row per solution and one column per reaction in `reactions`.
+
+    Attributes
+    ----------
+    reactions: list
+        The reaction ids that correspond to the columns of the flux matrix.
+    indices: list
+        The positions of the reactions in the model (when compiling).
+
+    Methods
+    -------
+    __call__(fluxes, targets=None)
+        The fitness of each row (a vector), or a matrix with one column per objective for multiple objectives.
+    """
+
+    def __init__(self, reactions, indices):
+        self.reactions = list(reactions)
+        self.indices = np.asarray(indices, dtype=int)
+
+    def __call__(self, fluxes, targets=None):
+        fluxes = np.asarray(fluxes, dtype=float)
+        if fluxes.ndim == 1:
+            fluxes = fluxes[np.newaxis, :]
+        return self._evaluate(fluxes, targets)
+
+    def _evaluate(self, fluxes, targets):
+        raise NotImplementedError
+
+    def __len__(self):
+        return 1
+
+    def flux_matrix(self, solutions):
+        """
+        Collects the fluxes of the compiled reactions.
+
+        Parameters
+        ----------
+        solutions: list or numpy.ndarray
+            Solutions with a `fluxes` attribute (e.g. cobra.Solution), or a matrix with one row per solution and one
+            column per reaction of the model.
+
+        Returns
+        -------
+        numpy.ndarray
+            One row per solution.
+        """
+        if isinstance(solutions, np.ndarray):
+            return solutions[:, self.indices]
+        fluxes = np.zeros((len(solutions), len(self.reactions)))
+        for i, solution in enumerate(solutions):
+            fluxes[i] = [solution.fluxes[reaction_id] for reaction_id in self.reactions]
+        return fluxes
+
+
+class _CompiledYield(CompiledObjectiveFunction):
+    """
+    Kernel of the yield functions: (v[biomass] *) C(v[product]) / sum(C(|v[substrate]|)).
+
+    `product_weight` and `substrate_weights` are the carbon weights (1 if carbon_yield is False). Only the fitness is
+    rounded to config.ndecimals.
+    """
+
+    def __init__(self, reactions, indices, product_weight, substrate_weights, biomass_coupled):
+        super(_CompiledYield, self).__init__(reactions, indices)
+        self.product_weight = product_weight
+        self.substrate_weights = np.asarray(substrate_weights, dtype=float)
+        self.biomass_coupled = biomass_coupled
+
+    def _evaluate(self, fluxes, targets):
+        offset = 1 if self.biomass_coupled else 0
+        product_flux = fluxes[:, offset] * self.product_weight
+        substrate_flux = np.abs(fluxes[:, offset + 1:]).dot(self.substrate_weights)
+        valid = substrate_flux > config.non_zero_flux_threshold
+        fitness = np.zeros(len(fluxes))
+        with np.errstate(invalid='ignore'):
+            fitness[valid] = product_flux[valid] / substrate_flux[valid]
+            if self.biomass_coupled:
+                fitness[valid] *= fluxes[valid, 0]
+        return np.round(fitness, config.ndecimals)
+
+
+class _CompiledNumberOfKnockouts(CompiledObjectiveFunction):
+    def __init__(self, sense):
+        super(_CompiledNumberOfKnockouts, self).__init__([], [])
+        self.sense = sense
+
+    def _evaluate(self, fluxes, targets):
+        sizes = np.array([len(t) for t in targets], dtype=float)
+        if self.sense == 'max':
+            return sizes
+        fitness = np.full(len(sizes), np.inf)
+        fitness[sizes > 0] = np.round(1.0 / sizes[sizes > 0], config.ndecimals)
+        return fitness
+
+
+class _CompiledMultiObjectiveFunction(CompiledObjectiveFunction):
+    def __init__(self, objectives):
+        reactions = []
+        indices = []
+        for objective in objectives:
+            for reaction_id, index in zip(objective.reactions, objective.indices):
+                if reaction_id not in reactions:
+                    reactions.append(reaction_id)
+                    indices.append(index)
+        super(_CompiledMultiObjectiveFunction, self).__init__(reactions, indices)
+        self.objectives = objectives
+        self.columns = [[reactions.index(reaction_id) for reaction_id in objective.reactions]
+                        for objective in objectives]
+
+    def _evaluate(self, fluxes, targets):
+        return np.column_stack([objective(fluxes[:, columns], targets)
+                                for objective, columns in zip(self.objectives, self.columns)])
+
+    def __len__(self):
+        return len(self.objectives)
+
 
 class MultiObjectiveFunction(ObjectiveFunction):
     def __init__(self, objectives, *args, **kwargs):
@@ -94,6 +256,10 @@ class MultiObjectiveFunction(ObjectiveFunction):
     def __getitem__(self, item):
         return self.objectives[item]
 
+    @property
+    def uses_targets(self):
+        return any(objective.uses_targets for objective in self.objectives)
+
     def __call__(self, model, solution, targets):
         return Pareto(values=[o(model, solution, targets) for o in self.objectives])
 
@@ -107,6 +273,9 @@ class MultiObjectiveFunction(ObjectiveFunction):
     def __len__(self):
         return len(self.objectives)
 
+    def compile(self, model):
+        return _CompiledMultiObjectiveFunction([objective.compile(model) for objective in self.objectives])
+
     @property
     def name(self):
         return "MO: " + "|".join([of.name for of in self.objectives])
@@ -116,6 +285,10 @@ class MultiObjectiveFunction(ObjectiveFunction):
 
 
 class YieldFunction(ObjectiveFunction):
+    # the first reaction is the biomass reaction
+    _biomass_coupled = False
+    uses_targets = False
+
     def __init__(self, product, substrates, carbon_yield=False, *args, **kwargs):
         super(YieldFunction, self).__init__(*args, **kwargs)
         self.carbon_yield = carbon_yield
@@ -158,6 +331,34 @@ class YieldFunction(ObjectiveFunction):
         else:
             return -np.inf
 
+    def _kernel(self, model):
+        """The compiled yield of the model (compiled once per model object)."""
+        if model is None:
+            # without carbon yield the fluxes are all that is needed
+            return self._compile_yield(None)
+        kernel = self._compiled.get(model)
+        if kernel is None:
+            kernel = self._compiled[model] = self._compile_yield(model)
+        return kernel
+
+    def _compile_yield(self, model):
+        weights = [1.] * len(self.reactions)
+        indices = []
+        if model is not None:
+            reactions = [model.reactions.get_by_id(reaction_id) for reaction_id in self.reactions]
+            indices = [model.reactions.index(reaction) for reaction in reactions]
+            if self.carbon_yield:
+                weights = [n_carbon(reaction) if reaction.boundary else n_carbon(reaction) / 2
+                           for reaction in reactions]
+        elif self.carbon_yield:
+            raise ValueError("%s needs a model to compute the carbon yield" % self.name)
+        offset = 1 if self._biomass_coupled else 0
+        return _CompiledYield(self.reactions, indices, weights[offset], weights[offset + 1:], self._biomass_coupled)
+
+    def _evaluate(self, model, solution):
+        kernel = self._kernel(model)
+        return float(kernel(kernel.flux_matrix([solution]))[0])
+
 
 class biomass_product_coupled_yield(YieldFunction):
     """
@@ -183,6 +384,7 @@ class biomass_product_coupled_yield(YieldFunction):
     platform for in silico metabolic engineering". BMC Bioinformatics, 6, 308.
     doi:10.1186/1471-2105-6-308
     """
+    _biomass_coupled = True
 
     def __init__(self, biomass, product, substrate, carbon_yield=False, *args, **kwargs):
         super(biomass_product_coupled_yield, self).__init__(product, substrate,
@@ -192,28 +394,10 @@ class biomass_product_coupled_yield(YieldFunction):
         self.biomass = biomass
 
     def __call__(self, model, solution, targets):
-        biomass_flux = round(solution.fluxes[self.biomass], config.ndecimals)
-        if self.carbon_yield:
-            product = model.reaction.get_by_id(self.product)
-            if product.boundary:
-                product_flux = round(solution.fluxes[self.product], config.ndecimals) * n_carbon(product)
-            else:
-                product_flux = round(solution.fluxes[self.product], config.ndecimals) * n_carbon(product) / 2
-            substrate_flux = 0
-            for substrate_id in self.substrates:
-                substrate = model.reactions.get_by_id(substrate_id)
-                if substrate.boundary:
-                    substrate_flux += abs(solution.fluxes[substrate_id]) * n_carbon(substrate)
-                else:
-                    substrate_flux += abs(solution.fluxes[substrate_id]) * n_carbon(substrate) / 2
-            substrate_flux = round(substrate_flux, config.ndecimals)
-        else:
-            product_flux = round(solution.fluxes[self.product], config.ndecimals)
-            substrate_flux = round(sum(abs(solution.fluxes[s]) for s in self.substrates), config.ndecimals)
-        if substrate_flux > config.non_zero_flux_threshold:
-            return (biomass_flux * product_flux) / substrate_flux
-        else:
-            return 0.
+        return self._evaluate(model, solution)
+
+    def compile(self, model):
+        return self._kernel(model)
 
     def _repr_latex_(self):
         if self.carbon_yield:
@@ -261,31 +445,53 @@ class biomass_product_coupled_min_yield(biomass_product_coupled_yield):
     """
 
     def __call__(self, model, solution, targets):
-        biomass_flux = round(solution.fluxes[self.biomass], config.ndecimals)
-        fva_res = flux_variability_analysis(model, reactions=[self.product], fraction_of_optimum=1)
-        min_product_flux = round(fva_res["lower_bound"][self.product], config.ndecimals)
-        if self.carbon_yield:
-            product = model.reactions.get_by_id(self.product)
-            if product.boundary:
-                product_flux = min_product_flux * n_carbon(product)
-            else:
-                product_flux = min_product_flux * n_carbon(product) / 2
-            substrate_flux = 0
-            for substrate_id in self.substrates:
-                substrate = model.reactions.get_by_id(substrate_id)
-                if substrate.boundary:
-                    substrate_flux += abs(solution.fluxes[substrate_id]) * n_carbon(substrate)
-                else:
-                    substrate_flux += abs(solution.fluxes[substrate_id]) * n_carbon(substrate) / 2
-            substrate_flux = round(substrate_flux, config.ndecimals)
-        else:
-            product_flux = min_product_flux
-            substrate_flux = sum(round(abs(solution.fluxes[s]), config.ndecimals) for s in self.substrates)
+        kernel = self._kernel(model)
+        fluxes = kernel.flux_matrix([solution])
+        fluxes[0, 1] = self._min_product_flux(model, fluxes[0, 0])
+        return float(kernel(fluxes)[0])
+
+    def compile(self, model):
+        raise NotImplementedError("%s needs an LP per solution and cannot be compiled" % self.name)
 
+    def _min_product_flux(self, model, biomass_flux):
+        """
+        Minimizes the product flux with the biomass flux fixed to the flux of the simulated solution.
+
+        A single LP in the model as it is (with the knockouts applied). The constraint on the biomass flux is added
+        to the model context (of the evaluator), where it is left unbounded between evaluations and reused until the
+        context is left. Without a model context it is removed again after the LP.
+        """
+        biomass = model.reactions.get_by_id(self.biomass)
+        product = model.reactions.get_by_id(self.product)
+        name = "biomass_product_coupled_min_yield_%s" % self.biomass
+        if name in model.solver.constraints:
+            constraint = model.solver.constraints[name]
+        else:
+            constraint = model.problem.Constraint(Zero, name=name)
+            model.add_cons_vars(constraint)
+            constraint.set_linear_coefficients({biomass.forward_variable: 1., biomass.reverse_variable: -1.})
+
+        objective = model.solver.objective
+        # refresh the cached expression of the objective, it is restored from it
+        objective.expression
+        min_objective = model.problem.Objective(Zero, direction='min')
         try:
-            return (biomass_flux * product_flux) / substrate_flux
-        except ZeroDivisionError:
-            return 0.0
+            model.solver.objective = min_objective
+            min_objective.set_linear_coefficients({product.forward_variable: 1., product.reverse_variable: -1.})
+            # relax the biomass flux to the precision of the fitness if it is (numerically) infeasible
+            for lower_bound in (biomass_flux, biomass_flux - 10 ** -config.ndecimals):
+                constraint.lb = lower_bound
+                status = model.solver.optimize()
+                if status == OPTIMAL:
+                    return min_objective.value
+                elif status == UNBOUNDED:
+                    return -np.inf
+            raise OptimizationError("Minimizing %s with fixed biomass is %s" % (self.product, status))
+        finally:
+            constraint.lb = None
+            model.solver.objective = objective
+            if get_context(model) is None:
+                model.remove_cons_vars(constraint)
 
     def _repr_latex_(self):
         if self.carbon_yield:
@@ -332,27 +538,10 @@ class product_yield(YieldFunction):
         self.carbon_yield = carbon_yield
 
     def __call__(self, model, solution, targets):
-        if self.carbon_yield:
-            product = model.reactions.get_by_id(self.product)
-            if product.boundary:
-                product_flux = round(solution.fluxes[self.product], config.ndecimals) * n_carbon(product)
-            else:
-                product_flux = round(solution.fluxes[self.product], config.ndecimals) * n_carbon(product) / 2
-            substrate_flux = 0
-            for substrate_id in self.substrates:
-                substrate = model.reactions.get_by_id(substrate_id)
-                if substrate.boundary:
-                    substrate_flux += abs(solution.fluxes[substrate_id]) * n_carbon(substrate)
-                else:
-                    substrate_flux += abs(solution.fluxes[substrate_id]) * n_carbon(substrate) / 2
-            substrate_flux = round(substrate_flux, config.ndecimals)
-        else:
-            product_flux = round(solution.fluxes[self.product], config.ndecimals)
-            substrate_flux = sum(round(abs(solution.fluxes[s]), config.ndecimals) for s in self.substrates)
-        try:
-            return round(product_flux / substrate_flux, config.ndecimals)
-        except ZeroDivisionError:
-            return 0.0
+        return self._evaluate(model, solution)
+
+    def compile(self, model):
+        return self._kernel(model)
 
     def _repr_latex_(self):
         return "$$yield = \\frac{%s}{%s}$$" % (self.product.replace('_', '\\_'),
@@ -400,6 +589,9 @@ class number_of_knockouts(ObjectiveFunction):
             except ZeroDivisionError:
                 return np.inf
 
+    def compile(self, model):
+        return _CompiledNumberOfKnockouts(self.sense)
+
     def _repr_latex_(self):
         return "$$ %s\\:\\#knockouts $$" % self.sense
 
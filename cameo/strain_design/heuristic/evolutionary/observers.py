@@ -14,6 +14,10 @@
 
 from __future__ import absolute_import, print_function
 
+import csv
+import json
+import time
+
 from IProgress.progressbar import ProgressBar
 from IProgress.widgets import Percentage, Bar
 
@@ -46,3 +50,203 @@ class ProgressObserver(object):
     def end(self):
         self.progress.finish()
         self.progress = None
+
+
+TELEMETRY_FIELDS = ['time', 'island', 'generation', 'evaluations', 'evaluations_per_second', 'candidates',
+                    'cache_hit_rate', 'simulations', 'simulation_time', 'overhead_time', 'skipped_simulations',
+                    'infeasible_fraction', 'archive_size', 'population_size']
+
+# the cumulative values an observer samples, telemetry records are computed from two consecutive samples
+TELEMETRY_COUNTERS = ['time', 'elapsed_time', 'num_generations', 'num_evaluations', 'candidates', 'evaluations',
+                      'simulations', 'simulation_time', 'infeasible', 'skipped_simulations', 'archive_size',
+                      'population_size']
+
+
+def _evaluation_statistics(evaluator):
+    """The statistics of the evaluator behind wrapped evaluators (see evaluators.TargetEvaluator)."""
+    while evaluator is not None:
+        statistics = getattr(evaluator, 'statistics', None)
+        if statistics is not None:
+            return statistics
+        evaluator = getattr(evaluator, 'evaluator', None)
+    return {}
+
+
+def telemetry_sample(ec, start_time):
+    """
+    The cumulative counters of an evolutionary computation.
+
+    Parameters
+    ----------
+    ec : inspyred.ec.EvolutionaryComputation
+        A running evolutionary computation.
+    start_time : float
+        The time the observer started observing the computation.
+
+    Returns
+    -------
+    list
+        The values of TELEMETRY_COUNTERS.
+    """
+    statistics = _evaluation_statistics(ec.evaluator)
+    now = time.time()
+    values = {
+        'time': now,
+        'elapsed_time': now - start_time,
+        'num_generations': ec.num_generations,
+        'num_evaluations': ec.num_evaluations,
+        'archive_size': len(ec.archive),
+        'population_size': len(ec.population)
+    }
+    return [values[counter] if counter in values else statistics.get(counter, 0) for counter in TELEMETRY_COUNTERS]
+
+
+def telemetry_record(sample, previous=None, island=None):
+    """
+    A telemetry record (see TelemetryObserver).
+
+    Parameters
+    ----------
+    sample : list
+        The values of TELEMETRY_COUNTERS.
+    previous : list
+        The previous sample, the rate of evaluations is computed since then (since the start if None).
+    island : int
+        The island the sample belongs to.
+
+    Returns
+    -------
+    dict
+        The values of TELEMETRY_FIELDS.
+    """
+    current = dict(zip(TELEMETRY_COUNTERS, sample))
+    if previous is None:
+        previous = dict.fromkeys(TELEMETRY_COUNTERS, 0)
+    else:
+        previous = dict(zip(TELEMETRY_COUNTERS, previous))
+    interval = current['elapsed_time'] - previous['elapsed_time']
+    evaluations = current['num_evaluations'] - previous['num_evaluations']
+    return {
+        'time': current['time'],
+        'island': island,
+        'generation': int(current['num_generations']),
+        'evaluations': int(current['num_evaluations']),
+        'evaluations_per_second': evaluations / interval if interval > 0 else None,
+        'candidates': int(current['candidates']),
+        'cache_hit_rate': 1 - current['evaluations'] / current['candidates'] if current['candidates'] else None,
+        'simulations': int(current['simulations']),
+        'simulation_time': current['simulation_time'],
+        'overhead_time': current['elapsed_time'] - current['simulation_time'],
+        'skipped_simulations': int(current['skipped_simulations']),
+        'infeasible_fraction': current['infeasible'] / current['evaluations'] if current['evaluations'] else None,
+        'archive_size': int(current['archive_size']),
+        'population_size': int(current['population_size'])
+    }
+
+
+class TelemetryWriter(object):
+    """
+    Appends telemetry records to a JSON lines or a CSV file.
+
+    Parameters
+    ----------
+    path : str
+        The file to write to.
+    format : str
+        'jsonl' or 'csv'. By default 'csv' if the file name ends with .csv, 'jsonl' otherwise.
+    """
+
+    def __init__(self, path, format=None):
+        if format is None:
+            format = 'csv' if path.endswith('.csv') else 'jsonl'
+        if format not in ('jsonl', 'csv'):
+            raise ValueError("Unknown telemetry format %s (use 'jsonl' or 'csv')" % format)
+        self.path = path
+        self.format = format
+        self._file = None
+        self._writer = None
+
+    def write(self, records):
+        if self._file is None:
+            self._file = open(self.path, 'w')
+            if self.format == 'csv':
+                self._writer = csv.DictWriter(self._file, fieldnames=TELEMETRY_FIELDS)
+                self._writer.writeheader()
+        for record in records:
+            if self.format == 'csv':
+                self._writer.writerow(record)
+            else:
+                self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+        self._file = None
+        self._writer = None
+
+
+class TelemetryObserver(object):
+    """
+    Records where the time of a heuristic optimization goes.
+
+    Every `interval` seconds (and when the optimization ends) a record with the fields in TELEMETRY_FIELDS is
+    added to `records` and written to `path` (optional):
+
+    - evaluations and evaluations_per_second: the evaluations of the algorithm, and their rate since the last record.
+    - candidates and cache_hit_rate: the candidates given to the evaluator and the fraction of them whose fitness
+      was memoised.
+    - simulations, simulation_time and overhead_time: the simulations, the seconds spent in them and the remaining
+      time. With several workers the simulation time is summed over them.
+    - skipped_simulations: simulations skipped by a KnockoutEvaluator.
+    - infeasible_fraction: the fraction of evaluations that were infeasible.
+    - archive_size and population_size.
+
+    The evaluator statistics are only available for TargetEvaluators (see evaluators.TargetEvaluator.statistics).
+
+    Attributes
+    ----------
+    path : str
+        A JSON lines or CSV file (see TelemetryWriter).
+    interval : float
+        The minimum number of seconds between two records.
+    records : list
+        The records so far.
+    """
+    __name__ = "Telemetry Observer"
+
+    def __init__(self, path=None, interval=5., format=None):
+        self.path = path
+        self.interval = interval
+        self.records = []
+        self._writer = None if path is None else TelemetryWriter(path, format)
+        self._ec = None
+        # the first generation is observed after the initial population is evaluated
+        self._start_time = time.time()
+        self._last_sample = None
+
+    def __call__(self, population, num_generations, num_evaluations, args):
+        self._ec = args['_ec']
+        if self._last_sample is None or time.time() - self._last_sample[0] >= self.interval:
+            self.sample()
+
+    def sample(self):
+        sample = telemetry_sample(self._ec, self._start_time)
+        record = telemetry_record(sample, self._last_sample)
+        self._last_sample = sample
+        self.records.append(record)
+        if self._writer is not None:
+            self._writer.write([record])
+
+    def reset(self):
+        self.records = []
+        self._ec = None
+        self._start_time = time.time()
+        self._last_sample = None
+
+    def end(self):
+        if self._ec is not None:
+            self.sample()
+        if self._writer is not None:
+            self._writer.close()
+        self._ec = None
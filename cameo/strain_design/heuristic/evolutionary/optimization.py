@@ -16,9 +16,11 @@ from __future__ import absolute_import, print_function
 
 import collections
 import logging
+import pickle
 import time
 import types
-from functools import reduce
+from functools import partial
+from uuid import uuid4
 
 import inspyred
 import numpy
@@ -33,12 +35,15 @@ from cameo.flux_analysis.structural import (find_blocked_reactions_nullspace, fi
                                             create_stoichiometric_array)
 from cobra.flux_analysis import find_essential_genes, find_essential_reactions
 from cameo.strain_design.heuristic.evolutionary import archives
+from cameo.strain_design.heuristic.evolutionary import checkpoints
 from cameo.strain_design.heuristic.evolutionary import decoders
 from cameo.strain_design.heuristic.evolutionary import evaluators
 from cameo.strain_design.heuristic.evolutionary import generators
 from cameo.strain_design.heuristic.evolutionary import observers
+from cameo.strain_design.heuristic.evolutionary import pareto
 from cameo.strain_design.heuristic.evolutionary import plotters
 from cameo.strain_design.heuristic.evolutionary import stats
+from cameo.strain_design.heuristic.evolutionary import steady_state
 from cameo.strain_design.heuristic.evolutionary import variators
 from cameo.strain_design.heuristic.evolutionary.archives import Individual
 from cameo.strain_design.heuristic.evolutionary.objective_functions import MultiObjectiveFunction, ObjectiveFunction
@@ -88,8 +93,8 @@ PRE_CONFIGURED = {
             variators.set_n_point_crossover
         ],
         inspyred.ec.selectors.tournament_selection,
-        inspyred.ec.replacers.nsga_replacement,
-        inspyred.ec.archivers.population_archiver
+        pareto.nsga_replacement,
+        archives.ParetoArchive()
     ],
     inspyred.ec.emo.PAES: [
         [
@@ -100,9 +105,96 @@ PRE_CONFIGURED = {
         inspyred.ec.selectors.default_selection,
         inspyred.ec.replacers.paes_replacement,
         inspyred.ec.archivers.adaptive_grid_archiver
+    ],
+    pareto.SPEA2: [
+        [
+            variators.set_mutation,
+            variators.set_indel,
+            variators.set_n_point_crossover
+        ],
+        inspyred.ec.selectors.tournament_selection,
+        pareto.spea2_replacement,
+        archives.ParetoArchive()
+    ],
+    steady_state.SteadyStateGA: [
+        [
+            variators.set_mutation,
+            variators.set_indel,
+            variators.set_n_point_crossover
+        ],
+        inspyred.ec.selectors.tournament_selection,
+        inspyred.ec.replacers.steady_state_replacement,
+        archives.BestSolutionArchive(),
+    ],
+    (inspyred.ec.GA, 'floyd'): [
+        [
+            variators.floyd_set_mutation,
+            variators.floyd_set_indel,
+            variators.floyd_set_n_point_crossover
+        ],
+        inspyred.ec.selectors.tournament_selection,
+        inspyred.ec.replacers.generational_replacement,
+        archives.BestSolutionArchive(),
+    ],
+    (inspyred.ec.SA, 'floyd'): [
+        [
+            variators.floyd_set_mutation,
+            variators.floyd_set_indel
+        ],
+        inspyred.ec.selectors.default_selection,
+        inspyred.ec.replacers.simulated_annealing_replacement,
+        archives.BestSolutionArchive()
+    ],
+    (steady_state.SteadyStateGA, 'floyd'): [
+        [
+            variators.floyd_set_mutation,
+            variators.floyd_set_indel,
+            variators.floyd_set_n_point_crossover
+        ],
+        inspyred.ec.selectors.tournament_selection,
+        inspyred.ec.replacers.steady_state_replacement,
+        archives.BestSolutionArchive(),
+    ],
+    (inspyred.ec.emo.NSGA2, 'floyd'): [
+        [
+            variators.floyd_set_mutation,
+            variators.floyd_set_indel,
+            variators.floyd_set_n_point_crossover
+        ],
+        inspyred.ec.selectors.tournament_selection,
+        pareto.nsga_replacement,
+        archives.ParetoArchive()
+    ],
+    (pareto.SPEA2, 'floyd'): [
+        [
+            variators.floyd_set_mutation,
+            variators.floyd_set_indel,
+            variators.floyd_set_n_point_crossover
+        ],
+        inspyred.ec.selectors.tournament_selection,
+        pareto.spea2_replacement,
+        archives.ParetoArchive()
+    ],
+    (inspyred.ec.emo.PAES, 'floyd'): [
+        [
+            variators.floyd_set_mutation,
+            variators.floyd_set_indel,
+            variators.floyd_set_n_point_crossover
+        ],
+        inspyred.ec.selectors.default_selection,
+        inspyred.ec.replacers.paes_replacement,
+        inspyred.ec.archivers.adaptive_grid_archiver
     ]
 }
 
+# the heuristics defined in these modules handle a single objective
+SINGLE_OBJECTIVE_MODULES = (inspyred.ec.ec.__name__, steady_state.__name__)
+
+GENERATORS = {
+    'default': generators.set_generator,
+    'floyd': generators.floyd_set_generator
+}
+
 
 def set_distance_function(candidate1, candidate2):
     return len(set(candidate1).symmetric_difference(set(candidate2)))
@@ -171,8 +263,8 @@ class HeuristicOptimization(object):
     def objective_function(self, objective_function):
         if not isinstance(objective_function, ObjectiveFunction):
             raise TypeError("objective function is not instance of ObjectiveFunction")
-        elif self._heuristic_method.__module__ == inspyred.ec.ec.__name__ and isinstance(objective_function,
-                                                                                         MultiObjectiveFunction):
+        elif self._heuristic_method.__module__ in SINGLE_OBJECTIVE_MODULES and isinstance(objective_function,
+                                                                                          MultiObjectiveFunction):
             raise TypeError("single objective heuristic do not support multiple objective functions")
         else:
             self._objective_function = objective_function
@@ -189,12 +281,14 @@ class HeuristicOptimization(object):
 
     @heuristic_method.setter
     def heuristic_method(self, heuristic_method):
-        if heuristic_method.__module__ == inspyred.ec.ec.__name__ and isinstance(self.objective_function,
-                                                                                 MultiObjectiveFunction):
+        if heuristic_method.__module__ in SINGLE_OBJECTIVE_MODULES and isinstance(self.objective_function,
+                                                                                  MultiObjectiveFunction):
             raise TypeError("single objective heuristics do not support multiple objective functions")
         self._heuristic_method = heuristic_method(self.random)
 
-    def run(self, evaluator=None, generator=None, view=config.default_view, maximize=True, max_time=None, **kwargs):
+    def run(self, evaluator=None, generator=None, view=config.default_view, maximize=True, max_time=None,
+            checkpoint=None, checkpoint_interval=60, resume_from=None, telemetry=None, telemetry_interval=5,
+            **kwargs):
         """
         Runs the evolutionary algorithm.
 
@@ -210,6 +304,16 @@ class HeuristicOptimization(object):
             The sense of the optimization algorithm.
         max_time : tuple
             A tuple with (minutes, seconds) or (hours, minutes, seconds)
+        checkpoint : str
+            A file to periodically write the state of the optimization to (see checkpoints.CheckpointObserver).
+        checkpoint_interval : float
+            The minimum number of seconds between two checkpoints.
+        resume_from : str
+            A checkpoint file to continue from. The other arguments should be the same as in the interrupted run.
+        telemetry : str
+            A JSON lines or CSV file to write telemetry records to (see observers.TelemetryObserver).
+        telemetry_interval : float
+            The minimum number of seconds between two telemetry records.
         kwargs : dict
             See inspyred documentation for more information.
 
@@ -231,6 +335,16 @@ class HeuristicOptimization(object):
 
         t = time.time()
 
+        state = None
+        if resume_from is not None:
+            state = checkpoints.load_checkpoint(resume_from)
+            logger.info("Resuming from %s at generation %i (%i evaluations)" % (
+                resume_from, state['num_generations'], state['num_evaluations']))
+            if state['fitness_cache'] is not None:
+                self._load_fitness_cache(state['fitness_cache'])
+            kwargs['seeds'] = [candidate for candidate, _ in state['population']]
+            evaluator = checkpoints.ResumedEvaluator(evaluator, [fitness for _, fitness in state['population']])
+
         if max_time is not None:
             terminator = self.heuristic_method.terminator
             if isinstance(terminator, collections.Iterable):
@@ -241,13 +355,37 @@ class HeuristicOptimization(object):
 
             self.heuristic_method.terminator = terminator
             kwargs['start_time'] = t
+            if state is not None and state['elapsed_time'] is not None:
+                kwargs['start_time'] -= state['elapsed_time']
             kwargs['max_time'] = max_time
 
+        observer = self.heuristic_method.observer
+        extra_observers = []
+        if state is not None:
+            extra_observers.append(checkpoints.ResumeObserver(state))
+        if checkpoint is not None:
+            extra_observers.append(checkpoints.CheckpointObserver(checkpoint, interval=checkpoint_interval,
+                                                                  fitness_cache=self._fitness_cache,
+                                                                  seed=kwargs['seed']))
+        if telemetry is not None:
+            extra_observers.append(observers.TelemetryObserver(telemetry, interval=telemetry_interval))
+        if extra_observers:
+            if isinstance(observer, collections.Iterable):
+                other_observers = list(observer)
+            else:
+                other_observers = [observer]
+            self.heuristic_method.observer = extra_observers + other_observers
+
         print(time.strftime("Starting optimization at %a, %d %b %Y %H:%M:%S", time.localtime(t)))
-        res = self.heuristic_method.evolve(generator=generator,
-                                           maximize=maximize,
-                                           evaluator=evaluator,
-                                           **kwargs)
+        try:
+            res = self.heuristic_method.evolve(generator=generator,
+                                               maximize=maximize,
+                                               evaluator=evaluator,
+                                               **kwargs)
+        finally:
+            self.heuristic_method.observer = observer
+        for extra_observer in extra_observers:
+            extra_observer.end()
         for observer in self.observers:
             observer.end()
         runtime = time.time() - t
@@ -255,6 +393,50 @@ class HeuristicOptimization(object):
 
         return res
 
+    def _fitness_cache(self):
+        """The memoised fitness values to store in a checkpoint (None if there are none)."""
+        return None
+
+    def _load_fitness_cache(self, fitness_cache):
+        pass
+
+
+def _evaluate(evaluator, candidates):
+    if hasattr(evaluator, 'evaluate_with_statistics'):
+        return evaluator.evaluate_with_statistics(candidates)
+    return evaluator(candidates), None
+
+
+def _evaluate_and_cache(evaluator, candidates):
+    """Like _evaluate, but also returns the memoised fitness values of the candidates (see cached_fitness)."""
+    fitness, statistics = _evaluate(evaluator, candidates)
+    cached_fitness = {}
+    if hasattr(evaluator, 'cached_fitness'):
+        cached_fitness = evaluator.cached_fitness(candidates)
+    return fitness, statistics, cached_fitness
+
+
+class _WorkerEvaluator(object):
+    """
+    Picklable evaluator for asynchronous tasks.
+
+    The evaluator is pickled once and unpickled only once in each worker process, instead of being pickled with
+    every task. Evaluators with statistics return them with the fitness (see TargetEvaluator.evaluate_with_statistics).
+    """
+    _evaluators = {}
+
+    def __init__(self, evaluator, function=_evaluate):
+        self.key = uuid4().hex
+        self.payload = pickle.dumps(evaluator, protocol=pickle.HIGHEST_PROTOCOL)
+        self.function = function
+
+    def __call__(self, candidates):
+        evaluator = self._evaluators.get(self.key)
+        if evaluator is None:
+            self._evaluators.clear()
+            evaluator = self._evaluators[self.key] = pickle.loads(self.payload)
+        return self.function(evaluator, candidates)
+
 
 class EvaluatorWrapper(object):
     def __init__(self, view, evaluator):
@@ -265,22 +447,93 @@ class EvaluatorWrapper(object):
         self.view = view
         self.evaluator = evaluator
         self.__name__ = "Wrapped %s" % EvaluatorWrapper.__class__.__name__
+        self._worker_evaluator = None
+        # statistics of asynchronous evaluations that completed but are not merged yet (see statistics)
+        self._completed_statistics = collections.deque()
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        self._completed_statistics.clear()
         self.evaluator.reset()
 
+    @property
+    def concurrency(self):
+        return len(self.view)
+
+    @property
+    def statistics(self):
+        """
+        The statistics of the evaluator (None if it has none).
+
+        The statistics of asynchronous evaluations are merged here, in the thread that reads them, because the
+        callbacks of submit run in the result handler thread of the view.
+        """
+        self._merge_completed_statistics()
+        return getattr(self.evaluator, 'statistics', None)
+
+    def submit(self, candidates, callback, error_callback):
+        """
+        Evaluates candidates asynchronously (used by steady_state.SteadyStateGA).
+
+        Parameters
+        ----------
+        candidates : list
+            The candidates to evaluate.
+        callback : function
+            Called with the list of fitness values once the evaluation completes (in the result handler thread of
+            the view, the statistics of the evaluation are merged when they are read, see statistics).
+        error_callback : function
+            Called with the exception if the evaluation fails.
+
+        Returns
+        -------
+        multiprocessing.pool.AsyncResult
+            The result of the asynchronous evaluation (None if the candidates were evaluated in this process).
+        """
+        if len(self.view) > 1:
+            if self._worker_evaluator is None:
+                self._worker_evaluator = _WorkerEvaluator(self.evaluator)
+
+            def fitness_callback(result):
+                fitness, statistics = result
+                self._completed_statistics.append(statistics)
+                callback(fitness)
+
+            return self.view.apply_async(self._worker_evaluator, candidates, callback=fitness_callback,
+                                         error_callback=error_callback)
+        else:
+            try:
+                fitness = self.evaluator(candidates)
+            except Exception as e:
+                error_callback(e)
+            else:
+                callback(fitness)
+
+    def _add_statistics(self, statistics):
+        if statistics is not None:
+            self.evaluator.statistics.update(statistics)
+
+    def _merge_completed_statistics(self):
+        while self._completed_statistics:
+            self._add_statistics(self._completed_statistics.popleft())
+
     def __call__(self, candidates, args):
+        if len(self.view) == 1:
+            return self.evaluator(candidates)
         population_chunks = (chunk for chunk in partition(candidates, len(self.view)))
         try:
-            chunked_results = self.view.map(self.evaluator, population_chunks)
+            # the statistics of the evaluations in the worker processes are added to those of the evaluator
+            chunked_results = self.view.map(partial(_evaluate, self.evaluator), population_chunks)
         except KeyboardInterrupt as e:
             self.view.shutdown()
             raise e
 
-        fitness = reduce(list.__add__, chunked_results)
+        fitness = []
+        for chunk_fitness, statistics in chunked_results:
+            fitness += chunk_fitness
+            self._add_statistics(statistics)
 
         return fitness
 
@@ -290,7 +543,7 @@ class TargetOptimization(HeuristicOptimization):
     Abstract class for target optimization.
     """
 
-    def __init__(self, simulation_method=pfba, wt_reference=None, *args, **kwargs):
+    def __init__(self, simulation_method=pfba, wt_reference=None, sampling='default', *args, **kwargs):
         """
         Class for generic optimization algorithms for knockout (or similar) strain design methods
 
@@ -304,7 +557,13 @@ class TargetOptimization(HeuristicOptimization):
            the simulation method to use for evaluating results
         evaluator : TargetEvaluator
            the class used to evaluate results
+        sampling : str
+            'default' or 'floyd'. The latter uses the variators and generator that sample new indices with Floyd's
+            algorithm, which is faster for large representations (see PRE_CONFIGURED).
         """
+        if sampling not in GENERATORS:
+            raise ValueError("Unknown sampling '%s', choose one of %s" % (sampling, sorted(GENERATORS)))
+        self._sampling = sampling
         super(TargetOptimization, self).__init__(*args, **kwargs)
         self._simulation_kwargs = dict()
         self._simulation_kwargs['reference'] = wt_reference
@@ -349,11 +608,20 @@ class TargetOptimization(HeuristicOptimization):
         HeuristicOptimization.heuristic_method.fset(self, heuristic_method)
         self._set_observer()
         try:
-            configuration = PRE_CONFIGURED[heuristic_method]
+            if self._sampling == 'default':
+                configuration = PRE_CONFIGURED[heuristic_method]
+            else:
+                configuration = PRE_CONFIGURED[heuristic_method, self._sampling]
             self._setup(*configuration)
         except KeyError:
             logger.warning("Please verify the variator is compatible with set representation")
 
+    def _fitness_cache(self):
+        return self._evaluator.cached_fitness()
+
+    def _load_fitness_cache(self, fitness_cache):
+        self._evaluator.load_cached_fitness(fitness_cache)
+
     def _setup(self, variator, selector, replacer, archiver):
         logger.debug("Setting up algorithm: %s" % self.heuristic_method)
         self.heuristic_method.variator = variator
@@ -415,10 +683,9 @@ class TargetOptimization(HeuristicOptimization):
         log_level = simulation_logger.level
         simulation_logger.setLevel(logging.CRITICAL)
 
+        generator = GENERATORS[self._sampling]
         if diversify:
-            generator = diversify_function(generators.set_generator)
-        else:
-            generator = generators.set_generator
+            generator = diversify_function(generator)
 
         with EvaluatorWrapper(view, self._evaluator) as evaluator:
             super(TargetOptimization, self).run(distance_function=set_distance_function,
@@ -457,32 +724,97 @@ class KnockoutOptimization(TargetOptimization):
 class SolutionSimplification(object):
     """
     Solution Simplification Method
+
+    Removes the targets that do not contribute to the fitness of a solution. The sub-candidates of all solutions are
+    evaluated together in batches (deduplicated and through the evaluator's cache): first all single removals, which
+    also give the greedy removal order (the removal with the best fitness first), then one removal per solution and
+    round until every solution ran out of removable targets. Targets whose single removal already decreases the
+    fitness are never tried again.
+
+    Attributes
+    ----------
+    evaluator : Evaluator
+        The evaluator used during the optimization.
+    view : cameo.parallel.SequentialView, cameo.parallel.MultiprocessingView
+        If given, the candidates of a batch that are not in the evaluator's cache are evaluated in chunks on the view
+        instead of with the evaluator in this process.
     """
 
-    def __init__(self, evaluator):
+    def __init__(self, evaluator, view=None):
         if not isinstance(evaluator, evaluators.Evaluator):
             raise ValueError("Evaluator must be instance of "
                              "'cameo.strain_design.heuristic.evolutionary.evaluators.Evaluator'")
         self._evaluator = evaluator
+        self._view = view
+        self._worker_evaluator = None
 
     def __call__(self, population):
-        return [self.simplify(individual) for individual in population]
+        population = list(population)
+        candidates = [tuple(sorted(individual.candidate)) for individual in population]
+        removals = [[candidate[:i] + candidate[i + 1:] for i in range(len(candidate))] for candidate in candidates]
+        fitness = self._evaluate(set(sub_candidate for sub_candidates in removals for sub_candidate in sub_candidates))
+
+        current = []
+        queues = []
+        for individual, candidate, sub_candidates in zip(population, candidates, removals):
+            removable = [(fitness[sub_candidate], target) for target, sub_candidate in zip(candidate, sub_candidates)
+                         if not self._is_worse(fitness[sub_candidate], individual.fitness)]
+            if removable and not isinstance(removable[0][0], inspyred.ec.emo.Pareto):
+                removable.sort(key=lambda item: -item[0])
+            queue = [target for _, target in removable]
+            # the first removal was evaluated already
+            current.append(set(candidate) - set(queue[:1]))
+            queues.append(queue[1:])
+
+        while any(queues):
+            proposals = {i: tuple(sorted(current[i] - {queue[0]})) for i, queue in enumerate(queues) if queue}
+            fitness = self._evaluate(set(proposals.values()))
+            for i, sub_candidate in proposals.items():
+                target = queues[i].pop(0)
+                if not self._is_worse(fitness[sub_candidate], population[i].fitness):
+                    current[i].discard(target)
+
+        return [Individual(candidate, individual.fitness, individual.maximize, birthdate=individual.birthdate)
+                for candidate, individual in zip(current, population)]
 
     def simplify(self, individual):
-        new_individual = Individual(individual.candidate, individual.fitness, individual.maximize,
-                                    birthdate=individual.birthdate)
-
-        for target in individual.candidate:
-            new_individual.candidate.remove(target)
-            new_fitness = self._evaluator.evaluate_individual(tuple(new_individual))
-            if isinstance(new_fitness, inspyred.ec.emo.Pareto):
-                if new_fitness < individual.fitness:
-                    new_individual.candidate.add(target)
-            else:
-                if new_fitness < individual.fitness or numpy.isnan(new_fitness):
-                    new_individual.candidate.add(target)
+        return self([individual])[0]
+
+    @staticmethod
+    def _is_worse(new_fitness, fitness):
+        if isinstance(new_fitness, inspyred.ec.emo.Pareto):
+            return new_fitness < fitness
+        return new_fitness < fitness or numpy.isnan(new_fitness)
+
+    def _evaluate(self, candidates):
+        candidates = sorted(candidates)
+        if self._view is None or len(self._view) == 1 or len(candidates) < 2:
+            return dict(zip(candidates, self._evaluator(candidates)))
+        # cache hits are resolved in this process, only the other candidates are evaluated on the view
+        fitness = self._cached_fitness(candidates)
+        misses = [candidate for candidate in candidates if candidate not in fitness]
+        if len(misses) < 2:
+            fitness.update(zip(misses, self._evaluator(misses)))
+            return fitness
+        if self._worker_evaluator is None:
+            self._worker_evaluator = _WorkerEvaluator(self._evaluator, function=_evaluate_and_cache)
+        chunks = list(partition(misses, len(self._view)))
+        results = self._view.map(self._worker_evaluator, chunks)
+        for chunk, (chunk_fitness, statistics, cached_fitness) in zip(chunks, results):
+            fitness.update(zip(chunk, chunk_fitness))
+            if statistics is not None:
+                self._evaluator.statistics.update(statistics)
+            if cached_fitness:
+                self._evaluator.load_cached_fitness(cached_fitness)
+        return fitness
 
-        return new_individual
+    def _cached_fitness(self, candidates):
+        if not hasattr(self._evaluator, 'cached_fitness'):
+            return {}
+        # look up the memoised fitness of the candidates only, the memo grows during the optimization
+        cached_fitness = self._evaluator.cached_fitness(candidates)
+        keys = self._evaluator.memo_keys(candidates)
+        return {candidate: cached_fitness[key] for candidate, key in zip(candidates, keys) if key in cached_fitness}
 
     def __enter__(self):
         return self
@@ -510,7 +842,21 @@ class TargetOptimizationResult(Result):
         if simplify:
             solutions = self._simplify_solutions(solutions)
 
-        self._solutions = self._decode_solutions(solutions)
+        # decoded lazily, on first access to the solutions
+        self._encoded_solutions = solutions
+        self._decoded_solutions = None
+
+    @property
+    def _solutions(self):
+        if self._decoded_solutions is None:
+            self._decoded_solutions = self._decode_solutions(self._encoded_solutions)
+            self._encoded_solutions = None
+        return self._decoded_solutions
+
+    @_solutions.setter
+    def _solutions(self, solutions):
+        self._decoded_solutions = solutions
+        self._encoded_solutions = None
 
     def __len__(self):
         return len(self._solutions)
@@ -560,7 +906,7 @@ class TargetOptimizationResult(Result):
             raise AssertionError("Cannot merge results from different heuristic methods")
 
         self._solutions = self._solutions.append(other._solutions, ignore_index=True)
-        self._solutions.drop_duplicates(subset="knockouts", take_last=True, inplace=True)
+        self._solutions.drop_duplicates(subset="targets", keep="last", inplace=True)
 
         return self
 
@@ -580,33 +926,28 @@ class TargetOptimizationResult(Result):
         return DataFrame(self._solutions)
 
     def _decode_solutions(self, solutions):
-        decoded_solutions = DataFrame(columns=["targets", "fitness"])
-        index = 0
+        columns = {"targets": [], "fitness": []}
         for solution in solutions:
             combinations = self._decoder(solution.candidate, flat=True, decompose=True)
             for targets in combinations:
                 if len(targets) > 0:
-                    decoded_solutions.loc[index] = [tuple(targets), solution.fitness]
-                    index += 1
+                    columns["targets"].append(tuple(targets))
+                    columns["fitness"].append(solution.fitness)
 
+        decoded_solutions = DataFrame(columns, columns=["targets", "fitness"])
         decoded_solutions.drop_duplicates(inplace=True, subset="targets")
         decoded_solutions.reset_index(inplace=True)
 
         return decoded_solutions
 
     def _simplify_solutions(self, solutions):
-        simplification = SolutionSimplification(self._evaluator)
-        chunks = (chunk for chunk in partition(solutions, len(self._view)))
+        simplification = SolutionSimplification(self._evaluator, view=self._view)
         try:
-            chunked_results = self._view.map(simplification, chunks)
+            return simplification(solutions)
         except KeyboardInterrupt as e:
-            self.view.shutdown()
+            self._view.shutdown()
             raise e
 
-        solutions = reduce(list.__add__, chunked_results)
-
-        return solutions
-
 
 class ReactionKnockoutOptimization(KnockoutOptimization):
     """
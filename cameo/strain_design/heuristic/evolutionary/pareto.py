@@ -0,0 +1,293 @@
+# Copyright 2016 Novo Nordisk Foundation Center for Biosustainability, DTU.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Vectorised Pareto ranking for multi-objective heuristics.
+
+The functions work on a fitness matrix with one row per individual and one column per objective, oriented so that
+larger is always better (see `fitness_matrix`). inspyred's replacers compare individuals pairwise in Python, which
+becomes the bottleneck for large populations.
+"""
+
+from __future__ import absolute_import, print_function
+
+import numpy as np
+from inspyred.ec import EvolutionaryComputation, selectors
+
+__all__ = ['fitness_matrix', 'dominance_matrix', 'non_dominated_sort', 'crowding_distance', 'nsga_replacement',
+           'spea2_replacement', 'SPEA2']
+
+
+def fitness_matrix(individuals):
+    """
+    The fitness values of individuals with Pareto fitness, oriented for maximization.
+
+    Objectives that are minimized (either in the Pareto or in the individual) are negated and NaN values are
+    replaced by -inf, so they are dominated by any other value.
+
+    Parameters
+    ----------
+    individuals : list
+        inspyred individuals with inspyred.ec.emo.Pareto fitness.
+
+    Returns
+    -------
+    numpy.ndarray
+        A (individuals x objectives) matrix.
+    """
+    if len(individuals) == 0:
+        return np.zeros((0, 0))
+    fitness = np.array([list(individual.fitness) for individual in individuals], dtype=float)
+    first = individuals[0]
+    signs = np.where(first.fitness.maximize, 1., -1.)
+    if not first.maximize:
+        signs = -signs
+    fitness = fitness * signs
+    fitness[np.isnan(fitness)] = -np.inf
+    return fitness
+
+
+def dominance_matrix(fitness):
+    """
+    Parameters
+    ----------
+    fitness : numpy.ndarray
+        A (individuals x objectives) matrix (larger is better).
+
+    Returns
+    -------
+    numpy.ndarray
+        A boolean matrix where element (i, j) is True if individual i dominates individual j.
+    """
+    n = len(fitness)
+    not_worse = np.ones((n, n), dtype=bool)
+    better = np.zeros((n, n), dtype=bool)
+    for objective in fitness.T:
+        not_worse &= objective[:, np.newaxis] >= objective[np.newaxis, :]
+        better |= objective[:, np.newaxis] > objective[np.newaxis, :]
+    return not_worse & better
+
+
+def non_dominated_sort(fitness):
+    """
+    Fast non-dominated sorting (Deb et al. 2002).
+
+    Parameters
+    ----------
+    fitness : numpy.ndarray
+        A (individuals x objectives) matrix (larger is better).
+
+    Returns
+    -------
+    numpy.ndarray
+        The front of each individual, 0 being the non-dominated front.
+    """
+    dominates = dominance_matrix(fitness)
+    domination_count = dominates.sum(axis=0)
+    ranks = np.full(len(fitness), -1, dtype=int)
+    front = np.flatnonzero(domination_count == 0)
+    rank = 0
+    while len(front) > 0:
+        ranks[front] = rank
+        domination_count -= dominates[front].sum(axis=0)
+        domination_count[front] = -1
+        front = np.flatnonzero(domination_count == 0)
+        rank += 1
+    return ranks
+
+
+def _finite(fitness):
+    """Replaces infinite values by the finite extremes of each objective."""
+    fitness = np.array(fitness, dtype=float)
+    for objective in fitness.T:
+        finite = np.isfinite(objective)
+        if finite.all():
+            continue
+        elif finite.any():
+            extremes = np.where(objective == np.inf, objective[finite].max(), objective[finite].min())
+            objective[:] = np.where(finite, objective, extremes)
+        else:
+            objective[:] = 0
+    return fitness
+
+
+def _normalize(fitness):
+    fitness = _finite(fitness)
+    span = fitness.max(axis=0) - fitness.min(axis=0)
+    span[span == 0] = 1
+    return (fitness - fitness.min(axis=0)) / span
+
+
+def crowding_distance(fitness):
+    """
+    The crowding distance of each individual of a front.
+
+    Parameters
+    ----------
+    fitness : numpy.ndarray
+        A (individuals x objectives) matrix.
+
+    Returns
+    -------
+    numpy.ndarray
+        The sum over the objectives of the normalized distance between the neighbours of each individual. The extremes
+        of each objective have an infinite distance.
+    """
+    n = len(fitness)
+    distance = np.zeros(n)
+    if n == 0:
+        return distance
+    fitness = _normalize(fitness)
+    for objective in fitness.T:
+        order = np.argsort(objective, kind='mergesort')
+        distance[order[0]] = distance[order[-1]] = np.inf
+        distance[order[1:-1]] += objective[order[2:]] - objective[order[:-2]]
+    return distance
+
+
+def _unique(individuals):
+    """Splits individuals into the first ones with each candidate and the duplicates."""
+    seen = set()
+    unique = []
+    duplicates = []
+    for individual in individuals:
+        key = frozenset(individual.candidate)
+        if key not in seen:
+            seen.add(key)
+            unique.append(individual)
+        else:
+            duplicates.append(individual)
+    return unique, duplicates
+
+
+def nsga_replacement(random, population, parents, offspring, args):
+    """
+    Replaces the population using non-dominated sorting and crowding distance (NSGA-II).
+
+    Same as inspyred.ec.replacers.nsga_replacement, but the fronts and distances are computed with NumPy.
+
+    Parameters
+    ----------
+    random : Random
+    population : list
+        The current population.
+    parents : list
+        The selected parents (not used).
+    offspring : list
+        The offspring.
+    args : dict
+        Keyword arguments of the evolutionary computation.
+
+    Returns
+    -------
+    list
+        The survivors, as many as in the population.
+    """
+    combined, duplicates = _unique(list(population) + list(offspring))
+    size = len(population)
+    if len(combined) <= size:
+        # too few different candidates, duplicates keep the size of the population
+        return combined + duplicates[:size - len(combined)]
+    fitness = fitness_matrix(combined)
+    ranks = non_dominated_sort(fitness)
+    sizes = np.bincount(ranks)
+    last = np.searchsorted(np.cumsum(sizes), size, side='left')
+    survivors = list(np.flatnonzero(ranks < last))
+    front = np.flatnonzero(ranks == last)
+    distance = crowding_distance(fitness[front])
+    survivors += list(front[np.argsort(-distance, kind='mergesort')][:size - len(survivors)])
+    return [combined[i] for i in survivors]
+
+
+def _nearest_neighbour_distances(fitness):
+    distances = np.zeros((len(fitness), len(fitness)))
+    for objective in _normalize(fitness).T:
+        distances += (objective[:, np.newaxis] - objective[np.newaxis, :]) ** 2
+    distances = np.sqrt(distances)
+    np.fill_diagonal(distances, np.inf)
+    return distances
+
+
+def _truncate(distances, size):
+    """Removes the individual closest to its neighbours until `size` are left (SPEA2 truncation)."""
+    keep = np.arange(len(distances))
+    while len(keep) > size:
+        sorted_distances = np.sort(distances[np.ix_(keep, keep)], axis=1)
+        closest = np.lexsort(sorted_distances.T[::-1])[0]
+        keep = np.delete(keep, closest)
+    return keep
+
+
+def spea2_replacement(random, population, parents, offspring, args):
+    """
+    Replaces the population using the environmental selection of SPEA2 (Zitzler et al. 2001).
+
+    Each individual is scored by the strength of the individuals dominating it plus a density estimate based on its
+    k-th nearest neighbour. Non-dominated individuals survive first; if there are too many, the most crowded ones are
+    truncated.
+
+    Parameters
+    ----------
+    random : Random
+    population : list
+        The current population.
+    parents : list
+        The selected parents (not used).
+    offspring : list
+        The offspring.
+    args : dict
+        Keyword arguments of the evolutionary computation.
+
+    Returns
+    -------
+    list
+        The survivors, as many as in the population.
+    """
+    combined, duplicates = _unique(list(population) + list(offspring))
+    size = len(population)
+    if len(combined) <= size:
+        # too few different candidates, duplicates keep the size of the population
+        return combined + duplicates[:size - len(combined)]
+    fitness = fitness_matrix(combined)
+    dominates = dominance_matrix(fitness)
+    strength = dominates.sum(axis=1)
+    raw_fitness = (dominates * strength[:, np.newaxis]).sum(axis=0)
+    distances = _nearest_neighbour_distances(fitness)
+    k = min(int(np.sqrt(len(combined))), len(combined) - 1)
+    density = 1. / (np.sort(distances, axis=1)[:, k - 1] + 2.)
+    non_dominated = np.flatnonzero(raw_fitness == 0)
+    if len(non_dominated) > size:
+        survivors = non_dominated[_truncate(distances[np.ix_(non_dominated, non_dominated)], size)]
+    else:
+        survivors = np.argsort(raw_fitness + density, kind='mergesort')[:size]
+    return [combined[i] for i in survivors]
+
+
+class SPEA2(EvolutionaryComputation):
+    """
+    Evolutionary computation representing the Strength Pareto Evolutionary Algorithm 2.
+
+    It uses binary tournament selection and the SPEA2 environmental selection for replacement (see
+    `spea2_replacement`).
+    """
+
+    def __init__(self, random):
+        EvolutionaryComputation.__init__(self, random)
+        self.replacer = spea2_replacement
+        self.selector = selectors.tournament_selection
+
+    def evolve(self, generator, evaluator, pop_size=100, seeds=None, maximize=True, bounder=None, **args):
+        args.setdefault('num_selected', pop_size)
+        args.setdefault('tournament_size', 2)
+        return EvolutionaryComputation.evolve(self, generator, evaluator, pop_size, seeds, maximize, bounder, **args)
@@ -11,10 +11,99 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-from cobra.manipulation.delete import find_gene_knockout_reactions
+import logging
+
+import numpy
+from cobra.exceptions import OptimizationError
+from cobra.util.solver import fix_objective_as_constraint
+from optlang.interface import OPTIMAL, UNBOUNDED
+
 from cameo.core.manipulation import swap_cofactors
+from cameo.strain_design.heuristic.evolutionary.decoders import CompiledGeneReactionRules
+
+logger = logging.getLogger(__name__)
+
 
-from cameo import flux_variability_analysis
+def target_flux_range(model, target, fraction_of_optimum=0.99):
+    """
+    Computes the minimum and maximum flux of the target with the model objective fixed at a fraction of its optimum.
+
+    Gives the same bounds as flux_variability_analysis(model, fraction_of_optimum, reactions=[target]), but solves
+    only the two LPs on the target (after optimizing the objective).
+
+    Parameters
+    ----------
+    model: cobra.Model
+        A constraint-based model
+    target: Reaction
+        The strain design target
+    fraction_of_optimum: float
+        The fraction of the objective optimum that must be kept.
+
+    Returns
+    -------
+    tuple
+        (minimum, maximum)
+    """
+    with model:
+        fix_objective_as_constraint(model, fraction=fraction_of_optimum)
+        model.objective = target
+        bounds = []
+        for direction, unbounded in (('min', -numpy.inf), ('max', numpy.inf)):
+            model.objective.direction = direction
+            model.solver.optimize()
+            if model.solver.status == OPTIMAL:
+                bounds.append(model.objective.value)
+            elif model.solver.status == UNBOUNDED:
+                bounds.append(unbounded)
+            else:
+                bounds.append(None)
+
+    # same fallbacks as flux_variability_analysis when one of the problems cannot be solved
+    lower_bound, upper_bound = bounds
+    if lower_bound is None and upper_bound is None:
+        return 0, 0
+    elif lower_bound is None:
+        return upper_bound, upper_bound
+    elif upper_bound is None:
+        return lower_bound, lower_bound
+    return min(lower_bound, upper_bound), upper_bound
+
+
+class SolutionProcessor(object):
+    """
+    Processes batches of solutions with one of the process_*_solution functions.
+
+    The processor keeps its own reference to the model, so when it is mapped over batches on a parallel view each
+    worker processes a whole batch on one copy of the model.
+
+    Attributes
+    ----------
+    process_function: function
+        process_reaction_knockout_solution, process_gene_knockout_solution or process_reaction_swap_solution
+    model: cobra.Model
+        A constraint-based model
+    columns: list
+        The columns of a processed solution (a row of NaN is returned for solutions that cannot be simulated)
+    kwargs: dict
+        The remaining arguments of the process function.
+    """
+
+    def __init__(self, process_function, model, columns, **kwargs):
+        self.process_function = process_function
+        self.model = model
+        self.columns = columns
+        self.kwargs = kwargs
+
+    def __call__(self, solutions):
+        rows = []
+        for solution in solutions:
+            try:
+                rows.append(self.process_function(self.model, solution, **self.kwargs))
+            except OptimizationError as e:
+                logger.error(e)
+                rows.append([numpy.nan for _ in self.columns])
+        return rows
 
 
 def process_reaction_knockout_solution(model, solution, simulation_method, simulation_kwargs,
@@ -56,15 +145,15 @@ def process_reaction_knockout_solution(model, solution, simulation_method, simul
         flux_dist = simulation_method(model, reactions=objective_function.reactions,
                                       objective=biomass, **simulation_kwargs)
         model.objective = biomass
-        fva = flux_variability_analysis(model, fraction_of_optimum=0.99, reactions=[target])
+        fva_min, fva_max = target_flux_range(model, target, fraction_of_optimum=0.99)
         target_yield = flux_dist[target] / abs(flux_dist[substrate])
-        return [solution, len(solution), fva.lower_bound(target),
-                fva.upper_bound(target), flux_dist[target], flux_dist[biomass],
+        return [solution, len(solution), fva_min,
+                fva_max, flux_dist[target], flux_dist[biomass],
                 target_yield, objective_function(model, flux_dist, reactions)]
 
 
 def process_gene_knockout_solution(model, solution, simulation_method, simulation_kwargs,
-                                   biomass, target, substrate, objective_function):
+                                   biomass, target, substrate, objective_function, rules=None):
     """
 
     Parameters
@@ -85,6 +174,8 @@ def process_gene_knockout_solution(model, solution, simulation_method, simulatio
         The main carbon source uptake rate
     objective_function: cameo.strain_design.heuristic.evolutionary.objective_functions.ObjectiveFunction
         The objective function used for evaluation.
+    rules: CompiledGeneReactionRules
+        Compiled gene-reaction rules that include the genes of the solution (compiled for the solution if None).
 
     Returns
     -------
@@ -95,19 +186,20 @@ def process_gene_knockout_solution(model, solution, simulation_method, simulatio
 
     with model:
         genes = [model.genes.get_by_id(gid) for gid in solution]
-        reactions = find_gene_knockout_reactions(model, solution)
-        for reaction in reactions:
-            reaction.knock_out()
+        if rules is None:
+            rules = CompiledGeneReactionRules(model, solution)
+        reaction_ids = rules([[rules.genes.index(gid) for gid in solution]])[0]
+        for reaction_id in reaction_ids:
+            model.reactions.get_by_id(reaction_id).knock_out()
 
-        reaction_ids = [r.id for r in reactions]
         flux_dist = simulation_method(model, reactions=objective_function.reactions,
                                       objective=biomass, **simulation_kwargs)
         model.objective = biomass
 
-        fva = flux_variability_analysis(model, fraction_of_optimum=0.99, reactions=[target])
+        fva_min, fva_max = target_flux_range(model, target, fraction_of_optimum=0.99)
         target_yield = flux_dist[target] / abs(flux_dist[substrate])
 
-        return [tuple(reaction_ids), solution, len(solution), fva.lower_bound(target), fva.upper_bound(target),
+        return [tuple(reaction_ids), solution, len(solution), fva_min, fva_max,
                 flux_dist[target], flux_dist[biomass], target_yield, objective_function(model, flux_dist, genes)]
 
 
@@ -152,8 +244,8 @@ def process_reaction_swap_solution(model, solution, simulation_method, simulatio
         flux_dist = simulation_method(model, reactions=objective_function.reactions,
                                       objective=biomass, **simulation_kwargs)
         model.objective = biomass
-        fva = flux_variability_analysis(model, fraction_of_optimum=0.99, reactions=[target])
+        fva_min, fva_max = target_flux_range(model, target, fraction_of_optimum=0.99)
         target_yield = flux_dist[target] / abs(flux_dist[substrate])
-        return [solution, fva.lower_bound(target),
-                fva.upper_bound(target), flux_dist[target], flux_dist[biomass],
+        return [solution, len(solution), fva_min,
+                fva_max, flux_dist[target], flux_dist[biomass],
                 target_yield, objective_function(model, flux_dist, reactions)]
@@ -0,0 +1,172 @@
+# Copyright 2016 Novo Nordisk Foundation Center for Biosustainability, DTU.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Asynchronous steady-state evolution.
+
+Instead of evaluating a whole generation and waiting for the slowest evaluation, a few offspring at a time are
+submitted to the workers. Whenever an evaluation completes the offspring replace the worst individuals, the archive
+and the observers are updated and new offspring are submitted, so the workers never wait on each other.
+"""
+
+from __future__ import absolute_import, print_function
+
+import collections
+import copy
+import logging
+import queue
+
+from inspyred.ec import Bounder, EvolutionaryComputation, Individual, replacers, selectors
+
+__all__ = ['SteadyStateGA']
+
+logger = logging.getLogger(__name__)
+
+
+class SteadyStateGA(EvolutionaryComputation):
+    """
+    Steady-state genetic algorithm with asynchronous evaluation.
+
+    Each completed evaluation counts as a generation: the offspring of `num_selected` parents (2 by default) replace
+    the worst individuals of the population (see inspyred.ec.replacers.steady_state_replacement).
+
+    If the evaluator has a `submit(candidates, callback, error_callback)` method (like the EvaluatorWrapper of a
+    TargetOptimization), up to `max_pending` batches of offspring are evaluated concurrently, by default twice the
+    evaluator's `concurrency`. Otherwise the offspring are evaluated one batch at a time. While waiting, the results
+    returned by `submit` are checked for errors, which are re-raised, and a TimeoutError is raised if no evaluation
+    completes within `evaluation_timeout` seconds (no limit by default).
+    """
+
+    # seconds between the checks of the pending evaluations
+    _poll_interval = 1.
+
+    def __init__(self, random):
+        EvolutionaryComputation.__init__(self, random)
+        self.selector = selectors.tournament_selection
+        self.replacer = replacers.steady_state_replacement
+
+    def evolve(self, generator, evaluator, pop_size=100, seeds=None, maximize=True, bounder=None, **args):
+        args.setdefault('num_selected', 2)
+        self._kwargs = args
+        self._kwargs['_ec'] = self
+
+        if seeds is None:
+            seeds = []
+        if bounder is None:
+            bounder = Bounder()
+
+        self.termination_cause = None
+        self.generator = generator
+        self.evaluator = evaluator
+        self.bounder = bounder
+        self.maximize = maximize
+        self.population = []
+        self.archive = []
+
+        initial_cs = list(seeds)
+        while len(initial_cs) < pop_size:
+            initial_cs.append(generator(random=self._random, args=self._kwargs))
+        initial_fit = evaluator(candidates=initial_cs, args=self._kwargs)
+        self.population = self._individuals(initial_cs, initial_fit)
+        self.num_evaluations = len(initial_fit)
+        self.num_generations = 0
+        self.archive = self.archiver(random=self._random, population=list(self.population),
+                                     archive=list(self.archive), args=self._kwargs)
+
+        observers = self.observer if isinstance(self.observer, collections.Iterable) else [self.observer]
+        variators = self.variator if isinstance(self.variator, collections.Iterable) else [self.variator]
+        self._observe(observers)
+
+        concurrency = getattr(evaluator, 'concurrency', 1)
+        max_pending = args.setdefault('max_pending', 2 * concurrency if concurrency > 1 else 1)
+        evaluation_timeout = args.setdefault('evaluation_timeout', None)
+        completed = queue.Queue()
+        running = []
+        pending = 0
+        terminated = self._should_terminate(list(self.population), self.num_generations, self.num_evaluations)
+        try:
+            while True:
+                while not terminated and pending < max_pending:
+                    parents = self.selector(random=self._random, population=list(self.population), args=self._kwargs)
+                    offspring_cs = [copy.deepcopy(i.candidate) for i in parents]
+                    for op in variators:
+                        offspring_cs = op(random=self._random, candidates=offspring_cs, args=self._kwargs)
+                    result = self._submit(evaluator, parents, offspring_cs, completed)
+                    if result is not None:
+                        running.append(result)
+                    pending += 1
+                if pending == 0:
+                    break
+
+                parents, offspring_cs, offspring_fit = self._next_completed(completed, running, evaluation_timeout)
+                pending -= 1
+                if isinstance(offspring_fit, BaseException):
+                    raise offspring_fit
+                offspring = self._individuals(offspring_cs, offspring_fit)
+                self.num_evaluations += len(offspring_fit)
+                self.population = self.replacer(random=self._random, population=self.population, parents=parents,
+                                                offspring=offspring, args=self._kwargs)
+                self.population = self.migrator(random=self._random, population=self.population, args=self._kwargs)
+                self.archive = self.archiver(random=self._random, archive=self.archive,
+                                             population=list(self.population), args=self._kwargs)
+                self.num_generations += 1
+                self._observe(observers)
+                # evaluations still running when the run terminates are completed and added, but not resubmitted
+                terminated = terminated or self._should_terminate(list(self.population), self.num_generations,
+                                                                  self.num_evaluations)
+        except KeyboardInterrupt as e:
+            if hasattr(evaluator, 'view'):
+                evaluator.view.shutdown()
+            raise e
+
+        return self.population
+
+    def _submit(self, evaluator, parents, offspring_cs, completed):
+        def callback(fitness):
+            completed.put((parents, offspring_cs, fitness))
+
+        if hasattr(evaluator, 'submit'):
+            return evaluator.submit(offspring_cs, callback, callback)
+        callback(evaluator(candidates=offspring_cs, args=self._kwargs))
+
+    def _next_completed(self, completed, running, timeout):
+        """Waits for the next completed evaluation, re-raising the errors of the pending asynchronous results."""
+        waited = 0.
+        while True:
+            for result in running:
+                if result.ready() and not result.successful():
+                    result.get()
+            running[:] = [result for result in running if not result.ready()]
+            try:
+                return completed.get(timeout=self._poll_interval)
+            except queue.Empty:
+                waited += self._poll_interval
+            if timeout is not None and waited >= timeout:
+                raise TimeoutError("No evaluation completed within %s seconds" % timeout)
+
+    def _individuals(self, candidates, fitness):
+        individuals = []
+        for cs, fit in zip(candidates, fitness):
+            if fit is not None:
+                individual = Individual(cs, maximize=self.maximize)
+                individual.fitness = fit
+                individuals.append(individual)
+            else:
+                logger.warning('excluding candidate %s because fitness received as None' % cs)
+        return individuals
+
+    def _observe(self, observers):
+        for observer in observers:
+            observer(population=list(self.population), num_generations=self.num_generations,
+                     num_evaluations=self.num_evaluations, args=self._kwargs)
@@ -17,11 +17,12 @@ from __future__ import absolute_import, print_function
 from inspyred.ec.variators import mutator, crossover
 from ordered_set import OrderedSet
 from cameo.strain_design.heuristic.evolutionary.genomes import MultipleChromosomeGenome
+from cameo.strain_design.heuristic.evolutionary.generators import floyd_sample
 from numpy import float32 as float
 
 import logging
 
-__all__ = ['set_mutation', 'set_indel']
+__all__ = ['set_mutation', 'set_indel', 'floyd_set_mutation', 'floyd_set_indel', 'floyd_set_n_point_crossover']
 
 logger = logging.getLogger(__name__)
 
@@ -163,6 +164,140 @@ def set_indel(random, individual, args):
     return sorted(new_individual)
 
 
+@crossover
+def floyd_set_n_point_crossover(random, mom, dad, args):
+    """
+    Set n-point crossover that only iterates over the elements of the parents.
+
+    The crossover points are positions in the sorted union of both parents, so that each chunk between two points
+    contains at least one element. The points (and the elements kept from children larger than max_size) are drawn
+    with Floyd's algorithm (see generators.floyd_sample).
+
+    Parameters
+    ----------
+
+    random: Random
+    mom: list
+        with unique integers
+    dad: list
+        with unique integers
+    args: dict
+
+    Returns
+    -------
+    list
+        the children of mom and dad (sorted lists)
+
+    """
+    crossover_rate = args.get('crossover_rate', 1.0)
+    num_crossover_points = args.get('num_crossover_points', 1)
+    max_size = args.get('max_size', 9)
+    if random.random() > crossover_rate:
+        return [mom, dad]
+
+    mom_set, dad_set = set(mom), set(dad)
+    representation = sorted(mom_set | dad_set)
+    # a point at position p > 0 starts a new chunk at representation[p]
+    positions = len(representation) - 1
+    points = set(p + 1 for p in floyd_sample(random, positions, min(num_crossover_points, positions)))
+
+    bro, sis = [], []
+    cross = True
+    for i, value in enumerate(representation):
+        if i in points:
+            cross = not cross
+        if value in mom_set:
+            (bro if cross else sis).append(value)
+        if value in dad_set:
+            (sis if cross else bro).append(value)
+
+    children = []
+    for child in (bro, sis):
+        if len(child) > max_size:
+            child = sorted(child[i] for i in floyd_sample(random, len(child), max_size))
+        # ensure number of knockouts > 0 or do not add individual
+        if len(child) > 0:
+            children.append(child)
+
+    return children
+
+
+@mutator
+def floyd_set_mutation(random, individual, args):
+    """
+    Mutates a given set based on the entries available on the representation.
+
+    Same as set_mutation, but the new entries are sampled with Floyd's algorithm in O(len(individual)) instead of
+    building the list of all indices in the representation.
+
+    Parameters
+    ----------
+
+    random: Random
+    individual: list
+        with unique integers
+    args: dict
+        must contain the representation
+
+    Returns
+    -------
+    list
+        created based on an ordered set
+
+    """
+    representation = args.get('representation')
+    mutation_rate = float(args.get('mutation_rate', .1))
+    mutate = [random.random() < mutation_rate for _ in individual]
+    num_mutations = min(sum(mutate), len(representation) - len(individual))
+    replacements = iter(floyd_sample(random, len(representation), num_mutations, exclude=individual))
+    new_individual = [next(replacements, value) if mutated else value for value, mutated in zip(individual, mutate)]
+
+    assert len(individual) == len(new_individual)
+    return sorted(new_individual)
+
+
+@mutator
+def floyd_set_indel(random, individual, args):
+    """
+    Creates a random insertion or deletion in the individual.
+
+    Same as set_indel, but the inserted entry is sampled with Floyd's algorithm instead of building the list of all
+    indices in the representation.
+
+    Parameters
+    ----------
+
+    random: Random
+    individual: list
+        with unique integers
+    args: dict
+        must contain the representation
+
+    Returns
+    -------
+    list
+        created based on an ordered set
+
+    """
+    if not args.get("variable_size", True):
+        return list(individual)
+
+    max_size = args.get("max_size", 9)
+    representation = args.get('representation')
+    indel_rate = float(args.get('indel_rate', .1))
+    new_individual = list(individual)
+    if random.random() < indel_rate:
+        logger.info("Applying indel mutation")
+        if random.random() > 0.5 and len(new_individual) < min(max_size, len(representation)):
+            new_individual += floyd_sample(random, len(representation), 1, exclude=individual)
+        else:
+            if len(new_individual) > 1:
+                new_individual = random.sample(new_individual, len(new_individual) - 1)
+
+    assert 0 < len(new_individual) <= max_size
+    return sorted(new_individual)
+
+
 @mutator
 def multiple_chromosome_set_mutation(random, individual, args):
     """
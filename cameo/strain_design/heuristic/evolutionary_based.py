@@ -24,6 +24,7 @@ from IProgress.widgets import Bar, Percentage
 from pandas import DataFrame
 
 from cobra import Model
+from cameo import config
 from cameo.core.strain_design import StrainDesignMethod, StrainDesignMethodResult, StrainDesign
 from cameo.core.target import ReactionKnockoutTarget, GeneKnockoutTarget, ReactionCofactorSwapTarget
 from cameo.core.manipulation import swap_cofactors
@@ -31,13 +32,14 @@ from cobra.exceptions import OptimizationError
 from cameo.flux_analysis.analysis import phenotypic_phase_plane
 from cameo.flux_analysis.simulation import fba
 from cameo.strain_design.heuristic.evolutionary.archives import ProductionStrainArchive
+from cameo.strain_design.heuristic.evolutionary.decoders import CompiledGeneReactionRules
 from cameo.strain_design.heuristic.evolutionary.objective_functions import biomass_product_coupled_min_yield, \
     biomass_product_coupled_yield
 from cameo.strain_design.heuristic.evolutionary.optimization import GeneKnockoutOptimization, \
     ReactionKnockoutOptimization, CofactorSwapOptimization, NADH_NADPH
 from cameo.strain_design.heuristic.evolutionary.processing import process_reaction_knockout_solution, \
-    process_gene_knockout_solution, process_reaction_swap_solution
-from cameo.util import TimeMachine
+    process_gene_knockout_solution, process_reaction_swap_solution, SolutionProcessor
+from cameo.util import TimeMachine, partition
 from cameo.core.utils import get_reaction_for
 
 __all__ = ["OptGene"]
@@ -87,7 +89,7 @@ class OptGene(StrainDesignMethod):
 
     def run(self, target=None, biomass=None, substrate=None, max_knockouts=5, variable_size=True,
             simulation_method=fba, growth_coupled=False, max_evaluations=20000, population_size=200,
-            max_results=50, use_nullspace_simplification=True, seed=None, **kwargs):
+            max_results=50, use_nullspace_simplification=True, seed=None, view=config.default_view, **kwargs):
         """
         Parameters
         ----------
@@ -118,6 +120,8 @@ class OptGene(StrainDesignMethod):
         use_nullspace_simplification : Boolean (default True)
             Use a basis for the nullspace to find groups of reactions whose fluxes are multiples of each other and dead
             end reactions. From each of these groups only 1 reaction will be included as a possible knockout.
+        view : cameo.parallel.SequentialView, cameo.parallel.MultiprocessingView
+            A view for single or multiprocessing, used for the optimization and to process the solutions.
 
 
         Returns
@@ -162,12 +166,39 @@ class OptGene(StrainDesignMethod):
                                             maximize=True,
                                             max_archive_size=max_results,
                                             seed=seed,
+                                            view=view,
                                             **kwargs)
 
         kwargs.update(optimization_algorithm.simulation_kwargs)
 
         return OptGeneResult(self._model, result, objective_function, simulation_method, self.manipulation_type,
-                             biomass, target, substrate, kwargs)
+                             biomass, target, substrate, kwargs, view=view)
+
+
+def _rows_to_data_frame(rows, columns):
+    """Build a DataFrame at once from a list of rows, one list per column (enlarging it row by row is quadratic)."""
+    return DataFrame({column: list(values) for column, values in zip(columns, zip(*rows))}, columns=columns)
+
+
+def _process_in_batches(processor, solutions, view):
+    """
+    Process solutions in batches on a view, collecting the rows as the batches finish.
+
+    On a parallel view there is one batch per worker, so the model is sent once to each worker. On a sequential view
+    every solution is its own batch, which only updates the progress bar more often.
+    """
+    if view is None:
+        view = config.default_view
+    batches = partition(solutions, len(view) if len(view) > 1 else len(solutions))
+    progress = ProgressBar(maxval=len(batches), widgets=["Processing solutions: ", Bar(), Percentage()])
+    rows = []
+    try:
+        for batch_rows in progress(view.imap(processor, batches)):
+            rows.extend(batch_rows)
+    except KeyboardInterrupt as e:
+        view.shutdown()
+        raise e
+    return rows
 
 
 class OptGeneResult(StrainDesignMethodResult):
@@ -178,7 +209,7 @@ class OptGeneResult(StrainDesignMethodResult):
     }
 
     def __init__(self, model, knockouts, objective_function, simulation_method, manipulation_type,
-                 biomass, target, substrate, simulation_kwargs, *args, **kwargs):
+                 biomass, target, substrate, simulation_kwargs, view=None, *args, **kwargs):
         super(OptGeneResult, self).__init__(self._generate_designs(knockouts, manipulation_type), *args, **kwargs)
         assert isinstance(model, Model)
 
@@ -192,6 +223,7 @@ class OptGeneResult(StrainDesignMethodResult):
         self._substrate = substrate
         self._processed_solutions = None
         self._simulation_kwargs = simulation_kwargs
+        self._view = view
 
     @staticmethod
     def _generate_designs(knockouts, manipulation_type):
@@ -245,46 +277,41 @@ class OptGeneResult(StrainDesignMethodResult):
             self._process_gene_knockout_solutions()
 
     def _process_gene_knockout_solutions(self):
-        processed_solutions = DataFrame(columns=["reactions", "genes", "size", "fva_min", "fva_max",
-                                                 "target_flux", "biomass_flux", "yield", "fitness"])
+        columns = ["reactions", "genes", "size", "fva_min", "fva_max", "target_flux", "biomass_flux", "yield",
+                   "fitness"]
+        rows = []
 
         if len(self._knockouts) == 0:
             logger.warn("No solutions found")
-            self._processed_solutions = processed_solutions
 
         else:
-            progress = ProgressBar(maxval=len(self._knockouts), widgets=["Processing solutions: ", Bar(), Percentage()])
-            for i, solution in progress(enumerate(self._knockouts)):
-                try:
-                    processed_solutions.loc[i] = process_gene_knockout_solution(
-                        self._model, solution[0], self._simulation_method, self._simulation_kwargs, self._biomass,
-                        self._target, self._substrate, self._objective_function)
-                except OptimizationError as e:
-                    logger.error(e)
-                    processed_solutions.loc[i] = [numpy.nan for _ in processed_solutions.columns]
-
-            self._processed_solutions = processed_solutions
+            genes = sorted(set(gene_id for solution in self._knockouts for gene_id in solution[0]))
+            rules = CompiledGeneReactionRules(self._model, genes)
+            processor = SolutionProcessor(process_gene_knockout_solution, self._model, columns,
+                                          simulation_method=self._simulation_method,
+                                          simulation_kwargs=self._simulation_kwargs, biomass=self._biomass,
+                                          target=self._target, substrate=self._substrate,
+                                          objective_function=self._objective_function, rules=rules)
+            rows = _process_in_batches(processor, [solution[0] for solution in self._knockouts], self._view)
+
+        self._processed_solutions = _rows_to_data_frame(rows, columns)
 
     def _process_reaction_knockout_solutions(self):
-        processed_solutions = DataFrame(columns=["reactions", "size", "fva_min", "fva_max",
-                                                 "target_flux", "biomass_flux", "yield", "fitness"])
+        columns = ["reactions", "size", "fva_min", "fva_max", "target_flux", "biomass_flux", "yield", "fitness"]
+        rows = []
 
         if len(self._knockouts) == 0:
             logger.warn("No solutions found")
-            self._processed_solutions = processed_solutions
 
         else:
-            progress = ProgressBar(maxval=len(self._knockouts), widgets=["Processing solutions: ", Bar(), Percentage()])
-            for i, solution in progress(enumerate(self._knockouts)):
-                try:
-                    processed_solutions.loc[i] = process_reaction_knockout_solution(
-                        self._model, solution[0], self._simulation_method, self._simulation_kwargs, self._biomass,
-                        self._target, self._substrate, self._objective_function)
-                except OptimizationError as e:
-                    logger.error(e)
-                    processed_solutions.loc[i] = [numpy.nan for _ in processed_solutions.columns]
-
-            self._processed_solutions = processed_solutions
+            processor = SolutionProcessor(process_reaction_knockout_solution, self._model, columns,
+                                          simulation_method=self._simulation_method,
+                                          simulation_kwargs=self._simulation_kwargs, biomass=self._biomass,
+                                          target=self._target, substrate=self._substrate,
+                                          objective_function=self._objective_function)
+            rows = _process_in_batches(processor, [solution[0] for solution in self._knockouts], self._view)
+
+        self._processed_solutions = _rows_to_data_frame(rows, columns)
 
     def display_on_map(self, index=0, map_name=None, palette="YlGnBu"):
         with self._model:
@@ -334,7 +361,7 @@ class HeuristicOptSwap(StrainDesignMethod):
 
     def run(self, target=None, biomass=None, substrate=None, max_swaps=5, variable_size=True,
             simulation_method=fba, growth_coupled=False, max_evaluations=20000, population_size=200,
-            time_machine=None, max_results=50, seed=None, **kwargs):
+            time_machine=None, max_results=50, seed=None, view=config.default_view, **kwargs):
         """
         Parameters
         ----------
@@ -364,6 +391,8 @@ class HeuristicOptSwap(StrainDesignMethod):
             Arguments for the simulation method.
         seed : int
             A seed for random.
+        view : cameo.parallel.SequentialView, cameo.parallel.MultiprocessingView
+            A view for single or multiprocessing, used for the optimization and to process the solutions.
 
 
         Returns
@@ -396,19 +425,20 @@ class HeuristicOptSwap(StrainDesignMethod):
                                             maximize=True,
                                             max_archive_size=max_results,
                                             seed=seed,
+                                            view=view,
                                             **kwargs)
 
         kwargs.update(optimization_algorithm.simulation_kwargs)
 
         return HeuristicOptSwapResult(self._model, result, self._swap_pairs, objective_function,
-                                      simulation_method, biomass, target, substrate, kwargs)
+                                      simulation_method, biomass, target, substrate, kwargs, view=view)
 
 
 class HeuristicOptSwapResult(StrainDesignMethodResult):
     __method_name__ = "HeuristicOptSwap"
 
     def __init__(self, model, swaps, swap_pairs, objective_function, simulation_method, biomass, target,
-                 substrate, simulation_kwargs, *args, **kwargs):
+                 substrate, simulation_kwargs, view=None, *args, **kwargs):
         super(HeuristicOptSwapResult, self).__init__(self._generate_designs(swaps, swap_pairs), *args, **kwargs)
         assert isinstance(model, Model)
 
@@ -422,6 +452,7 @@ class HeuristicOptSwapResult(StrainDesignMethodResult):
         self._substrate = substrate
         self._processed_solutions = None
         self._simulation_kwargs = simulation_kwargs
+        self._view = view
 
     @staticmethod
     def _generate_designs(swaps, swap_pair):
@@ -455,25 +486,21 @@ class HeuristicOptSwapResult(StrainDesignMethodResult):
         return data_frame
 
     def _process_solutions(self):
-        processed_solutions = DataFrame(columns=["reactions", "size", "fva_min", "fva_max",
-                                                 "target_flux", "biomass_flux", "yield", "fitness"])
+        columns = ["reactions", "size", "fva_min", "fva_max", "target_flux", "biomass_flux", "yield", "fitness"]
+        rows = []
 
         if len(self._swaps) == 0:
             logger.warn("No solutions found")
-            self._processed_solutions = processed_solutions
 
         else:
-            progress = ProgressBar(maxval=len(self._swaps), widgets=["Processing solutions: ", Bar(), Percentage()])
-            for i, solution in progress(enumerate(self._swaps)):
-                try:
-                    processed_solutions.loc[i] = process_reaction_swap_solution(
-                        self._model, solution[0], self._simulation_method, self._simulation_kwargs, self._biomass,
-                        self._target, self._substrate, self._objective_function, self._swap_pairs)
-                except OptimizationError as e:
-                    logger.error(e)
-                    processed_solutions.loc[i] = [numpy.nan for _ in processed_solutions.columns]
-
-            self._processed_solutions = processed_solutions
+            processor = SolutionProcessor(process_reaction_swap_solution, self._model, columns,
+                                          simulation_method=self._simulation_method,
+                                          simulation_kwargs=self._simulation_kwargs, biomass=self._biomass,
+                                          target=self._target, substrate=self._substrate,
+                                          objective_function=self._objective_function, swap_pairs=self._swap_pairs)
+            rows = _process_in_batches(processor, [solution[0] for solution in self._swaps], self._view)
+
+        self._processed_solutions = _rows_to_data_frame(rows, columns)
 
     def display_on_map(self, index=0, map_name=None, palette="YlGnBu"):
         with self._model:
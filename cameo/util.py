@@ -519,6 +519,7 @@ def memoize(function, memo={}):
             memo[args] = rv
             return rv
 
+    wrapper.memo = memo
     return wrapper
 
 
@@ -647,3 +648,26 @@ def current_solver_name(model):
     """
     interface = model.solver.interface.__name__
     return re.sub(r"optlang.|.interface", "", interface)
+
+
+def linear_terms(expression):
+    """Split a linear expression into its coefficients and constant.
+
+    Parameters
+    ----------
+    expression : optlang.symbolics.Basic
+        A linear expression, e.g. the expression of an optlang constraint or objective.
+
+    Returns
+    -------
+    tuple
+        The coefficients as {variable_name: coefficient} and the constant.
+    """
+    coefficients = {}
+    constant = 0.
+    for term, coefficient in expression.as_coefficients_dict().items():
+        if term.is_Number:
+            constant += float(coefficient) * float(term)
+        else:
+            coefficients[term.name] = coefficients.get(term.name, 0.) + float(coefficient)
+    return coefficients, constant
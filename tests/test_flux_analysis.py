@@ -19,6 +19,7 @@ from __future__ import absolute_import
 import copy
 import os
 import re
+from itertools import islice
 
 import numpy as np
 import pandas
@@ -528,6 +529,51 @@ class TestStructural:
                     assert all(r in blocked_reactions for r in group if r != representative)
                 assert representative in core_model.reactions
 
+    def test_minimal_cut_sets_of_size_one_are_essential_reactions(self, core_model):
+        biomass = core_model.reactions.Biomass_Ecoli_core_N_LPAREN_w_FSLASH_GAM_RPAREN__Nmet2
+        target = core_model.problem.Constraint(biomass.flux_expression, lb=0.1)
+        mcs_enumerator = structural.MinimalCutSetsEnumerator(core_model, target, max_size=1)
+        cut_sets = list(mcs_enumerator)
+        assert all(len(mcs) == 1 for mcs in cut_sets)
+        essential_reactions = {r.id for r in find_essential_reactions(core_model, threshold=0.1)}
+        assert set.union(*cut_sets) == essential_reactions
+
+    def test_minimal_cut_sets(self, core_model):
+        biomass = core_model.reactions.Biomass_Ecoli_core_N_LPAREN_w_FSLASH_GAM_RPAREN__Nmet2
+        target = core_model.problem.Constraint(biomass.flux_expression, lb=0.1)
+        exclude = ['TALA', 'PPC']
+        mcs_enumerator = structural.MinimalCutSetsEnumerator(core_model, target, exclude=exclude, max_size=2)
+        cut_sets = list(islice(mcs_enumerator, 30))
+        assert list(map(len, cut_sets)) == sorted(map(len, cut_sets))
+        assert max(map(len, cut_sets)) == 2
+
+        def knock_out_and_grow(reaction_ids):
+            with core_model:
+                for reaction_id in reaction_ids:
+                    core_model.reactions.get_by_id(reaction_id).knock_out()
+                return core_model.slim_optimize(error_value=0.)
+
+        for mcs in cut_sets:
+            assert not mcs.intersection(exclude)
+            assert knock_out_and_grow(mcs) < 0.1
+            for reaction_id in mcs:
+                assert knock_out_and_grow(mcs - {reaction_id}) >= 0.1
+
+    def test_minimal_cut_sets_parallel(self, core_model):
+        biomass = core_model.reactions.Biomass_Ecoli_core_N_LPAREN_w_FSLASH_GAM_RPAREN__Nmet2
+        target = core_model.problem.Constraint(biomass.flux_expression, lb=0.1)
+        mcs_enumerator = structural.MinimalCutSetsEnumerator(core_model, target, max_size=1)
+        sequential = list(mcs_enumerator.enumerate())
+        view = MultiprocessingView(processes=2)
+        parallel = list(mcs_enumerator.enumerate(view=view))
+        view.shutdown()
+        assert sorted(map(sorted, parallel)) == sorted(map(sorted, sequential))
+
+    def test_minimal_cut_sets_benchmark(self, core_model, benchmark):
+        biomass = core_model.reactions.Biomass_Ecoli_core_N_LPAREN_w_FSLASH_GAM_RPAREN__Nmet2
+        target = core_model.problem.Constraint(biomass.flux_expression, lb=0.1)
+        benchmark(lambda: list(structural.MinimalCutSetsEnumerator(core_model, target, max_size=1)))
+
 
 class TestNullSpace:
     def test_wikipedia_toy(self):
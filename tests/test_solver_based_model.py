@@ -30,9 +30,11 @@ import pytest
 from cobra.util import fix_objective_as_constraint
 from cobra import Model, Reaction, Metabolite
 from cobra.exceptions import OptimizationError
+from optlang.symbolics import Zero
 
 from cameo import load_model
 from cameo.config import solvers
+from cameo.core.model_dual import add_dual_problem, convert_to_dual
 from cameo.core.utils import get_reaction_for, load_medium, medium
 from cameo.flux_analysis.structural import create_stoichiometric_array
 from cameo.flux_analysis.analysis import find_essential_metabolites
@@ -986,3 +988,30 @@ class TestMetabolite:
              </tr>
         </table>""".replace(' ', '')
         assert met._repr_html_().replace(' ', '') == expected
+
+
+class TestModelDual:
+    def test_convert_to_dual(self, core_model):
+        fix_objective_as_constraint(core_model, fraction=0.1)
+        primal_optimum = core_model.slim_optimize()
+        dual = convert_to_dual(core_model.solver)
+        assert dual.objective.direction == "min"
+        assert len(dual.constraints) == len(core_model.variables)
+        assert dual.optimize() == "optimal"
+        assert abs(dual.objective.value - primal_optimum) < 1e-6
+
+    def test_add_dual_problem(self, core_model):
+        primal_optimum = core_model.slim_optimize()
+        primal_objective = core_model.solver.objective
+        dual_objective = add_dual_problem(core_model.solver)
+        for variable in (core_model.reactions.PGK.forward_variable, core_model.reactions.PGK.reverse_variable):
+            assert "dual_" + variable.name in core_model.solver.constraints
+            assert "dual_" + variable.name + "_ub" in core_model.solver.variables
+        # strong duality: the combined problem keeps the primal optimum
+        coefficients = {variable: -coefficient for variable, coefficient in dual_objective.items()}
+        coefficients.update(primal_objective.get_linear_coefficients(primal_objective.variables))
+        strong_duality = core_model.problem.Constraint(Zero, lb=0, ub=0, name="strong_duality")
+        core_model.solver.add(strong_duality)
+        core_model.solver.update()
+        strong_duality.set_linear_coefficients(coefficients)
+        assert abs(core_model.slim_optimize() - primal_optimum) < 1e-6
@@ -14,8 +14,11 @@
 
 from __future__ import absolute_import, print_function
 
+import gzip
+import json
 import os
 
+import numpy
 import pandas
 import pytest
 from pandas import DataFrame
@@ -25,9 +28,15 @@ from cobra.exceptions import OptimizationError
 
 import cameo
 from cameo.config import solvers
+from cameo.flux_analysis.analysis import flux_variability_analysis
+from cameo.flux_analysis.simulation import fba
+from cameo.parallel import MultiprocessingView, SequentialView
 from cameo.strain_design.deterministic.flux_variability_based import (FSEOF,
                                                                       DifferentialFVA,
-                                                                      FSEOFResult)
+                                                                      FSEOFResult,
+                                                                      _DifferentialFvaEvaluator,
+                                                                      _boustrophedon_order,
+                                                                      _sparse_grid_mask)
 from cameo.strain_design.deterministic.linear_programming import OptKnock, GrowthCouplingPotential
 
 CI = bool(os.getenv('CI', False))
@@ -42,6 +51,14 @@ def cplex_optknock(model):
     return cplex_core, OptKnock(cplex_core)
 
 
+@pytest.fixture(scope='module')
+def glpk_optknock():
+    glpk_core = cameo.load_model(os.path.join(TESTDIR, 'data', 'EcoliCore.xml'))
+    glpk_core.reactions.Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2.lower_bound = 0.1
+    glpk_core.solver = "glpk"
+    return glpk_core, OptKnock(glpk_core, fraction_of_optimum=0.1)
+
+
 @pytest.fixture(scope='module')
 def diff_fva(model):
     return DifferentialFVA(model, model.reactions.EX_succ_lp_e_rp_, points=5)
@@ -76,6 +93,25 @@ class TestFSEOF:
         assert isinstance(fseof_result.data_frame, DataFrame)
         assert fseof_result.target is model.reactions.EX_ac_lp_e_rp_
         assert fseof_result.model is model
+        assert len(list(fseof_result)) == len(fseof_result.enforced_levels)
+
+    def test_fseof_warm_start(self, model):
+        fseof = FSEOF(model)
+        warm_result = fseof.run(target="EX_succ_lp_e_rp_")
+        result = fseof.run(target="EX_succ_lp_e_rp_", simulation_method=lambda model, **kwargs: fba(model, **kwargs))
+        assert warm_result.reactions == result.reactions
+        assert_frame_equal(warm_result.data_frame, result.data_frame)
+
+    def test_fvseof(self, model):
+        objective = model.objective
+        fseof = FSEOF(model)
+        fseof_result = fseof.run(target="EX_succ_lp_e_rp_", variability=True, fraction_of_optimum=0.99)
+        assert objective.expression == model.objective.expression
+        assert set(fseof_result.flux_ranges) == set(reaction.id for reaction in fseof_result.reactions)
+        for reaction_id, ranges in fseof_result.flux_ranges.items():
+            assert ranges.shape == (len(fseof_result.enforced_levels), 2)
+            assert numpy.all(ranges[:, 0] <= ranges[:, 1])
+            numpy.testing.assert_allclose(fseof_result.data_frame.loc[reaction_id], ranges.mean(axis=1), atol=1e-5)
 
 
 class TestDifferentialFVA:
@@ -105,6 +141,80 @@ class TestDifferentialFVA:
                     works.append(False)
         assert any(works)
 
+    def test_evaluator_matches_fva(self, model):
+        biomass = "Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2"
+        reactions = ["PGI", "PFL", "FUM", "SUCDi", "EX_succ_lp_e_rp_"]
+        evaluator = _DifferentialFvaEvaluator(model, [biomass], "EX_succ_lp_e_rp_", reactions)
+        grid = [(0.1, 1.), (0.2, 2.), (0.5, 0.)]
+        points, ranges = evaluator(grid)
+        assert ranges.shape == (3, len(reactions), 2)
+        numpy.testing.assert_array_equal(points, grid)
+        for point, point_ranges in zip(grid, ranges):
+            with model:
+                model.reactions.get_by_id(biomass).bounds = (point[0], point[0])
+                model.reactions.EX_succ_lp_e_rp_.bounds = (point[1], point[1])
+                expected = flux_variability_analysis(model, reactions=reactions, view=SequentialView()).data_frame
+            numpy.testing.assert_allclose(point_ranges, expected.loc[reactions, ['lower_bound', 'upper_bound']],
+                                          atol=1e-6)
+        assert model.reactions.get_by_id(biomass).bounds == (0, 1000)
+        assert model.reactions.EX_succ_lp_e_rp_.bounds == (0, 1000)
+
+    def test_interval_gaps(self):
+        reference = numpy.array([[0., 1.], [2., 5.], [-4., -1.], [-1., 1.]])
+        intervals = numpy.array([[[0.5, 2.], [6., 8.], [-6., -5.], [0., 0.]],
+                                 [[-3., -2.], [0., 1.], [1., 2.], [3., 4.]]])
+        gaps = DifferentialFVA._interval_gaps(reference, intervals)
+        expected = [[DifferentialFVA._interval_gap(reference_interval, interval)
+                     for reference_interval, interval in zip(reference, point_intervals)]
+                    for point_intervals in intervals]
+        numpy.testing.assert_array_equal(gaps, expected)
+
+    def test_sparse_grid(self):
+        indices = numpy.array(numpy.unravel_index(numpy.arange(100), (10, 10))).T
+        mask = _sparse_grid_mask(indices, 10)
+        assert mask.sum() == 53
+        # the grid lines at the boundaries are complete
+        assert mask[(indices == 0).any(axis=1) | (indices == 9).any(axis=1)].all()
+        assert _sparse_grid_mask(indices[:10, 1:], 10).all()
+        order = _boustrophedon_order(indices, 10)
+        assert sorted(order) == list(range(100))
+        assert (numpy.abs(numpy.diff(indices[order], axis=0)).sum(axis=1) == 1).all()
+
+    def test_multiple_variables_grid(self, model):
+        variables = ["Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2", "EX_o2_lp_e_rp_"]
+        diff_fva = DifferentialFVA(model, model.reactions.EX_succ_lp_e_rp_, variables=variables, points=5)
+        diff_fva.reference_flux_ranges = DataFrame({'lower_bound': [0.]}, index=["EX_succ_lp_e_rp_"])
+        diff_fva._init_search_grid(surface_only=True, improvements_only=False, sparse=False)
+        envelope = diff_fva.envelope.data_frame.dropna()
+        assert list(diff_fva.grid.columns) == variables + ["EX_succ_lp_e_rp_"]
+        assert len(diff_fva.grid) == len(envelope)
+        surface = diff_fva.grid.merge(envelope, on=variables)
+        numpy.testing.assert_allclose(surface["EX_succ_lp_e_rp_"], surface["objective_upper_bound"])
+        full_grid = diff_fva.grid
+        diff_fva._init_search_grid(surface_only=True, improvements_only=False, sparse=True)
+        assert 0 < len(diff_fva.grid) < len(full_grid)
+        distances = numpy.abs(diff_fva.grid.values[:, numpy.newaxis] - full_grid.values[numpy.newaxis]).max(axis=2)
+        assert (distances.min(axis=1) < 1e-6).all()
+
+    def test_prune(self, diff_fva):
+        result = diff_fva.run(progress=False)
+        pruned_result = diff_fva.run(progress=False, prune=True)
+        reference_intervals = diff_fva.reference_flux_ranges.loc[
+            diff_fva.included_reactions, ['lower_bound', 'upper_bound']].values
+        scanned, fixed, global_ranges = diff_fva._prune(reference_intervals, None, SequentialView())
+        assert not scanned.all()
+        assert not (scanned & fixed).any()
+        assert (global_ranges[fixed, 0] == global_ranges[fixed, 1]).all()
+        included = numpy.asarray(diff_fva.included_reactions)
+        assert {"Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2", "EX_succ_lp_e_rp_"} <= set(included[scanned])
+        # the pruned reactions are still in the results, which are the same with and without pruning
+        solutions, pruned_solutions = (r.solutions.reset_index(drop=True) for r in (result, pruned_result))
+        assert list(solutions.columns) == list(pruned_solutions.columns)
+        assert (solutions.reaction == pruned_solutions.reaction).all()
+        for column in solutions.columns.drop('reaction'):
+            numpy.testing.assert_allclose(solutions[column].astype(float), pruned_solutions[column].astype(float),
+                                          atol=1e-6)
+
     def test_diff_fva_benchmark(self, diff_fva, benchmark):
         benchmark(diff_fva.run)
 
@@ -162,6 +272,67 @@ class TestOptKnock:
         with pytest.raises(ValueError):
             optknock.run(biomass="Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2")
 
+    def test_save_and_load(self, cplex_optknock, tmpdir):
+        _, optknock = cplex_optknock
+        path = str(tmpdir.join("core.optknock"))
+        optknock.save(path)
+        loaded = OptKnock.load(path)
+        assert len(loaded._y_vars) == len(optknock._y_vars)
+        result = optknock.run(max_knockouts=1, target="EX_ac_lp_e_rp_",
+                              biomass="Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2", max_results=1)
+        loaded_result = loaded.run(max_knockouts=1, target="EX_ac_lp_e_rp_",
+                                   biomass="Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2", max_results=1)
+        assert abs(result.production[0] - loaded_result.production[0]) < 1e-6
+
+    def test_screen(self, cplex_optknock):
+        _, optknock = cplex_optknock
+        targets = ["EX_ac_lp_e_rp_", "EX_etoh_lp_e_rp_"]
+        results = optknock.screen(targets, biomass="Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2", max_knockouts=1,
+                                  view=MultiprocessingView(processes=2))
+        assert sorted(results) == targets
+        for target, result in results.items():
+            expected = optknock.run(max_knockouts=1, target=target,
+                                    biomass="Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2")
+            assert result.target == target
+            assert abs(result.production[0] - expected.production[0]) < 1e-6
+
+
+class TestOptKnockPickling:
+    def test_save_and_load(self, glpk_optknock, tmpdir):
+        _, optknock = glpk_optknock
+        path = str(tmpdir.join("core.optknock"))
+        optknock.save(path)
+        with gzip.open(path, 'rt') as problem_file:
+            assert json.load(problem_file)['format_version'] == OptKnock._format_version
+        loaded = OptKnock.load(path)
+        assert len(loaded._y_vars) == len(optknock._y_vars)
+        assert loaded._model.solver.objective.direction == optknock._model.solver.objective.direction
+        biomass = "Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2"
+        expected = optknock.run(max_knockouts=1, target="EX_ac_lp_e_rp_", biomass=biomass)
+        result = loaded.run(max_knockouts=1, target="EX_ac_lp_e_rp_", biomass=biomass)
+        assert result.knockouts == expected.knockouts
+        assert abs(result.production[0] - expected.production[0]) < 1e-6
+
+    def test_load_rejects_other_files(self, tmpdir):
+        path = str(tmpdir.join("other.optknock"))
+        with gzip.open(path, 'wt') as problem_file:
+            json.dump([1, 2, 3], problem_file)
+        with pytest.raises(TypeError):
+            OptKnock.load(path)
+
+    def test_screen(self, glpk_optknock):
+        _, optknock = glpk_optknock
+        targets = ["EX_ac_lp_e_rp_", "EX_etoh_lp_e_rp_"]
+        expected = optknock.run(max_knockouts=1, target=targets[0],
+                                biomass="Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2")
+        for processes in (1, 2):
+            results = optknock.screen(targets, biomass="Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2", max_knockouts=1,
+                                      view=MultiprocessingView(processes=processes))
+            assert sorted(results) == targets
+            assert results[targets[0]].knockouts == expected.knockouts
+            assert abs(results[targets[0]].production[0] - expected.production[0]) < 1e-6
+            assert results[targets[1]].production[0] > 0
+
 
 # @pytest.mark.skipif('gurobi' not in solvers, reason="No gurobi interface available")
 class TestGrowthCouplingPotential:
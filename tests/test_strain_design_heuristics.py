@@ -14,11 +14,14 @@
 
 from __future__ import absolute_import, print_function
 
+import csv
+import json
 import os
 import pickle
 import time
-from collections import namedtuple
+from collections import Counter, namedtuple
 from math import sqrt
+from multiprocessing.queues import Empty, Full
 from tempfile import mkstemp
 
 import inspyred
@@ -28,29 +31,45 @@ from inspyred.ec import Bounder
 from inspyred.ec.emo import Pareto
 from ordered_set import OrderedSet
 
-from cameo import config, fba
+from cameo import config, fba, flux_variability_analysis, pfba
 from cameo.core.manipulation import swap_cofactors
-from cameo.parallel import SequentialView
+from cameo.parallel import MultiprocessingView, SequentialView
 from cameo.strain_design import OptGene
-from cameo.strain_design.heuristic.evolutionary.archives import (BestSolutionArchive,
+from cameo.strain_design.heuristic.evolutionary_based import _process_in_batches, _rows_to_data_frame
+from cameo.strain_design.heuristic.evolutionary.archives import (BestSolutionArchive, ParetoArchive,
                                                                  Individual)
+from cameo.strain_design.heuristic.evolutionary.checkpoints import load_checkpoint, save_checkpoint
 from cameo.strain_design.heuristic.evolutionary.decoders import (GeneSetDecoder,
                                                                  ReactionSetDecoder,
                                                                  SetDecoder)
-from cameo.strain_design.heuristic.evolutionary.evaluators import KnockoutEvaluator
-from cameo.strain_design.heuristic.evolutionary.generators import (linear_set_generator,
+from cameo.strain_design.heuristic.evolutionary.evaluators import (KnockoutEvaluator, LethalSetIndex, SwapEvaluator,
+                                                                   TargetEvaluator, locality_order)
+from cameo.strain_design.heuristic.evolutionary.generators import (floyd_sample,
+                                                                   floyd_set_generator,
+                                                                   linear_set_generator,
                                                                    multiple_chromosome_set_generator,
                                                                    set_generator)
 from cameo.strain_design.heuristic.evolutionary.genomes import MultipleChromosomeGenome
 from cameo.strain_design.heuristic.evolutionary.metrics import (euclidean_distance,
                                                                 manhattan_distance)
-from cameo.strain_design.heuristic.evolutionary.multiprocess.migrators import MultiprocessingMigrator
+from cameo.strain_design.heuristic.evolutionary.multiprocess.channels import SharedMemory, make_backend
+from cameo.strain_design.heuristic.evolutionary.multiprocess.optimization import \
+    MultiprocessReactionKnockoutOptimization
+from cameo.strain_design.heuristic.evolutionary.multiprocess.migrators import (MultiprocessingMigrator,
+                                                                               fully_connected_topology,
+                                                                               ring_topology, star_topology)
+from cameo.strain_design.heuristic.evolutionary.pareto import (SPEA2, crowding_distance, fitness_matrix,
+                                                               non_dominated_sort, nsga_replacement,
+                                                               spea2_replacement)
 from cameo.strain_design.heuristic.evolutionary.objective_functions import (MultiObjectiveFunction,
                                                                             YieldFunction,
                                                                             biomass_product_coupled_min_yield,
                                                                             biomass_product_coupled_yield,
                                                                             number_of_knockouts,
                                                                             product_yield)
+from cameo.strain_design.heuristic.evolutionary.processing import (SolutionProcessor,
+                                                                   process_reaction_knockout_solution,
+                                                                   target_flux_range)
 from cameo.strain_design.heuristic.evolutionary.optimization import (NADH_NADPH,
                                                                      CofactorSwapOptimization,
                                                                      EvaluatorWrapper,
@@ -60,14 +79,20 @@ from cameo.strain_design.heuristic.evolutionary.optimization import (NADH_NADPH,
                                                                      TargetOptimizationResult,
                                                                      set_distance_function,
                                                                      GeneKnockoutOptimization)
+from cameo.strain_design.heuristic.evolutionary.steady_state import SteadyStateGA
 from cameo.strain_design.heuristic.evolutionary.variators import (_do_set_n_point_crossover,
+                                                                  floyd_set_indel,
+                                                                  floyd_set_mutation,
+                                                                  floyd_set_n_point_crossover,
                                                                   multiple_chromosome_set_indel,
                                                                   multiple_chromosome_set_mutation,
                                                                   set_indel,
                                                                   set_mutation,
                                                                   set_n_point_crossover)
+from cobra.exceptions import OptimizationError
 from cobra.flux_analysis import find_essential_genes, find_essential_reactions
-from cameo.util import RandomGenerator as Random
+from cobra.manipulation.delete import find_gene_knockout_reactions
+from cameo.util import RandomGenerator as Random, memoize
 
 
 try:
@@ -329,6 +354,126 @@ class TestBestSolutionArchive:
         for sol in pool:
             assert sol in archive
 
+    def test_large_archive_invariants(self):
+        random = Random(SEED)
+        pool = BestSolutionArchive()
+        size = 200
+        for _ in range(2000):
+            candidate = random.sample(range(30), random.randint(0, 4))
+            pool.add(candidate, random.randint(0, 5) / 5., None, True, size)
+
+        assert pool.length() <= size
+        fitness = [solution.fitness for solution in pool]
+        assert fitness == sorted(fitness, reverse=True)
+        assert pool.worst_fitness == fitness[-1]
+        keys = [(solution.fitness, frozenset(solution.candidate)) for solution in pool]
+        assert len(set(keys)) == len(keys)
+        for fitness_i, candidate_i in keys:
+            for fitness_j, candidate_j in keys:
+                assert not (fitness_i == fitness_j and candidate_i < candidate_j)
+
+    def test_callable_pool_is_rebuilt_from_a_new_archive(self):
+        pool = BestSolutionArchive()
+        args = {'max_archive_size': 3}
+        archive = pool(None, [Individual(SOLUTIONS[1][0], SOLUTIONS[1][1])], [], args)
+        assert pool.length() == 1
+        archive = pool(None, [Individual(SOLUTIONS[0][0], SOLUTIONS[0][1])], list(archive), args)
+        assert [set(solution.candidate) for solution in archive] == [set(SOLUTIONS[0][0])]
+
+    def test_multiple_objective_fitness(self):
+        for fitness_type in (Pareto, list):
+            pool = BestSolutionArchive()
+            pool.add([1, 2, 3], fitness_type([0.5, 1.0]), None, True, 3)
+            pool.add([1, 2], fitness_type([0.5, 1.0]), None, True, 3)
+            pool.add([4], fitness_type([0.7, 1.0]), None, True, 3)
+            pool.add([4], fitness_type([0.7, 1.0]), None, True, 3)
+            assert [(set(solution.candidate), list(solution.fitness)) for solution in pool] == \
+                [({4}, [0.7, 1.0]), ({1, 2}, [0.5, 1.0])]
+            pool.add([5], fitness_type([0.8, 1.0]), None, True, 2)
+            assert [set(solution.candidate) for solution in pool] == [{5}, {4}]
+
+
+def _pareto_population(size, seed=11, offset=0):
+    random = numpy.random.RandomState(seed)
+    population = []
+    for i in range(offset, offset + size):
+        individual = inspyred.ec.Individual([i, i + 1])
+        individual.fitness = Pareto([round(random.uniform(0, 1), 1), round(random.uniform(0, 1), 1)])
+        population.append(individual)
+    return population
+
+
+class TestPareto:
+    def test_non_dominated_sort(self):
+        population = _pareto_population(80)
+        ranks = non_dominated_sort(fitness_matrix(population))
+        remaining = set(range(len(population)))
+        rank = 0
+        while remaining:
+            front = {i for i in remaining if not any(population[i] < population[j] for j in remaining)}
+            assert {i for i in range(len(population)) if ranks[i] == rank} == front
+            remaining -= front
+            rank += 1
+
+    def test_fitness_matrix_orientation(self):
+        individual = inspyred.ec.Individual([1], maximize=False)
+        individual.fitness = Pareto([1., float('nan')], maximize=[True, False])
+        assert list(fitness_matrix([individual])[0]) == [-1., -numpy.inf]
+
+    def test_crowding_distance(self):
+        distance = crowding_distance(numpy.array([[0., 4.], [1., 3.], [3., 1.], [4., 0.]]))
+        assert numpy.isinf(distance[0]) and numpy.isinf(distance[3])
+        assert numpy.allclose(distance[1:3], [1.5, 1.5])
+
+    def test_nsga_replacement(self):
+        population = _pareto_population(40)
+        offspring = _pareto_population(40, seed=12, offset=100)
+        survivors = nsga_replacement(Random(SEED), population, [], offspring, {})
+        assert len(survivors) == len(population)
+        combined = population + offspring
+        ranks = non_dominated_sort(fitness_matrix(combined))
+        survivor_ranks = [ranks[combined.index(survivor)] for survivor in survivors]
+        assert max(survivor_ranks) <= min(r for i, r in enumerate(ranks) if combined[i] not in survivors)
+
+    def test_spea2_replacement(self):
+        population = _pareto_population(40)
+        offspring = _pareto_population(40, seed=12, offset=100)
+        survivors = spea2_replacement(Random(SEED), population, [], offspring, {})
+        assert len(survivors) == len(population)
+        combined = population + offspring
+        ranks = non_dominated_sort(fitness_matrix(combined))
+        assert all(combined[i] in survivors for i in numpy.flatnonzero(ranks == 0))
+
+    def test_replacement_keeps_population_size(self):
+        population = _pareto_population(10)
+        # duplicated candidates in the population and offspring that duplicate the parents
+        for individual, duplicate in zip(population[7:], population):
+            individual.candidate = list(duplicate.candidate)
+        offspring = []
+        for parent in population:
+            child = inspyred.ec.Individual(list(parent.candidate))
+            child.fitness = parent.fitness
+            offspring.append(child)
+        for replacer in (nsga_replacement, spea2_replacement):
+            survivors = replacer(Random(SEED), population, [], offspring, {})
+            assert len(survivors) == len(population)
+            assert len(set(frozenset(survivor.candidate) for survivor in survivors)) == 7
+
+    def test_pareto_archive(self):
+        archiver = ParetoArchive()
+        population = _pareto_population(60)
+        archive = archiver(Random(SEED), population, [], {})
+        ranks = non_dominated_sort(fitness_matrix(population))
+        assert sorted(tuple(sorted(i.candidate)) for i in archive) == \
+            sorted(tuple(population[i].candidate) for i in numpy.flatnonzero(ranks == 0))
+        assert all(isinstance(i, Individual) for i in archive)
+
+        archive = archiver(Random(SEED), population, archive, {})
+        assert len(archive) == (ranks == 0).sum()
+
+        archive = archiver(Random(SEED), population, [], {'max_archive_size': 2})
+        assert len(archive) == 2
+
 
 class TestObjectiveFunctions:
     class _MockupSolution:
@@ -372,6 +517,88 @@ class TestObjectiveFunctions:
         with pytest.raises(ValueError):
             YieldFunction(model.reactions.EX_ac_lp_e_rp_, [])
 
+    def test_carbon_yield(self, model):
+        biomass = "Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2"
+        solution = self._MockupSolution()
+        solution.set_primal(biomass, 0.5)
+        solution.set_primal('EX_ac_lp_e_rp_', 2)
+        solution.set_primal('EX_glc_lp_e_rp_', -10)
+        solution.set_primal('PGI', 4)
+        bpcy = biomass_product_coupled_yield(biomass, 'EX_ac_lp_e_rp_', ['EX_glc_lp_e_rp_', 'PGI'], carbon_yield=True)
+        assert bpcy(model, solution, None) == pytest.approx(0.5 * 2 * 2 / (10 * 6 + 4 * 6), abs=1e-6)
+        yield_ = product_yield('EX_ac_lp_e_rp_', 'EX_glc_lp_e_rp_')
+        assert yield_(model, solution, None) == pytest.approx(2 * 2 / (10 * 6), abs=1e-6)
+        # the kernel is compiled once per model object
+        kernel = bpcy.compile(model)
+        assert bpcy.compile(model) is kernel
+        assert kernel.product_weight == 2 and list(kernel.substrate_weights) == [6, 6]
+        assert list(kernel.indices) == [model.reactions.index(r) for r in kernel.reactions]
+        self._assert_is_pickable(bpcy)
+        assert pickle.loads(pickle.dumps(bpcy))(model, solution, None) == bpcy(model, solution, None)
+        # a copy with the same id but another product gets its own weights
+        copy = model.copy()
+        copy.reactions.EX_ac_lp_e_rp_.add_metabolites({copy.metabolites.co2_c: 1})
+        assert copy.id == model.id
+        assert bpcy.compile(copy).product_weight == 1.5
+        assert bpcy.compile(model) is kernel
+
+    def test_compiled_objective_functions(self, model):
+        biomass = "Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2"
+        columns = [biomass, "EX_ac_lp_e_rp_", "EX_glc_lp_e_rp_", "EX_fru_lp_e_rp_", "PGI"]
+        random = numpy.random.RandomState(7)
+        fluxes = random.uniform(-10, 10, (20, len(columns)))
+        fluxes[0, 2:] = 0
+        solutions = []
+        for row in fluxes:
+            solution = self._MockupSolution()
+            for reaction_id, flux in zip(columns, row):
+                solution.set_primal(reaction_id, flux)
+            solutions.append(solution)
+        targets = [['a'] * (i % 4) for i in range(20)]
+
+        def expected_yield(product, substrates, biomass_flux=1.):
+            substrate = numpy.abs(substrates).sum(axis=1)
+            fitness = numpy.zeros(len(product))
+            valid = substrate > config.non_zero_flux_threshold
+            fitness[valid] = (biomass_flux * product)[valid] / substrate[valid]
+            return numpy.round(fitness, config.ndecimals)
+
+        objectives = [
+            (biomass_product_coupled_yield(biomass, "EX_ac_lp_e_rp_", "EX_glc_lp_e_rp_"),
+             expected_yield(fluxes[:, 1], fluxes[:, 2:3], fluxes[:, 0])),
+            (biomass_product_coupled_yield(biomass, "EX_ac_lp_e_rp_", ["EX_glc_lp_e_rp_", "EX_fru_lp_e_rp_"],
+                                           carbon_yield=True),
+             expected_yield(2 * fluxes[:, 1], 6 * fluxes[:, 2:4], fluxes[:, 0])),
+            (product_yield("EX_ac_lp_e_rp_", "EX_glc_lp_e_rp_", carbon_yield=False),
+             expected_yield(fluxes[:, 1], fluxes[:, 2:3])),
+            (product_yield("EX_ac_lp_e_rp_", ["EX_glc_lp_e_rp_", "PGI"]),
+             expected_yield(2 * fluxes[:, 1], 6 * fluxes[:, [2, 4]])),
+            (number_of_knockouts(sense='max'), [len(t) for t in targets]),
+            (number_of_knockouts(sense='min'), [1. / len(t) if t else numpy.inf for t in targets]),
+        ]
+        for of, expected in objectives:
+            compiled = of.compile(model)
+            self._assert_is_pickable(compiled)
+            assert numpy.allclose(compiled(compiled.flux_matrix(solutions), targets), expected)
+            assert numpy.allclose([of(model, solution, t) for solution, t in zip(solutions, targets)], expected)
+
+        # a flux matrix with one column per reaction of the model
+        model_fluxes = numpy.zeros((len(fluxes), len(model.reactions)))
+        model_fluxes[:, [model.reactions.index(r) for r in columns]] = fluxes
+        compiled = objectives[1][0].compile(model)
+        assert numpy.allclose(compiled(compiled.flux_matrix(model_fluxes)), objectives[1][1])
+
+        mo = MultiObjectiveFunction([of for of, _ in objectives])
+        compiled = mo.compile(model)
+        assert len(compiled) == len(objectives)
+        assert compiled.reactions == columns
+        fitness = compiled(compiled.flux_matrix(solutions), targets)
+        assert fitness.shape == (20, len(objectives))
+        assert numpy.allclose(fitness, numpy.column_stack([expected for _, expected in objectives]))
+
+        with pytest.raises(NotImplementedError):
+            biomass_product_coupled_min_yield(biomass, "EX_ac_lp_e_rp_", "EX_glc_lp_e_rp_").compile(model)
+
     def test_biomass_product_coupled_yield(self):
         solution = self._MockupSolution()
         solution.set_primal('biomass', 0.6)
@@ -417,6 +644,35 @@ class TestObjectiveFunctions:
             fitness = of(model, solution, reactions)
         assert round(abs(0.414851 - fitness), 5) == 0
 
+    def test_biomass_product_coupled_min_yield_matches_fva(self, model):
+        biomass = "Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2"
+        product = "EX_ac_lp_e_rp_"
+        substrate = "EX_glc_lp_e_rp_"
+        of = biomass_product_coupled_min_yield(biomass, product, substrate)
+        objective = str(model.objective.expression)
+        for knockouts in [[], ["ATPS4r"], ["FUM", "TKT2"], ["ATPS4r", "CO2t", "GLUDy", "PPS", "PYK"]]:
+            with model:
+                for reaction_id in knockouts:
+                    model.reactions.get_by_id(reaction_id).knock_out()
+                solution = fba(model, raw=True)
+                fva = flux_variability_analysis(model, reactions=[product], fraction_of_optimum=1)
+                expected = round(solution.fluxes[biomass], config.ndecimals) * \
+                    round(fva["lower_bound"][product], config.ndecimals) / \
+                    round(abs(solution.fluxes[substrate]), config.ndecimals)
+                assert of(model, solution, knockouts) == pytest.approx(expected, abs=1e-6)
+        # the objective is restored and the auxiliary constraint is removed with the model context
+        assert str(model.objective.expression) == objective
+        assert model.objective.direction == "max"
+        name = "biomass_product_coupled_min_yield_%s" % biomass
+        assert name not in model.solver.constraints
+        with model:
+            of(model, fba(model, raw=True), [])
+            constraint = model.solver.constraints[name]
+            assert constraint.lb is None and constraint.ub is None
+        assert name not in model.solver.constraints
+        of(model, fba(model, raw=True), [])
+        assert name not in model.solver.constraints
+
     def test_product_yield(self):
         solution = self._MockupSolution()
         solution.set_primal('biomass', 0.6)
@@ -543,6 +799,131 @@ class TestKnockoutEvaluator:
         fitness = evaluator([[0]])[0]
         assert fitness == 0
 
+    def test_reuse_solutions_of_subset_knockouts(self, model):
+        representation = ["ATPS4r", "PYK", "GLUDy", "PPS", "CO2t", "PDH",
+                          "FUM", "FBA", "G6PDH2r", "FRD7", "PGL", "PPC"]
+        decoder = ReactionSetDecoder(representation, model)
+        objective1 = biomass_product_coupled_yield(
+            "Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2",
+            "EX_ac_lp_e_rp_",
+            "EX_glc_lp_e_rp_")
+        fluxes = model.optimize().fluxes
+        inactive = [i for i, reaction_id in enumerate(representation) if abs(fluxes[reaction_id]) < 1e-10]
+        assert len(inactive) >= 2
+        population = [[], inactive[:1], inactive[:2], [1, 2], [1, 2] + inactive[:1]]
+
+        evaluator = KnockoutEvaluator(model, decoder, objective1, fba, {})
+        no_reuse_evaluator = KnockoutEvaluator(model, decoder, objective1, fba, {}, solution_pool_size=0)
+        assert evaluator(population) == no_reuse_evaluator(population)
+        assert no_reuse_evaluator.skipped_simulations == 0
+        assert evaluator.skipped_simulations >= 2
+
+        evaluator.reset()
+        assert evaluator.skipped_simulations == 0
+
+    def test_lethal_subsets_are_not_simulated(self, model):
+        representation = ["GLCpts", "ATPS4r", "PYK", "GLUDy", "PPS", "CO2t", "PDH",
+                          "FUM", "FBA", "G6PDH2r", "FRD7", "PGL", "PPC"]
+        decoder = ReactionSetDecoder(representation, model)
+        objective1 = biomass_product_coupled_yield(
+            "Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2",
+            "EX_ac_lp_e_rp_",
+            "EX_glc_lp_e_rp_")
+        evaluator = KnockoutEvaluator(model, decoder, objective1, fba, {}, solution_pool_size=0)
+        assert evaluator([[0]]) == [0]
+        assert len(evaluator.lethal_sets) == 1
+        assert evaluator([[0, 1], [0, 2, 3], [1, 2]]) == [0, 0, evaluator.evaluate_individual((1, 2))]
+        assert evaluator.skipped_simulations == 2
+
+    def test_only_infeasible_knockouts_are_lethal(self, model):
+        def failing_simulation(model, **kwargs):
+            model.solver.optimize()
+            raise OptimizationError("numerical problems")
+
+        decoder = ReactionSetDecoder(["PYK", "PPS"], model)
+        objective1 = biomass_product_coupled_yield(
+            "Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2",
+            "EX_ac_lp_e_rp_",
+            "EX_glc_lp_e_rp_")
+        evaluator = KnockoutEvaluator(model, decoder, objective1, failing_simulation, {}, solution_pool_size=0)
+        assert evaluator([[0], [0, 1]]) == [0, 0]
+        assert len(evaluator.lethal_sets) == 0
+        assert evaluator.skipped_simulations == 0
+
+    def test_evaluation_statistics(self, model):
+        representation = ["GLCpts", "ATPS4r", "PYK", "GLUDy", "PPS", "CO2t", "PDH"]
+        decoder = ReactionSetDecoder(representation, model)
+        objective1 = biomass_product_coupled_yield(
+            "Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2",
+            "EX_ac_lp_e_rp_",
+            "EX_glc_lp_e_rp_")
+        evaluator = KnockoutEvaluator(model, decoder, objective1, fba, {}, solution_pool_size=0)
+        fitness, statistics = evaluator.evaluate_with_statistics([[0], [1, 2], [0, 3], [1, 2]])
+        assert fitness == evaluator([[0], [1, 2], [0, 3], [1, 2]])
+        assert statistics['candidates'] == 4
+        assert statistics['evaluations'] == 3
+        assert statistics['simulations'] == 2
+        assert statistics['infeasible'] == 2
+        assert statistics['skipped_simulations'] == 1
+        assert statistics['simulation_time'] > 0
+        assert evaluator.statistics['candidates'] == 8
+        assert evaluator.statistics['evaluations'] == 3
+
+
+    def test_population_evaluation_matches_individual_evaluation(self, model):
+        representation = ["ATPS4r", "PYK", "GLUDy", "PPS", "CO2t", "PDH",
+                          "FUM", "FBA", "G6PDH2r", "FRD7", "PGL", "PPC"]
+        decoder = ReactionSetDecoder(representation, model)
+        objective1 = biomass_product_coupled_yield(
+            "Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2",
+            "EX_ac_lp_e_rp_",
+            "EX_glc_lp_e_rp_")
+        population = [[0, 1, 2], [5, 6], [0, 1], [0, 1, 2, 3], [5], [7, 8, 9], [0, 2]]
+        bounds = {r.id: r.bounds for r in model.reactions}
+        evaluator = KnockoutEvaluator(model, decoder, objective1, pfba, {}, solution_pool_size=0)
+        fitness = evaluator(population)
+        assert {r.id: r.bounds for r in model.reactions} == bounds
+        for individual, individual_fitness in zip(population, fitness):
+            reference = KnockoutEvaluator(model, decoder, objective1, pfba, {}, solution_pool_size=0)
+            assert abs(reference.evaluate_individual(tuple(individual)) - individual_fitness) < 1e-6
+
+
+class TestLocalityOrder:
+    def test_locality_order(self):
+        knockouts = [{1, 2, 3}, {7, 8}, set(), {1, 2}, {7}, {1}]
+        order = locality_order(knockouts)
+        assert sorted(order) == list(range(len(knockouts)))
+        assert order == [2, 4, 1, 5, 3, 0]
+
+    def test_trivial_populations(self):
+        assert locality_order([]) == []
+        assert locality_order([{1}]) == [0]
+        assert sorted(locality_order([set(), set(), set()])) == [0, 1, 2]
+
+
+class TestLethalSetIndex:
+    def test_supersets_are_lethal(self):
+        index = LethalSetIndex()
+        index.add({'a', 'b'})
+        assert index.is_lethal({'a', 'b'})
+        assert index.is_lethal({'a', 'b', 'c'})
+        assert not index.is_lethal({'a', 'c'})
+        assert not index.is_lethal(set())
+
+    def test_only_minimal_sets_are_kept(self):
+        index = LethalSetIndex()
+        index.add({'a', 'b', 'c'})
+        index.add({'a', 'b', 'c', 'd'})
+        assert len(index) == 1
+        index.add({'b', 'c'})
+        assert len(index) == 1
+        assert index.is_lethal({'b', 'c', 'e'})
+        index.add({'e'})
+        assert len(index) == 2
+        index.clear()
+        assert len(index) == 0
+        assert not index.is_lethal({'b', 'c'})
+
 
 class TestWrappedEvaluator:
     def test_initializer(self):
@@ -571,6 +952,96 @@ class TestWrappedEvaluator:
             EvaluatorWrapper(123, lambda x: 1)
 
 
+    def test_submit(self):
+        results = []
+        evaluator = EvaluatorWrapper(SequentialView(), len)
+        evaluator.submit([1, 2, 3], results.append, results.append)
+        evaluator = EvaluatorWrapper(SequentialView(), lambda candidates: 1 / 0)
+        evaluator.submit([1, 2, 3], results.append, results.append)
+        assert results[0] == 3
+        assert isinstance(results[1], ZeroDivisionError)
+
+    def test_submit_merges_statistics_when_read(self):
+        class AsyncView(SequentialView):
+            """Calls the callbacks like the result handler thread of a pool, without merging anything."""
+
+            def __len__(self):
+                return 2
+
+            def apply_async(self, function, *args, callback=None, error_callback=None):
+                callback(function(*args))
+
+        evaluator = _CountingEvaluator()
+        wrapper = EvaluatorWrapper(AsyncView(), evaluator)
+        results = []
+        wrapper.submit([(0, 1), (2,)], results.append, results.append)
+        assert results == [[2.0, 0.0]]
+        assert evaluator.statistics['evaluations'] == 0
+        assert wrapper.statistics['evaluations'] == 2
+        assert evaluator.statistics['evaluations'] == 2
+        assert wrapper.statistics['evaluations'] == 2
+
+
+def _sum_of_candidates(candidates):
+    return [sum(candidate) for candidate in candidates]
+
+
+class TestSteadyStateGA:
+    @pytest.mark.parametrize('processes', [1, 2])
+    def test_evolve(self, processes):
+        view = SequentialView() if processes == 1 else MultiprocessingView(processes=processes)
+        ga = SteadyStateGA(Random(SEED))
+        ga.variator = [set_mutation, set_indel]
+        ga.archiver = inspyred.ec.archivers.best_archiver
+        ga.terminator = inspyred.ec.terminators.evaluation_termination
+        try:
+            population = ga.evolve(generator=set_generator, evaluator=EvaluatorWrapper(view, _sum_of_candidates),
+                                   pop_size=10, max_evaluations=400, representation=list(range(50)), max_size=5,
+                                   variable_size=True, mutation_rate=0.5)
+        finally:
+            view.shutdown()
+        assert 400 <= ga.num_evaluations <= 400 + 2 * 2 * processes
+        assert ga.num_generations > 0
+        assert len(population) == 10
+        assert all(individual.fitness == sum(individual.candidate) for individual in population)
+        assert max(individual.fitness for individual in population) > 150
+
+    def test_pending_evaluation_errors(self):
+        class FailedResult(object):
+            def ready(self):
+                return True
+
+            def successful(self):
+                return False
+
+            def get(self, timeout=None):
+                raise ValueError("worker failed")
+
+        class LostEvaluator(object):
+            """Submits evaluations whose callbacks are never called."""
+            concurrency = 2
+
+            def __init__(self, result=None):
+                self.result = result
+
+            def __call__(self, candidates, args):
+                return _sum_of_candidates(candidates)
+
+            def submit(self, candidates, callback, error_callback):
+                return self.result
+
+        ga = SteadyStateGA(Random(SEED))
+        ga._poll_interval = 0.01
+        ga.variator = [set_mutation]
+        ga.terminator = inspyred.ec.terminators.evaluation_termination
+        kwargs = dict(generator=set_generator, pop_size=4, max_evaluations=100, representation=list(range(10)),
+                      max_size=3, variable_size=True, mutation_rate=0.5)
+        with pytest.raises(ValueError):
+            ga.evolve(evaluator=LostEvaluator(FailedResult()), **kwargs)
+        with pytest.raises(TimeoutError):
+            ga.evolve(evaluator=LostEvaluator(), evaluation_timeout=0.05, **kwargs)
+
+
 class TestSwapOptimization:
     def test_swap_reaction_identification(self, model):
         expected_reactions = ['ACALD', 'AKGDH', 'ALCD2x', 'G6PDH2r', 'GAPD', 'GLUDy', 'GLUSy', 'GND', 'ICDHyr',
@@ -607,6 +1078,29 @@ class TestSwapOptimization:
             fitness = optimization_result.data_frame.fitness.max()
             assert round(abs(fitness - 0.322085), 3) == 0
 
+    def test_swap_evaluator(self, model):
+        cofactors = ((model.metabolites.nad_c, model.metabolites.nadh_c),
+                     (model.metabolites.nadp_c, model.metabolites.nadph_c))
+        reactions = ['GAPD', 'AKGDH', 'PDH', 'GLUDy', 'MDH']
+        decoder = ReactionSetDecoder(reactions, model)
+        py = product_yield(model.reactions.EX_etoh_lp_e_rp_, model.reactions.EX_glc_lp_e_rp_)
+        with model:
+            model.objective = model.reactions.EX_etoh_lp_e_rp_
+            model.reactions.Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2.lower_bound = 0.5
+            evaluator = SwapEvaluator(model=model, decoder=decoder, objective_function=py, simulation_method=fba,
+                                      simulation_kwargs={}, swap_pair=cofactors)
+            matrix = model.solver.constraints.nadp_c.get_linear_coefficients(model.solver.variables)
+            for individual in [(0,), (0, 2), (1, 3, 4), (0, 1, 2, 3, 4), ()]:
+                fitness = evaluator.evaluate_individual(individual)
+                with model:
+                    for reaction in decoder(individual)[0]:
+                        swap_cofactors(reaction, model, cofactors, inplace=True)
+                    expected = py(model, fba(model, raw=True), None)
+                assert round(abs(fitness - expected), 6) == 0
+            assert evaluator.evaluate_individual((0,)) != evaluator.evaluate_individual(())
+            assert model.solver.constraints.nadp_c.get_linear_coefficients(model.solver.variables) == matrix
+            assert model.metabolites.nadp_c not in model.reactions.GAPD.metabolites
+
 
 class TestDecoders:
     def test_set_decoder(self, model):
@@ -640,6 +1134,40 @@ class TestDecoders:
         for i in range(1, 5):
             assert model.genes[i] == genes[i - 1]
 
+    def test_gene_set_decoder_knocked_out_reactions(self, model):
+        representation = [g.id for g in model.genes]
+        decoder = GeneSetDecoder(representation, model)
+        random = Random(SEED)
+        population = [random.sample(range(len(representation)), k) for k in [0, 1, 2, 3, 5, 8, 13, 21, 34]]
+        knocked_out_reactions = decoder.knocked_out_reactions(population)
+        assert len(knocked_out_reactions) == len(population)
+        for individual, reaction_ids in zip(population, knocked_out_reactions):
+            genes = [representation[i] for i in individual]
+            expected = {r.id for r in find_gene_knockout_reactions(model, genes)}
+            assert set(reaction_ids) == expected
+
+    def test_equivalent_gene_sets_share_reaction_knockouts(self, model):
+        # ACALD: b0351 or b1241, PFL: (b3951 and b3952) or ... or (b0902 and b0903), b0903 is only used by PFL
+        representation = ['b0351', 'b1241', 'b3951', 'b0902', 'b0903']
+        decoder = GeneSetDecoder(representation, model)
+        knocked_out_reactions = decoder.knocked_out_reactions([[0], [0, 1], [2, 3], [2, 3, 4]])
+        assert knocked_out_reactions[0] == ()
+        assert knocked_out_reactions[1] == ('ACALD',)
+        assert knocked_out_reactions[2] == knocked_out_reactions[3] == ('PFL',)
+
+        # the equivalent gene sets share their memoised fitness, unless the objective function uses the targets
+        objective = biomass_product_coupled_yield(
+            "Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2", "EX_ac_lp_e_rp_", "EX_glc_lp_e_rp_")
+        evaluator = KnockoutEvaluator(model, decoder, objective, fba, {})
+        fitness = evaluator([(2, 3)])[0]
+        assert evaluator([(2, 3, 4)])[0] == fitness
+        assert evaluator.statistics['evaluations'] == 1
+        assert list(evaluator.cached_fitness()) == [(frozenset(['PFL']), None)]
+        assert not objective.uses_targets and MultiObjectiveFunction([objective, number_of_knockouts()]).uses_targets
+        evaluator = KnockoutEvaluator(model, decoder, number_of_knockouts(sense='max'), fba, {})
+        assert evaluator([(2, 3), (2, 3, 4)]) == [2, 3]
+        assert evaluator.statistics['evaluations'] == 2
+
 
 class TestGenerators:
     def test_set_generator(self):
@@ -671,6 +1199,30 @@ class TestGenerators:
         assert len(candidate['test_key_1']) == 3
         assert len(candidate['test_key_2']) == 5
 
+    def test_floyd_sample(self):
+        random = Random(SEED)
+        for _ in range(200):
+            exclude = random.sample(range(30), random.randint(0, 10))
+            k = random.randint(0, 30 - len(exclude))
+            sample = floyd_sample(random, 30, k, exclude=exclude)
+            assert len(set(sample)) == k
+            assert all(0 <= index < 30 for index in sample)
+            assert not set(sample) & set(exclude)
+        assert sorted(floyd_sample(random, 10, 5, exclude=range(5))) == [5, 6, 7, 8, 9]
+        with pytest.raises(ValueError):
+            floyd_sample(random, 10, 6, exclude=range(5))
+
+    def test_floyd_set_generator(self):
+        random = Random(SEED)
+        representation = list(range(2000))
+        for variable_size in (False, True):
+            for _ in range(100):
+                candidate = floyd_set_generator(random, dict(representation=representation, max_size=10,
+                                                             variable_size=variable_size))
+                assert candidate == sorted(set(candidate))
+                assert 0 < len(candidate) <= 10
+                assert variable_size or len(candidate) == 10
+
     def test_fixed_size_set_generator(self, generators):
         args, random, _ = generators
         candidates_file = os.path.join(CURRENT_PATH, "data", "fix_size_candidates.pkl")
@@ -880,6 +1432,88 @@ class TestMigrators:
         migrator(random, population, {})
         assert len(migrator.migrants) == 1
 
+    def test_topologies(self):
+        assert ring_topology(1) == []
+        assert ring_topology(3) == [(0, 1), (1, 2), (2, 0)]
+        assert sorted(star_topology(3)) == [(0, 1), (0, 2), (1, 0), (2, 0)]
+        assert len(fully_connected_topology(4)) == 12
+        with pytest.raises(ValueError):
+            MultiprocessingMigrator(backend='manager', topology='torus')
+        with pytest.raises(ValueError):
+            MultiprocessingMigrator(backend='carrier-pigeon')
+
+    @pytest.mark.parametrize('backend', ['manager', 'shared_memory', 'spool'])
+    def test_channel(self, backend):
+        if backend == 'shared_memory' and SharedMemory is None:
+            pytest.skip('shared memory not available')
+        backend = make_backend(backend)
+        try:
+            channel = backend.channel(2)
+            channel.put_nowait(Individual([1, 2], 1.0))
+            # channels are sent to the island processes
+            copy = pickle.loads(pickle.dumps(channel))
+            copy.put_nowait(Individual([3], 0.5))
+            with pytest.raises(Full):
+                channel.put_nowait(Individual([4], 0.1))
+            received = [channel.get(block=False), copy.get(block=False)]
+            assert sorted((individual.candidate for individual in received), key=len) == [{3}, {1, 2}]
+            with pytest.raises(Empty):
+                copy.get(block=False)
+        finally:
+            backend.close()
+
+    @pytest.mark.parametrize('backend', ['manager', 'shared_memory', 'spool'])
+    def test_migrate_between_islands(self, backend):
+        if backend == 'shared_memory' and SharedMemory is None:
+            pytest.skip('shared memory not available')
+        random = Random(SEED)
+        migrator = MultiprocessingMigrator(max_migrants=1, backend=backend, topology='ring', migration_interval=2)
+        migrator.connect(3)
+        try:
+            islands = [migrator.for_island(i) for i in range(3)]
+            populations = [list(range(10 * i, 10 * i + 10)) for i in range(3)]
+            islands[0](random, populations[0], {})
+            for _, _, channel in migrator._channels:
+                with pytest.raises(Empty):
+                    channel.get(block=False)
+            islands[0](random, populations[0], {})
+            for island, population in zip(islands[1:], populations[1:]):
+                island(random, population, {})
+                island(random, population, {})
+            # every island received the migrant of its predecessor
+            assert any(i < 10 for i in populations[1])
+            assert any(10 <= i < 20 for i in populations[2])
+            assert not any(i >= 10 for i in populations[0])
+        finally:
+            migrator.close()
+
+    def test_island_model(self, model):
+        objective = biomass_product_coupled_yield(model.reactions.Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2,
+                                                  model.reactions.EX_ac_lp_e_rp_, model.reactions.EX_glc_lp_e_rp_)
+        optimization = MultiprocessReactionKnockoutOptimization(model=model, objective_function=objective,
+                                                                simulation_method=fba, essential_reactions=[],
+                                                                topology='ring', migration_interval=2)
+        result = optimization.run(view=SequentialView(), number_of_islands=2, max_evaluations=200, max_size=3,
+                                  seed=SEED)
+        assert len(result.data_frame) > 0
+        assert result.data_frame.targets.is_unique
+
+    @pytest.mark.skipif(SharedMemory is None, reason='shared memory not available')
+    def test_island_telemetry(self, model):
+        objective = biomass_product_coupled_yield(model.reactions.Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2,
+                                                  model.reactions.EX_ac_lp_e_rp_, model.reactions.EX_glc_lp_e_rp_)
+        optimization = MultiprocessReactionKnockoutOptimization(model=model, objective_function=objective,
+                                                                simulation_method=fba, essential_reactions=[])
+        _, telemetry = mkstemp('.jsonl')
+        optimization.run(view=SequentialView(), number_of_islands=2, max_evaluations=100, max_size=3, seed=SEED,
+                         telemetry=telemetry, telemetry_interval=60)
+        with open(telemetry) as telemetry_file:
+            records = [json.loads(line) for line in telemetry_file]
+        os.remove(telemetry)
+        assert [record['island'] for record in records] == [0, 1]
+        assert all(record['evaluations'] >= 100 for record in records)
+        assert all(record['simulations'] + record['skipped_simulations'] > 0 for record in records)
+
 
 class TestOptimizationResult:
     def test_reaction_result(self, model):
@@ -916,6 +1550,150 @@ class TestOptimizationResult:
             assert individual in solutions.archive
             assert solutions.archive.count(individual) == 1, "%s is unique in archive" % individual
 
+    def test_lazy_decoding(self, model):
+        representation = [r.id for r in model.reactions]
+        solutions = [Individual([0, 1], 1.0), Individual([1, 0], 1.0), Individual([2], 0.5), Individual([], 0.1)]
+        result = TargetOptimizationResult(model=model, heuristic_method=None, simulation_method=fba,
+                                          solutions=solutions, objective_function=None, target_type="reaction",
+                                          decoder=ReactionSetDecoder(representation, model), simplify=False)
+        assert result._decoded_solutions is None
+        assert len(result) == 2
+        data_frame = result.data_frame
+        assert list(data_frame.columns) == ["index", "targets", "fitness"]
+        assert [set(targets) for targets in data_frame.targets] == [set(representation[:2]), {representation[2]}]
+        assert list(data_frame.fitness) == [1.0, 0.5]
+
+    def test_rows_to_data_frame(self):
+        columns = ["reactions", "size", "fitness"]
+        data_frame = _rows_to_data_frame([[("A", "B"), 2, 0.5], [numpy.nan, numpy.nan, numpy.nan]], columns)
+        assert list(data_frame.columns) == columns
+        assert data_frame.reactions[0] == ("A", "B")
+        assert numpy.isnan(data_frame.fitness[1])
+        assert list(_rows_to_data_frame([], columns).columns) == columns
+
+
+class _CountingEvaluator(TargetEvaluator):
+    """The fitness is the number of the targets 0 and 1 in a candidate."""
+
+    def __init__(self):
+        self.statistics = Counter()
+
+    @memoize
+    def evaluate_individual(self, individual):
+        self.statistics['evaluations'] += 1
+        return float(len({0, 1} & set(individual)))
+
+
+class TestSolutionSimplification:
+    def test_simplify_population(self, model):
+        batches = []
+
+        class BatchRecordingEvaluator(KnockoutEvaluator):
+            def __call__(self, population):
+                batches.append(list(population))
+                return super(BatchRecordingEvaluator, self).__call__(population)
+
+        objective = biomass_product_coupled_yield(
+            "Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2", "EX_ac_lp_e_rp_", "EX_glc_lp_e_rp_")
+        representation = [r.id for r in model.reactions]
+        decoder = ReactionSetDecoder(representation, model)
+        evaluator = KnockoutEvaluator(model, decoder, objective, fba, {})
+        targets = [["FUM", "LDH_D", "TKT2", "FBP", "ADK1"],
+                   ["AKGt2r", "ATPM", "ATPS4r", "D_LACt2"],
+                   ["CO2t", "FORt2", "SUCOAS"],
+                   ["CO2t", "FORt2", "SUCOAS"]]
+        population = []
+        for reactions in targets:
+            candidate = tuple(sorted(representation.index(r) for r in reactions))
+            population.append(Individual(candidate, evaluator([candidate])[0]))
+
+        simplification = SolutionSimplification(BatchRecordingEvaluator(model, decoder, objective, fba, {}))
+        simplified = simplification(population)
+
+        assert [sorted(representation[i] for i in individual.candidate) for individual in simplified] == \
+            [["FUM", "TKT2"], ["ATPM", "ATPS4r"], ["CO2t"], ["CO2t"]]
+        for individual, simple_individual in zip(population, simplified):
+            assert simple_individual.fitness == individual.fitness
+            assert evaluator([tuple(sorted(simple_individual.candidate))])[0] >= individual.fitness
+        # all single removals first (deduplicated), then one removal per unfinished solution
+        assert [len(batch) for batch in batches] == [12, 3, 1]
+        assert all(len(set(batch)) == len(batch) for batch in batches)
+
+        assert simplification.simplify(population[2]).candidate == simplified[2].candidate
+
+    def test_view_evaluates_cache_misses(self):
+        chunks = []
+
+        class RecordingView(SequentialView):
+            def __len__(self):
+                return 2
+
+            def map(self, function, iterable):
+                iterable = list(iterable)
+                chunks.extend(iterable)
+                return super(RecordingView, self).map(function, iterable)
+
+        evaluator = _CountingEvaluator()
+        population = [Individual(candidate, evaluator([candidate])[0]) for candidate in [(0, 1, 5, 7), (1, 4, 6)]]
+        cached = [(0, 1, 5), (1, 4)]
+        evaluator(cached)
+
+        simplified = SolutionSimplification(evaluator, view=RecordingView())(population)
+
+        assert [sorted(individual.candidate) for individual in simplified] == [[0, 1], [1]]
+        evaluated = [candidate for chunk in chunks for candidate in chunk]
+        assert evaluated and not set(cached) & set(evaluated)
+        assert set(evaluated) <= set(args[0] for args in evaluator.cached_fitness())
+        assert set(evaluator.cached_fitness(evaluated)) == set((candidate,) for candidate in evaluated)
+        assert evaluator.cached_fitness([(8, 9)]) == {}
+        assert evaluator.statistics['evaluations'] == len(population) + len(cached) + len(evaluated)
+
+
+class TestProcessing:
+    def test_target_flux_range(self, model):
+        biomass = model.reactions.Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2
+        target = model.reactions.EX_ac_lp_e_rp_
+        for knockouts in [[], ["ATPS4r"], ["FUM", "TKT2"]]:
+            with model:
+                for reaction_id in knockouts:
+                    model.reactions.get_by_id(reaction_id).knock_out()
+                model.objective = biomass
+                fva = flux_variability_analysis(model, fraction_of_optimum=0.99, reactions=[target])
+                lower_bound, upper_bound = target_flux_range(model, target, fraction_of_optimum=0.99)
+                assert lower_bound == pytest.approx(fva.lower_bound(target), abs=1e-6)
+                assert upper_bound == pytest.approx(fva.upper_bound(target), abs=1e-6)
+        assert model.objective.expression == biomass.flux_expression
+
+    def test_process_in_batches(self, model):
+        biomass = model.reactions.Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2
+        target = model.reactions.EX_ac_lp_e_rp_
+        substrate = model.reactions.EX_glc_lp_e_rp_
+        objective = biomass_product_coupled_yield(biomass, target, substrate)
+        columns = ["reactions", "size", "fva_min", "fva_max", "target_flux", "biomass_flux", "yield", "fitness"]
+        processor = SolutionProcessor(process_reaction_knockout_solution, model, columns, simulation_method=fba,
+                                      simulation_kwargs={}, biomass=biomass, target=target, substrate=substrate,
+                                      objective_function=objective)
+        solutions = [("ATPS4r",), ("GLCpts",), ("FUM", "TKT2")]
+
+        rows = _process_in_batches(processor, solutions, SequentialView())
+        assert [row[0] for row in rows[::2]] == [("ATPS4r",), ("FUM", "TKT2")]
+        assert all(numpy.isnan(value) for value in rows[1])
+        expected = process_reaction_knockout_solution(model, ("FUM", "TKT2"), fba, {}, biomass, target, substrate,
+                                                      objective)
+        assert rows[2][:2] == expected[:2]
+        assert numpy.allclose(rows[2][2:4], expected[2:4])
+
+        view = MultiprocessingView(processes=2)
+        try:
+            parallel_rows = _process_in_batches(processor, solutions, view)
+        finally:
+            view.shutdown()
+        assert len(parallel_rows) == len(rows)
+        for row, parallel_row in zip(rows[::2], parallel_rows[::2]):
+            assert row[:2] == parallel_row[:2]
+            # fva and biomass flux are unique, the target flux of an fba solution is not
+            assert numpy.allclose([row[2], row[3], row[5]], [parallel_row[2], parallel_row[3], parallel_row[5]])
+
 
 @pytest.fixture(scope="function")
 def reaction_ko_single_objective(model):
@@ -964,6 +1742,19 @@ class TestReactionKnockoutOptimization:
 
         # assert results.seed == expected_results.seed
 
+    def test_run_floyd_sampling(self, model):
+        objective = biomass_product_coupled_yield(
+            "Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2", "EX_ac_lp_e_rp_", "EX_glc_lp_e_rp_")
+        rko = ReactionKnockoutOptimization(model=model,
+                                           simulation_method=fba,
+                                           objective_function=objective,
+                                           sampling='floyd')
+        assert rko.heuristic_method.variator[0] is floyd_set_mutation
+        results = rko.run(max_evaluations=500, pop_size=10, view=SequentialView(), seed=SEED)
+        assert len(results.data_frame.targets) > 0
+        with pytest.raises(ValueError):
+            ReactionKnockoutOptimization(model=model, objective_function=objective, sampling='bitset')
+
     def test_run_reaction_single_ko_objective_benchmark(self, benchmark, reaction_ko_single_objective):
         benchmark(reaction_ko_single_objective.run, max_evaluations=3000, pop_size=10, view=SequentialView(), seed=SEED)
 
@@ -1009,6 +1800,95 @@ class TestReactionKnockoutOptimization:
 
         # assert results.seed == expected_results.seed
 
+    def test_run_spea2(self, model):
+        objective = MultiObjectiveFunction([
+            biomass_product_coupled_yield("Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2", "EX_ac_lp_e_rp_",
+                                          "EX_glc_lp_e_rp_"),
+            number_of_knockouts()])
+        rko = ReactionKnockoutOptimization(model=model, simulation_method=fba, objective_function=objective,
+                                           heuristic_method=SPEA2)
+        assert isinstance(rko.heuristic_method.archiver, ParetoArchive)
+        results = rko.run(max_evaluations=500, pop_size=10, view=SequentialView(), seed=SEED)
+        assert len(results.data_frame.targets) == len(results.data_frame.targets.apply(tuple).unique())
+
+    def test_run_steady_state(self, model):
+        objective = biomass_product_coupled_yield(
+            "Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2", "EX_ac_lp_e_rp_", "EX_glc_lp_e_rp_")
+        rko = ReactionKnockoutOptimization(model=model, simulation_method=fba, objective_function=objective,
+                                           heuristic_method=SteadyStateGA)
+        assert isinstance(rko.heuristic_method.archiver, BestSolutionArchive)
+        results = rko.run(max_evaluations=300, pop_size=10, view=SequentialView(), seed=SEED)
+        assert 300 <= rko.heuristic_method.num_evaluations <= 302
+        assert len(results.data_frame.targets) > 0
+        with pytest.raises(TypeError):
+            ReactionKnockoutOptimization(model=model, objective_function=MultiObjectiveFunction([objective]),
+                                         heuristic_method=SteadyStateGA)
+
+    def test_checkpoint_and_resume(self, model):
+        objective = biomass_product_coupled_yield(
+            "Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2", "EX_ac_lp_e_rp_", "EX_glc_lp_e_rp_")
+
+        def optimization():
+            return ReactionKnockoutOptimization(model=model, objective_function=objective, progress=False)
+
+        uninterrupted = optimization()
+        uninterrupted.run(max_evaluations=120, pop_size=10, view=SequentialView(), seed=SEED)
+
+        _, checkpoint = mkstemp('.ckpt')
+        interrupted = optimization()
+        interrupted.run(max_evaluations=60, pop_size=10, view=SequentialView(), seed=SEED, checkpoint=checkpoint)
+        state = load_checkpoint(checkpoint)
+        assert state['num_evaluations'] == interrupted.heuristic_method.num_evaluations
+        assert state['seed'] == SEED
+        assert len(state['fitness_cache']) > 0
+
+        resumed = optimization()
+        resumed.run(max_evaluations=120, pop_size=10, view=SequentialView(), seed=4321, resume_from=checkpoint)
+        assert resumed.heuristic_method.num_evaluations == uninterrupted.heuristic_method.num_evaluations
+        assert resumed.heuristic_method.num_generations == uninterrupted.heuristic_method.num_generations
+        assert [(i.candidate, i.fitness) for i in resumed.heuristic_method.population] == \
+            [(i.candidate, i.fitness) for i in uninterrupted.heuristic_method.population]
+        assert [(i.candidate, i.fitness) for i in resumed.heuristic_method.archive] == \
+            [(i.candidate, i.fitness) for i in uninterrupted.heuristic_method.archive]
+        os.remove(checkpoint)
+
+    def test_save_checkpoint(self):
+        _, checkpoint = mkstemp('.ckpt')
+        save_checkpoint({'num_evaluations': 10}, checkpoint)
+        assert load_checkpoint(checkpoint)['num_evaluations'] == 10
+        prefix = '.' + os.path.basename(checkpoint)
+        assert [f for f in os.listdir(os.path.dirname(checkpoint)) if f.startswith(prefix)] == []
+        with pytest.raises((AttributeError, pickle.PicklingError)):
+            save_checkpoint({'unpicklable': lambda: None}, checkpoint)
+        assert load_checkpoint(checkpoint)['num_evaluations'] == 10
+        os.remove(checkpoint)
+
+    @pytest.mark.parametrize('suffix', ['.jsonl', '.csv'])
+    def test_run_with_telemetry(self, model, suffix):
+        objective = biomass_product_coupled_yield(
+            "Biomass_Ecoli_core_N_lp_w_fsh_GAM_rp__Nmet2", "EX_ac_lp_e_rp_", "EX_glc_lp_e_rp_")
+        optimization = ReactionKnockoutOptimization(model=model, objective_function=objective, progress=False)
+        _, telemetry = mkstemp(suffix)
+        optimization.run(max_evaluations=200, pop_size=10, view=SequentialView(), seed=SEED, telemetry=telemetry,
+                         telemetry_interval=0)
+        with open(telemetry) as telemetry_file:
+            if suffix == '.csv':
+                records = list(csv.DictReader(telemetry_file))
+            else:
+                records = [json.loads(line) for line in telemetry_file]
+        os.remove(telemetry)
+        assert len(records) > 2
+        last = records[-1]
+        assert int(last['evaluations']) == optimization.heuristic_method.num_evaluations
+        assert int(last['candidates']) >= int(last['evaluations'])
+        assert 0 <= float(last['cache_hit_rate']) <= 1
+        assert 0 <= float(last['infeasible_fraction']) <= 1
+        assert int(last['simulations']) + int(last['skipped_simulations']) > 0
+        assert float(last['simulation_time']) > 0
+        assert float(last['overhead_time']) > 0
+        assert int(last['archive_size']) > 0
+        assert float(records[1]['evaluations_per_second']) > 0
+
     def test_run_reaction_ko_multi_objective_benchmark(self, benchmark, reaction_ko_multi_objective):
         benchmark(reaction_ko_multi_objective.run, max_evaluations=3000, pop_size=10, view=SequentialView(), seed=SEED)
 
@@ -1190,6 +2070,74 @@ class TestVariator:
         assert children[0] == bro
         assert children[1] == sis
 
+    def test_floyd_set_mutation(self):
+        individual = [1, 3, 5, 9, 10]
+        representation = list(range(12))
+        args = {
+            "representation": representation,
+            "mutation_rate": 1.0
+        }
+        new_individuals = floyd_set_mutation(Random(SEED), [individual], args)
+        assert len(new_individuals[0]) == len(individual)
+        assert not set(new_individuals[0]) & set(individual)
+
+        # only 2 indices are left to mutate to
+        args["representation"] = list(range(7))
+        new_individuals = floyd_set_mutation(Random(SEED), [individual], args)
+        assert len(set(new_individuals[0])) == len(individual)
+        assert len(set(new_individuals[0]) - set(individual)) == 2
+
+        args["mutation_rate"] = 0.0
+        assert floyd_set_mutation(Random(SEED), [individual], args)[0] == individual
+
+    def test_floyd_set_indel(self):
+        individual = [1, 3, 5, 9, 10]
+        representation = list(range(11))
+        random = Random(SEED)
+        args = {
+            "representation": representation,
+            "indel_rate": 1.0
+        }
+        sizes = set()
+        for _ in range(50):
+            new_individual = floyd_set_indel(random, [individual], args)[0]
+            assert new_individual == sorted(set(new_individual))
+            assert len(set(new_individual).symmetric_difference(individual)) == 1
+            sizes.add(len(new_individual))
+        assert sizes == {4, 6}
+
+        args["variable_size"] = False
+        assert floyd_set_indel(random, [individual], args)[0] == individual
+
+    def test_floyd_set_n_point_crossover(self):
+        mom = [0, 1, 4, 10, 11, 12]
+        dad = [0, 2, 8, 9, 10, 11]
+        random = Random(SEED)
+        for num_crossover_points in (1, 2, 3):
+            args = {"crossover_rate": 1.0, "num_crossover_points": num_crossover_points, "max_size": 12}
+            bro, sis = floyd_set_n_point_crossover(random, [mom, dad], args)
+            assert sorted(bro + sis) == sorted(mom + dad)
+            assert bro == sorted(set(bro)) and sis == sorted(set(sis))
+
+        args = {"crossover_rate": 1.0, "num_crossover_points": 2, "max_size": 4}
+        for child in floyd_set_n_point_crossover(random, [mom, dad], args):
+            assert 0 < len(child) <= 4
+
+        args = {"crossover_rate": 0.0}
+        assert floyd_set_n_point_crossover(random, [mom, dad], args) == [mom, dad]
+
+        # the crossover points are drawn with floyd_sample
+        args = {"crossover_rate": 1.0, "num_crossover_points": 2, "max_size": 12}
+        random = Random(SEED)
+        random.random()
+        points = sorted(p + 1 for p in floyd_sample(random, 8, 2))
+        random = Random(SEED)
+        bro, sis = floyd_set_n_point_crossover(random, [mom, dad], args)
+        union = sorted(set(mom) | set(dad))
+        middle = set(union[points[0]:points[1]])
+        assert bro == sorted([v for v in mom if v not in middle] + [v for v in dad if v in middle])
+        assert sis == sorted([v for v in dad if v not in middle] + [v for v in mom if v in middle])
+
     def test_multiple_chromosome_set_mutation(self):
         genome = MultipleChromosomeGenome(["A", "B"])
         genome["A"] = [1, 2, 3, 4]
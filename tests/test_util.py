@@ -19,11 +19,12 @@ from itertools import chain
 
 import pytest
 from cobra import Metabolite
+from optlang import Constraint, Variable
 
 from cameo.network_analysis.util import distance_based_on_molecular_formula
 from cameo.util import (ProblemCache, RandomGenerator, Singleton, TimeMachine,
                         float_ceil, float_floor, frozendict, generate_colors,
-                        partition)
+                        linear_terms, partition)
 
 SEED = 1234
 
@@ -311,6 +312,11 @@ class TestUtils:
             new_value = float_ceil(val, i)
             assert new_value == 0
 
+    def test_linear_terms(self):
+        x, y = Variable('x'), Variable('y')
+        assert linear_terms(2 * x - y + x + 3) == ({'x': 3., 'y': -1.}, 3.)
+        assert linear_terms(Constraint(x + 0.5 * y, ub=1).expression) == ({'x': 1., 'y': 0.5}, 0.)
+
 
 class TestFrozendict:
     def test_frozen_attributes(self):